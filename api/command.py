@@ -1,8 +1,8 @@
 from abc import ABC, ABCMeta, abstractmethod
 from enum import Enum
 from typing import Any, Awaitable, Callable, Dict, Union
-from dp_store import xNodeDpStore
-from routes import Routes
+from api.dp_store import xNodeDpStore
+from api.route_names import Routes
 
 
 class xNodeCommand(ABC):
@@ -23,7 +23,7 @@ class RegisterAction(xNodeCommand):
         super().__init__(Routes.RegisterAction)
     
     def execute(self, store : xNodeDpStore, name: str, func: Callable[[], Union[bool, Awaitable[bool]]]) -> bool:
-        return store.add_action(func)
+        return store.add_action(name, func)
         
 
 class RegisterCondition(xNodeCommand):
@@ -32,5 +32,5 @@ class RegisterCondition(xNodeCommand):
 
     
     def execute(self, store : xNodeDpStore, name: str, func: Callable[[], Union[bool, Awaitable[bool]]]) -> bool:
-        return store.add_condition(func)
+        return store.add_condition(name, func)
     
\ No newline at end of file
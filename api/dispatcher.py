@@ -1,40 +1,191 @@
 import asyncio
-import json
+import inspect
+import itertools
+import logging
 import websockets
-from typing import Awaitable, Callable, Dict, Any, Union
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple, Union
 import sys
-from command import RegisterAction, RegisterCondition, xNodeCommand
-from dp_store import xNodeDpStore
+from common.codec import Codec, codec_for, subprotocols
+from api.command import RegisterAction, RegisterCondition, xNodeCommand
+from api.route_names import Routes
+from api.dp_store import xNodeDpStore
+
+logger = logging.getLogger(__name__)
 
 class xNodeDispatcher:
-    def __init__(self, server_uri: str) -> None:
+    """Client that registers and serves actions/conditions over one WebSocket.
+
+    Every request carries a ``request_id`` that the server echoes back, so
+    registrations are pipelined and their responses may arrive in any order.
+    Functions decorated with ``@action()``/``@condition()`` are queued and
+    registered together in a single ``register_batch`` message.
+
+    Incoming ``invoke_func`` requests run as concurrent tasks, at most
+    ``max_in_flight`` at a time; the others wait for a slot while the reader
+    goes on, so replies to registrations made from inside an invocation
+    still arrive. Functions that are not ``async def`` run in a thread, so a
+    blocking one holds up neither the loop nor the other invocations. Each
+    invocation is failed after ``invoke_timeout`` seconds when it is set.
+
+    The wire encoding is negotiated as a WebSocket subprotocol from
+    ``encodings`` (by default every codec available, binary first).
+
+    When the connection drops, the next request, ``connect`` or ``start``
+    opens a new one and registers every function stored so far again;
+    registrations that failed stay queued for the next flush.
+    """
+
+    def __init__(self, server_uri: str, max_in_flight: int = 64, invoke_timeout: Optional[float] = None, encodings: Optional[List[str]] = None) -> None:
         self.server_uri = server_uri
+        self.encodings = encodings if encodings is not None else subprotocols()
+        self.invoke_timeout = invoke_timeout
         self.__store = xNodeDpStore()
+        self.__websocket: Optional[websockets.WebSocketClientProtocol] = None
+        self.__codec: Optional[Codec] = None
+        self.__reader: Optional[asyncio.Task] = None
+        self.__pending: Dict[int, asyncio.Future] = {}
+        self.__request_ids = itertools.count(1)
+        self.__queued: List[Tuple[str, Callable[[], Union[bool, Awaitable[bool]]], xNodeCommand]] = []
+        self.__flush_task: Optional[asyncio.Task] = None
+        self.__slots = asyncio.Semaphore(max_in_flight)
+        self.__invocations: Set[asyncio.Task] = set()
+        self.__running = 0
+
+    async def connect(self) -> None:
+        if self.__websocket is None:
+            websocket = self.__websocket = await websockets.connect(self.server_uri, subprotocols=self.encodings)
+            self.__codec = codec_for(websocket.subprotocol)
+            self.__reader = asyncio.create_task(self.__read(websocket))
+            # A new connection starts out with nothing registered on the server.
+            registered = [(name, func, RegisterAction()) for name, func in self.__store.actions.items()]
+            registered += [(name, func, RegisterCondition()) for name, func in self.__store.conditions.items()]
+            if registered:
+                self.__queued[:0] = registered
+            if self.__queued and self.__flush_task is None:
+                self.__schedule_flush()
+
+    async def close(self) -> None:
+        if self.__websocket is not None:
+            reader = self.__reader
+            await self.__websocket.close()
+            await reader
+
+    async def __request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        await self.connect()
+        request_id = next(self.__request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = future
+        try:
+            await self.__websocket.send(self.__codec.encode({'request_id': request_id, **message}))
+            response = await future
+        finally:
+            self.__pending.pop(request_id, None)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    async def __read(self, websocket: websockets.WebSocketClientProtocol) -> None:
+        try:
+            async for message in websocket:
+                response = self.__codec.decode(message)
+                if response.get('command') == "invoke_func":
+                    task = asyncio.create_task(self.__handle_invoke(websocket, response))
+                    self.__invocations.add(task)
+                    task.add_done_callback(self.__invocation_done)
+                    continue
+                future = self.__pending.get(response.get('request_id'))
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.__websocket is websocket:
+                self.__websocket = None
+                self.__reader = None
+            for task in self.__invocations:
+                task.cancel()
+            for future in self.__pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the xNode server was closed."))
+
+    async def __handle_invoke(self, websocket: websockets.WebSocketClientProtocol, request: Dict[str, Any]) -> None:
+        async with self.__slots:
+            self.__running += 1
+            try:
+                await self.__serve_invoke(websocket, request)
+            finally:
+                self.__running -= 1
+
+    async def __serve_invoke(self, websocket: websockets.WebSocketClientProtocol, request: Dict[str, Any]) -> None:
+        name = request.get('name')
+        response: Dict[str, Any] = {'request_id': request.get('request_id')}
+        if name not in self.__store.actions and name not in self.__store.conditions:
+            response['error'] = f"Function '{name}' not registered"
+        else:
+            try:
+                response['result'] = await asyncio.wait_for(self.invoke(name), timeout=self.invoke_timeout)
+            except asyncio.TimeoutError:
+                response['error'] = f"Function '{name}' timed out after {self.invoke_timeout} seconds"
+            except Exception as e:
+                response['error'] = f"Function '{name}' failed: {e!r}"
+        try:
+            await websocket.send(self.__codec.encode(response))
+        except websockets.ConnectionClosed:
+            pass
+
+    def __invocation_done(self, task: asyncio.Task) -> None:
+        self.__invocations.discard(task)
+
+    @property
+    def in_flight(self) -> int:
+        return self.__running
 
     async def __register(self, name: str, func: Callable[[], Union[bool, Awaitable[bool]]], command: xNodeCommand) -> Dict[str, Any]:
-        
-        async with websockets.connect(self.server_uri) as websocket:
-            message = json.dumps({
-                'command': command,
-                'name': name
+        await self.__request({'command': command.route.value, 'id': name, 'name': name})
+        return command.execute(self.__store, name, func)
+
+    def __enqueue(self, name: str, func: Callable[[], Union[bool, Awaitable[bool]]], command: xNodeCommand) -> None:
+        self.__queued.append((name, func, command))
+        if self.__websocket is not None and self.__flush_task is None:
+            self.__schedule_flush()
+
+    def __schedule_flush(self) -> None:
+        self.__flush_task = asyncio.create_task(self.flush())
+        self.__flush_task.add_done_callback(self.__flushed)
+
+    @staticmethod
+    def __flushed(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Registering queued functions failed, retrying on the next connection: %r", task.exception())
+
+    async def flush(self) -> List[bool]:
+        """Register every queued function in one ``register_batch`` message.
+
+        If the request fails the functions are queued again.
+        """
+        self.__flush_task = None
+        queued, self.__queued = self.__queued, []
+        if not queued:
+            return []
+        try:
+            await self.__request({
+                'command': Routes.RegisterBatch.value,
+                'items': [{'command': command.route.value, 'id': name, 'name': name} for name, _, command in queued],
             })
-            await websocket.send(message)
-            response = await websocket.recv()
-            _ = json.loads(response)
+        except BaseException:
+            self.__queued[:0] = queued
+            raise
+        return [command.execute(self.__store, name, func) for name, func, command in queued]
 
-            return command.execute(self.__store, name, func)
-        
     def action(self) -> Callable[[Callable[[], Union[bool, Awaitable[bool]]]], Callable[[], Union[bool, Awaitable[bool]]]]:
         def decorator(func: Callable[[], Union[bool, Awaitable[bool]]]) -> Callable[[], Union[bool, Awaitable[bool]]]:
-            func_name = func.__name__
-            asyncio.create_task(self.register_action(func_name, func))
+            self.__enqueue(func.__name__, func, RegisterAction())
             return func
         return decorator
 
     def condition(self) -> Callable[[Callable[[], Union[bool, Awaitable[bool]]]], Callable[[], Union[bool, Awaitable[bool]]]]:
         def decorator(func: Callable[[], Union[bool, Awaitable[bool]]]) -> Callable[[], Union[bool, Awaitable[bool]]]:
-            func_name = func.__name__
-            asyncio.create_task(self.register_condition(func_name, func))
+            self.__enqueue(func.__name__, func, RegisterCondition())
             return func
         return decorator
 
@@ -46,27 +197,19 @@ class xNodeDispatcher:
 
     async def invoke(self, name: str) -> Union[bool, Awaitable[bool]]:
         if name in self.__store.actions:
-            result = await self.__store.actions[name]()
-            return result
+            func = self.__store.actions[name]
         elif name in self.__store.conditions:
-            result = await self.__store.conditions[name]()
-            return result
+            func = self.__store.conditions[name]
         else:
             raise ValueError(f"Function {name} not registered")
+        result = func() if asyncio.iscoroutinefunction(func) else await asyncio.to_thread(func)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
 
     async def start(self):
-        async with websockets.connect(self.server_uri) as websocket:
-            while True:
-                message = await websocket.recv()
-                request = json.loads(message)
-                command = request.get('command')
-                if command == "invoke_func":
-                    name = request.get('name')
-                    if name in self.actions:
-                        result = await self.invoke(name)
-                        response = json.dumps({'result': result})
-                        await websocket.send(response)
-                    else:
-                        error_response = json.dumps({'error': f"Function '{name}' not registered"})
-                        await websocket.send(error_response)
-                        
\ No newline at end of file
+        """Connect, register queued functions and serve invocations until the connection closes."""
+        await self.connect()
+        reader = self.__reader
+        await self.flush()
+        await reader
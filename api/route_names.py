@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class Routes(Enum):
+    RegisterAction = "register_action"
+    RegisterCondition = "register_condition"
+    RegisterBatch = "register_batch"
@@ -0,0 +1,96 @@
+"""Ticking many agents through one tree: per-agent instances vs ``BatchTree``.
+
+Every agent runs the same guard tree (flee when hurt, attack when an enemy
+is close, idle otherwise). The per-agent run calls each leaf once per agent;
+the batch run calls vectorized leaves once per tick for all of them.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_batch --quick
+"""
+import argparse
+import asyncio
+import random
+from typing import Callable, List
+
+from benchmarks.bench_executor import NullContext
+from benchmarks.harness import Result, abench, report
+from src.batch import Agents, BatchTree
+from src.behavior_tree import ActionNode, ConditionNode, Node, SelectorNode, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+
+AGENTS = [100, 1_000, 10_000]
+
+
+def guard_tree(leaf: Callable[[str, str], Node]) -> Node:
+    return SelectorNode([
+        SequenceNode([leaf('condition', 'hurt'), leaf('action', 'flee')]),
+        SequenceNode([leaf('condition', 'near'), leaf('action', 'attack')]),
+        leaf('action', 'idle'),
+    ])
+
+
+def scalar_tree(hp: List[int], distance: List[float], agent: int) -> Node:
+    checks = {
+        'hurt': lambda: hp[agent] < 30,
+        'near': lambda: distance[agent] < 5.0,
+    }
+
+    def leaf(kind: str, name: str) -> Node:
+        if kind == 'condition':
+            return ConditionNode(Condition(id=name, name=name, func=checks[name]))
+        return ActionNode(Action(id=name, name=name, func=lambda: True))
+
+    return guard_tree(leaf)
+
+
+def vectorized_tree() -> Node:
+    def hurt(agents: Agents) -> List[bool]:
+        return [hp < 30 for hp in agents.column('hp')]
+
+    def near(agents: Agents) -> List[bool]:
+        return [distance < 5.0 for distance in agents.column('distance')]
+
+    def act(agents: Agents) -> List[bool]:
+        return [True] * len(agents)
+
+    checks = {'hurt': hurt, 'near': near}
+
+    def leaf(kind: str, name: str) -> Node:
+        if kind == 'condition':
+            return ConditionNode(Condition(id=name, name=name, func=checks[name], vectorized=True))
+        return ActionNode(Action(id=name, name=name, func=act, vectorized=True))
+
+    return guard_tree(leaf)
+
+
+async def run(quick: bool = False) -> List[Result]:
+    results = []
+    rng = random.Random(42)
+    for agents in AGENTS[:2] if quick else AGENTS:
+        hp = [rng.randint(0, 100) for _ in range(agents)]
+        distance = [rng.uniform(0.0, 20.0) for _ in range(agents)]
+        trees = [CompiledBehaviorTree(scalar_tree(hp, distance, agent), NullContext()) for agent in range(agents)]
+
+        async def per_agent() -> None:
+            for tree in trees:
+                await tree.run()
+
+        batch = BatchTree(vectorized_tree(), [NullContext() for _ in range(agents)], {'hp': hp, 'distance': distance})
+        iterations = max(5, 100_000 // agents) // (5 if quick else 1)
+        results.append(await abench(f"batch.per_agent[{agents}]", per_agent, iterations, warmup=2))
+        results.append(await abench(f"batch.vectorized[{agents}]", batch.run, iterations, warmup=2))
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    report(await run(args.quick))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""``Context`` operations at large history sizes.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_context --quick
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from datetime import datetime
+from typing import List
+
+from benchmarks.harness import Result, bench, report
+from common.result import xNodeResult, xNodeStatus
+from src.behavior_tree import Context
+from src.entities.context import ContextEntry
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def filled(size: int) -> Context:
+    context = Context()
+    result = xNodeResult(xNodeStatus.Success, True)
+    now = datetime.now()
+    for index in range(size):
+        context.save(ContextEntry(id=f"a{index}", time=now, result=result))
+    return context
+
+
+async def run(quick: bool = False) -> List[Result]:
+    results = []
+    rng = random.Random(0)
+    result = xNodeResult(xNodeStatus.Success, True)
+    for size in SIZES[:2] if quick else SIZES:
+        context = filled(size)
+        ids = [f"a{rng.randrange(size)}" for _ in range(1024)]
+        lookups = itertools.cycle(ids)
+        fresh = (f"n{index}" for index in itertools.count())
+        iterations = 2_000 if quick else 20_000
+        results.append(bench(f"context.has_completed[{size}]", lambda: context.has_completed(next(lookups)), iterations))
+        results.append(bench(f"context.update[{size}]", lambda: context.update(ContextEntry(id=next(lookups), time=datetime.now(), result=result)), iterations))
+        results.append(bench(f"context.save[{size}]", lambda: context.save(ContextEntry(id=next(fresh), time=datetime.now(), result=result)), iterations))
+        results.append(bench(f"context.get[{size}]", lambda: context.get(lambda entry: entry.id == "a0"), max(5, iterations // size)))
+        bounded = Context(max_entries=size)
+        for entry in context.get()[:size]:
+            bounded.save(entry)
+        results.append(bench(f"context.save.evicting[{size}]", lambda: bounded.save(ContextEntry(id=next(fresh), time=datetime.now(), result=result)), iterations))
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    report(await run(args.quick))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
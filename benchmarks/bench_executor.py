@@ -0,0 +1,92 @@
+"""Compare the recursive ``BehaviorTree`` with ``CompiledBehaviorTree``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_executor --nodes 4000 --ticks 200
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+from src.behavior_tree import (
+    ActionNode,
+    BehaviorTree,
+    ConditionNode,
+    Context,
+    InvertDecorator,
+    Node,
+    RepeatDecorator,
+    SelectorNode,
+    SequenceNode,
+)
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+from src.entities.context import ContextEntry
+
+
+class NullContext(Context):
+    """Context that drops history so only executor overhead is measured."""
+
+    def save(self, entry: ContextEntry) -> None:
+        pass
+
+
+def build_tree(nodes: int, fanout: int = 3) -> Node:
+    """Build a wide/deep tree of roughly ``nodes`` nodes that ticks every leaf."""
+    counter = 0
+
+    def leaf() -> Node:
+        nonlocal counter
+        counter += 1
+        if counter % 3 == 0:
+            return ConditionNode(Condition(id=f"c{counter}", name="condition", func=lambda: True))
+        if counter % 7 == 0:
+            return InvertDecorator(ActionNode(Action(id=f"a{counter}", name="action", func=lambda: False)))
+        return ActionNode(Action(id=f"a{counter}", name="action", func=lambda: True))
+
+    def build(budget: int, depth: int) -> Node:
+        if budget <= 1:
+            return leaf()
+        children: List[Node] = []
+        share = max(1, (budget - 1) // fanout)
+        remaining = budget - 1
+        while remaining > 0:
+            size = min(share, remaining)
+            children.append(build(size, depth + 1))
+            remaining -= size
+        if depth % 2:
+            # A selector whose first child fails keeps walking its siblings.
+            return SelectorNode([InvertDecorator(SequenceNode(children))] + [RepeatDecorator(leaf(), 1)])
+        return SequenceNode(children)
+
+    return build(nodes, 0)
+
+
+async def measure(factory: Callable[[Node], BehaviorTree], nodes: int, ticks: int) -> float:
+    tree = factory(build_tree(nodes))
+    tree.context = NullContext()
+    await tree.run()
+    started = time.perf_counter()
+    for _ in range(ticks):
+        await tree.run()
+    return (time.perf_counter() - started) / ticks
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=4000)
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    recursive = await measure(BehaviorTree, args.nodes, args.ticks)
+    compiled = await measure(CompiledBehaviorTree, args.nodes, args.ticks)
+    print(f"nodes={args.nodes} ticks={args.ticks}")
+    print(f"recursive: {recursive * 1e3:8.3f} ms/tick")
+    print(f"compiled:  {compiled * 1e3:8.3f} ms/tick")
+    print(f"speedup:   {recursive / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
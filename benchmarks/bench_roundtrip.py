@@ -0,0 +1,66 @@
+"""End-to-end round-trips against a local xNode server.
+
+Starts the server from ``main`` in-process on a free port, then measures
+``/register_action`` request/response round-trips and server-initiated
+invocations of an action served by an ``xNodeDispatcher`` client.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_roundtrip --quick
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+from typing import List
+
+import websockets
+
+from api.dispatcher import xNodeDispatcher
+from benchmarks.harness import Result, abench, report
+from common.codec import JsonCodec, subprotocols
+import main as server
+
+
+async def measure(port: int, iterations: int) -> List[Result]:
+    results = []
+    codec = JsonCodec()
+    async with websockets.connect(f"ws://localhost:{port}/register_action", subprotocols=[codec.subprotocol]) as ws:
+        names = (f"bench_{index}" for index in itertools.count())
+
+        async def register() -> None:
+            name = next(names)
+            await ws.send(codec.encode({'id': name, 'name': name}))
+            await ws.recv()
+
+        results.append(await abench("roundtrip.register_action", register, iterations))
+
+    for encoding in subprotocols():
+        dispatcher = xNodeDispatcher(f"ws://localhost:{port}/dispatcher", encodings=[encoding])
+        name = f"ping_{encoding.rpartition('.')[2]}"
+        await dispatcher.register_action(name, lambda: True)
+        results.append(await abench(f"roundtrip.invoke[{encoding}]", lambda: server.registry.invoke_action(name), iterations))
+        await dispatcher.close()
+    return results
+
+
+async def run(quick: bool = False) -> List[Result]:
+    for name in ('src.router', 'websockets'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    ws_server = await server.router.serve('localhost', 0, subprotocols=subprotocols())
+    try:
+        return await measure(ws_server.sockets[0].getsockname()[1], 500 if quick else 5_000)
+    finally:
+        ws_server.close()
+        await ws_server.wait_closed()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    report(await run(args.quick))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
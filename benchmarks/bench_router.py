@@ -0,0 +1,57 @@
+"""``Router.match`` throughput over static and parameterized routes.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_router --quick
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+from typing import List
+
+from benchmarks.harness import Result, bench, report
+from src.router import Router
+
+
+def build_router(routes: int, cache_size: int = 1024) -> Router:
+    router = Router(cache_size=cache_size)
+
+    async def endpoint(ws, path):
+        pass
+
+    for index in range(routes):
+        router.route(f"/static/{index}")(endpoint)
+        router.route(f"/agents{index}/{{agent_id}}/actions/{{action:\\w+}}")(endpoint)
+    return router
+
+
+async def run(quick: bool = False) -> List[Result]:
+    # Route registration logs every instance at INFO; keep it out of the timings.
+    logging.getLogger('src.router').setLevel(logging.WARNING)
+    rng = random.Random(0)
+    results = []
+    iterations = 5_000 if quick else 50_000
+    for routes in (10, 100):
+        router = build_router(routes)
+        static = itertools.cycle([f"/static/{rng.randrange(routes)}" for _ in range(256)])
+        dynamic = itertools.cycle([f"/agents{rng.randrange(routes)}/{rng.randrange(10**6)}/actions/move" for _ in range(256)])
+        unique = (f"/agents{routes - 1}/{index}/actions/move?attempt=1" for index in itertools.count())
+        missing = (f"/missing/{index}" for index in itertools.count())
+        results.append(bench(f"router.match.static[{routes}]", lambda: router.match(next(static)), iterations))
+        results.append(bench(f"router.match.cached[{routes}]", lambda: router.match(next(dynamic)), iterations))
+        results.append(bench(f"router.match.uncached[{routes}]", lambda: router.match(next(unique)), iterations))
+        results.append(bench(f"router.match.missing[{routes}]", lambda: router.match(next(missing)), iterations))
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    report(await run(args.quick))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""Measure how many trees one process can tick at a given rate.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_scheduler --trees 1000 2000 4000 --rate 10
+"""
+import argparse
+import asyncio
+
+from benchmarks.bench_executor import NullContext, build_tree
+from src.compiled_tree import CompiledBehaviorTree
+from src.scheduler import TreeScheduler
+
+
+async def measure(trees: int, rate: float, nodes: int, seconds: float) -> dict:
+    scheduler = TreeScheduler(rate=rate, on_overrun=lambda scheduled, duration: None)
+    for tree in [CompiledBehaviorTree(build_tree(nodes), NullContext()) for _ in range(trees)]:
+        scheduler.add(tree)
+    scheduler.start()
+    await asyncio.sleep(seconds)
+    await scheduler.stop()
+    stats = scheduler.stats()
+    stats['achieved'] = stats['ticks'] / seconds
+    stats['target'] = trees * rate
+    return stats
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trees", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--rate", type=float, default=10.0)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'trees':>7} {'target/s':>10} {'ticks/s':>10} {'skipped':>8} {'overruns':>8} {'lag p99 ms':>10}")
+    for trees in args.trees:
+        stats = await measure(trees, args.rate, args.nodes, args.seconds)
+        print(f"{trees:>7} {stats['target']:>10.0f} {stats['achieved']:>10.0f} {stats['skipped']:>8} "
+              f"{stats['overruns']:>8} {stats['lag']['p99'] * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""Tick latency of ``BehaviorTree.run`` on synthetic deep and wide trees.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_tree --quick
+"""
+import argparse
+import asyncio
+from typing import List
+
+from benchmarks.bench_executor import NullContext, build_tree
+from benchmarks.harness import Result, abench, bench, report
+from src.behavior_tree import BehaviorTree
+from src.compiled_tree import CompiledBehaviorTree
+
+# (label, nodes, fanout): fanout 2 gives deep trees, fanout 32 wide ones.
+SHAPES = [
+    ('deep', 1000, 2),
+    ('wide', 1000, 32),
+    ('large', 10000, 4),
+]
+
+
+async def run(quick: bool = False) -> List[Result]:
+    results = []
+    for label, nodes, fanout in SHAPES:
+        if quick:
+            nodes //= 10
+        for factory in (BehaviorTree, CompiledBehaviorTree):
+            tree = factory(build_tree(nodes, fanout), NullContext())
+            iterations = max(20, 200_000 // nodes)
+            results.append(await abench(f"tree.{factory.__name__}.{label}[{nodes}]", tree.run, iterations // (5 if quick else 1)))
+            results.append(bench(f"tree.{factory.__name__}.instance.{label}[{nodes}]", tree.instance, 1_000 if quick else 10_000))
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    report(await run(args.quick))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""Timing and memory helpers shared by the benchmark modules.
+
+Every benchmark times each operation individually (after a warmup) so that
+p50/p99 latencies come from real samples rather than averages, then repeats
+a shorter pass under ``tracemalloc`` to report peak memory separately;
+tracing slows Python down too much to time the same pass.
+"""
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class Result:
+    name: str
+    samples: List[float] = field(repr=False)
+    peak_memory: int = 0
+
+    @property
+    def ops_per_second(self) -> float:
+        total = sum(self.samples)
+        return len(self.samples) / total if total else 0.0
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ops': len(self.samples),
+            'ops_per_second': self.ops_per_second,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'peak_memory': self.peak_memory,
+        }
+
+
+def bench(name: str, func: Callable[[], Any], iterations: int, warmup: int = 10, memory_iterations: Optional[int] = None) -> Result:
+    for _ in range(warmup):
+        func()
+    samples = []
+    clock = time.perf_counter
+    gc.collect()
+    for _ in range(iterations):
+        started = clock()
+        func()
+        samples.append(clock() - started)
+    return Result(name, samples, _peak(lambda: [func() for _ in range(memory_iterations or max(1, iterations // 10))]))
+
+
+async def abench(name: str, func: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 10, memory_iterations: Optional[int] = None) -> Result:
+    for _ in range(warmup):
+        await func()
+    samples = []
+    clock = time.perf_counter
+    gc.collect()
+    for _ in range(iterations):
+        started = clock()
+        await func()
+        samples.append(clock() - started)
+
+    async def repeat() -> None:
+        for _ in range(memory_iterations or max(1, iterations // 10)):
+            await func()
+
+    return Result(name, samples, await _apeak(repeat))
+
+
+def _peak(func: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def _apeak(func: Callable[[], Awaitable[Any]]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(results: List[Result]) -> None:
+    width = max([len(result.name) for result in results] + [9])
+    print(f"{'benchmark':<{width}} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>10}")
+    for result in results:
+        print(f"{result.name:<{width}} {result.ops_per_second:>12.0f} {result.percentile(0.5) * 1e6:>10.1f} "
+              f"{result.percentile(0.99) * 1e6:>10.1f} {result.peak_memory / 1024:>10.1f}")
@@ -0,0 +1,51 @@
+"""Run the benchmark suite and optionally save the results as JSON.
+
+Run from the repository root::
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --only tree router --json results.json
+
+Inputs are generated from fixed seeds, so results from two revisions on the
+same machine can be compared directly.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+
+from benchmarks import bench_batch, bench_context, bench_roundtrip, bench_router, bench_tree
+from benchmarks.harness import report
+
+SUITES = {
+    'tree': bench_tree,
+    'context': bench_context,
+    'router': bench_router,
+    'roundtrip': bench_roundtrip,
+    'batch': bench_batch,
+}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller inputs and fewer iterations")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--json", metavar="PATH", help="write the results to PATH")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.only:
+        results.extend(await SUITES[name].run(args.quick))
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': sys.version,
+                'platform': platform.platform(),
+                'quick': args.quick,
+                'results': [result.to_dict() for result in results],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Union
+
+from common.error import xNodeError
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Codec(ABC):
+    """Encodes protocol messages for one WebSocket subprotocol."""
+
+    subprotocol: str
+
+    @abstractmethod
+    def encode(self, message: Any) -> Union[str, bytes]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, data: Union[str, bytes]) -> Any:
+        raise NotImplementedError()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.subprotocol})"
+
+
+class JsonCodec(Codec):
+    """Compact JSON text frames; used when the peer negotiates nothing else."""
+
+    subprotocol = "xnode.json"
+
+    def encode(self, message: Any) -> str:
+        return json.dumps(message, separators=(',', ':'))
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack binary frames; requires the optional ``msgpack`` package."""
+
+    subprotocol = "xnode.msgpack"
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise xNodeError("The msgpack package is required for the xnode.msgpack subprotocol.")
+
+    def encode(self, message: Any) -> bytes:
+        return msgpack.packb(message)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return msgpack.unpackb(data)
+
+
+CODECS: Dict[str, type] = {
+    MsgpackCodec.subprotocol: MsgpackCodec,
+    JsonCodec.subprotocol: JsonCodec,
+}
+_instances: Dict[Optional[str], Codec] = {}
+
+
+def subprotocols() -> List[str]:
+    """Subprotocols available in this process, most compact first."""
+    return [name for name in CODECS if name != MsgpackCodec.subprotocol or msgpack is not None]
+
+
+def codec_for(subprotocol: Optional[str]) -> Codec:
+    """Return the codec for a negotiated subprotocol; no subprotocol means JSON."""
+    codec = _instances.get(subprotocol)
+    if codec is None:
+        if subprotocol is not None and subprotocol not in CODECS:
+            raise xNodeError(f"Unsupported subprotocol '{subprotocol}'.")
+        codec = _instances[subprotocol] = CODECS.get(subprotocol, JsonCodec)()
+    return codec
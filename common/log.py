@@ -0,0 +1,123 @@
+import atexit
+import logging
+import os
+import queue
+from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+FORMAT = '%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s'
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['LazyQueueHandler'] = None
+
+
+# Arguments of these types cannot change before the listener formats them.
+IMMUTABLE = (str, bytes, int, float, complex, type(None), Enum)
+
+
+def _immutable(value: Any) -> bool:
+    if isinstance(value, tuple):
+        return all(_immutable(item) for item in value)
+    return isinstance(value, IMMUTABLE)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock ``QueueHandler`` merges ``msg % args`` on the calling thread;
+    here a record whose arguments are all immutable (numbers, strings, enum
+    members and tuples of them) is enqueued as is, so the event loop only
+    pays for creating it. Records with other arguments or with exception
+    info are formatted eagerly, as the stock handler does, since the objects
+    may change before the listener gets to them.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if isinstance(args, dict):
+            args = tuple(args.values())
+        if record.exc_info or not _immutable(args or ()):
+            return super().prepare(record)
+        return record
+
+
+class Sampler(logging.Filter):
+    """Lets through the first of every ``every`` records per message template.
+
+    The record that is let through after others were dropped mentions how
+    many were suppressed. Only records at or below ``max_level`` are sampled;
+    warnings and errors always pass by default.
+    """
+
+    def __init__(self, every: int, max_level: int = logging.INFO) -> None:
+        super().__init__()
+        self.every = every
+        self.max_level = max_level
+        self._counts: Dict[Tuple[str, object], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or record.levelno > self.max_level:
+            return True
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        if not count and len(self._counts) >= 4096:
+            # Templates built with f-strings never repeat; do not grow forever.
+            self._counts.clear()
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.msg = f"{record.msg} [{self.every - 1} similar suppressed]"
+        return True
+
+
+def configure(level: Union[int, str] = logging.INFO, sample_every: int = 1, sampled: Iterable[str] = ()) -> QueueListener:
+    """Route all logging through a queue drained by a background thread.
+
+    Replaces the root logger's handlers with a ``LazyQueueHandler``; records
+    are formatted and written to stderr by a ``QueueListener``. The loggers
+    named in ``sampled`` only emit one in ``sample_every`` records per
+    message template. Forked processes get their own listener.
+    """
+    global _listener, _queue_handler
+    stop()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(FORMAT))
+    _queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name in sampled:
+        logger = logging.getLogger(name)
+        for existing in [f for f in logger.filters if isinstance(f, Sampler)]:
+            logger.removeFilter(existing)
+        logger.addFilter(Sampler(sample_every))
+    _listener = QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _after_fork() -> None:
+    # The listener thread does not survive a fork: give the child a fresh
+    # queue (records still queued in the parent stay there) and a thread.
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(stop)
@@ -15,5 +15,17 @@ class xNodeResult:
     def is_running(self):
         return self.status == xNodeStatus.Running
 
+    def to_dict(self):
+        """Wire schema: ``{"status": <xNodeStatus value>, "value": ..., "error": <str or None>}``."""
+        return {
+            'status': self.status.value,
+            'value': self.value,
+            'error': None if self.error is None else str(self.error),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(xNodeStatus(data['status']), data.get('value'), data.get('error'))
+
     def __repr__(self):
         return f"xNodeResult(status={self.status}, value={self.value}, error={self.error})"
@@ -1,32 +1,209 @@
 import asyncio
 import http
 import json
+import signal
+import socket
+from pathlib import Path
 from typing import Callable, Dict, List
 from mediatr import Mediator
 import websockets
+from common import log
+from common.codec import codec_for, subprotocols
+from common.config import Config
+from common.error import xNodeError
 from src.handlers.actions.register_action import RegisterActionCommandHandler
+from src.handlers.batch.register_batch import RegisterBatchCommandHandler
+from src.handlers.conditions.register_condition import RegisterConditionCommandHandler
 from src.requests.actions.register_action import RegisterActionRequest
+from src.requests.batch.register_batch import RegisterBatchRequest
+from src.requests.conditions.register_condition import RegisterConditionRequest
+from src.behavior_tree import CircuitBreaker
+from src.launcher import Launcher
+from src.loader import TreeDirectory, TreeLoader
+from src.metrics import TickMetrics
+from src.peers import Peers
+from src.pools import pools
+from src.registry import RemoteClient, xNodeRegistry
 from src.router import Router
+from src.scheduler import TreeScheduler
+from src.snapshot import SnapshotStore
 
-users: List[websockets.WebSocketServerProtocol] = []
-actions: Dict[str, Callable] = {}
-conditions: Dict[str, Callable] = {}
-router = Router()
-mediator = Mediator()
+config = Config('config.toml')
+log.configure(config.get('logging', 'level', 'INFO'), config.get('logging', 'sample_every', 1), sampled=('src.router', 'src.scheduler', 'websockets.server'))
+pools.configure(config)
+router = Router(max_connections=config.get('server', 'max_connections'))
+registry = xNodeRegistry(
+    invoke_timeout=config.get('server', 'invoke_timeout'),
+    max_pending_sends=config.get('server', 'max_pending_sends'),
+    send_timeout=config.get('server', 'send_timeout'),
+    stats=router.stats,
+)
+metrics = TickMetrics()
+scheduler = TreeScheduler(rate=config.get('scheduler', 'rate', 10.0))
+
+def snapshot_store(index: int = None):
+    """Store for tree snapshots under ``[snapshot] path``; workers get a file each and restore from all of them."""
+    path = config.get('snapshot', 'path')
+    if not path:
+        return None
+    own = Path(path if index is None else f"{path}.{index}")
+    shared = [other for other in own.parent.glob(f"{Path(path).name}*") if other != own and other.suffix != '.tmp']
+    return SnapshotStore(own, shared, fsync=config.get('snapshot', 'fsync', True))
+
+breaker = CircuitBreaker(config.get('circuit_breaker', 'failure_threshold', 5), config.get('circuit_breaker', 'reset_timeout', 30.0))
+trees = TreeDirectory(
+    TreeLoader(registry, breaker=breaker),
+    config.get('trees', 'directory', 'trees'),
+    scheduler,
+    config.get('trees', 'rate'),
+    store=snapshot_store(),
+    metrics=metrics,
+    probe_nodes=config.get('metrics', 'nodes', False),
+)
+mediator = Mediator(handler_class_manager=lambda handler_cls, is_behavior=False: handler_cls(registry))
 mediator.register_handler(RegisterActionCommandHandler)
+mediator.register_handler(RegisterConditionCommandHandler)
+mediator.register_handler(RegisterBatchCommandHandler)
+registrations = {
+    'register_action': RegisterActionRequest,
+    'register_condition': RegisterConditionRequest,
+}
   
 @router.route("/register_action")
 async def register_action(ws, path):
-    request = RegisterActionRequest(**json.loads(await ws.recv()))
-    result = await mediator.send_async(request)
-    await ws.send(str(result))
+    await serve_registrations(ws, 'register_action')
+
+@router.route("/register_condition")
+async def register_condition(ws, path):
+    await serve_registrations(ws, 'register_condition')
+
+@router.route("/register_batch")
+async def register_batch(ws, path):
+    await serve_registrations(ws, None)
+
+async def serve_registrations(ws, command):
+    """Answer every message on ``ws`` with one result.
 
-async def main():
-    server = await router.serve('localhost', 1337)
-    await server.wait_closed()
+    A message is a single registration, an array of them or, on
+    ``/register_batch``, ``{"items": [...]}`` with mixed commands; arrays are
+    registered in bulk and answered with one aggregated result.
+    """
+    async with registry.connection(ws) as client:
+        async for message in ws:
+            payload = client.codec.decode(message)
+            if client.resolve(payload):
+                continue
+            if isinstance(payload, list):
+                items = [{**item, 'command': command} if command and isinstance(item, dict) else item for item in payload]
+                result = await mediator.send_async(RegisterBatchRequest(items, client=client))
+            elif command is None:
+                result = await mediator.send_async(RegisterBatchRequest(payload.get('items', []), client=client))
+            else:
+                result = await mediator.send_async(registrations[command](**payload, client=client))
+            await reply(client, result.to_dict())
+
+@router.route("/dispatcher")
+async def dispatcher(ws, path):
+    async with registry.connection(ws) as client:
+        async for message in ws:
+            request = client.codec.decode(message)
+            if client.resolve(request):
+                continue
+            command = request.get('command')
+            response = {'request_id': request.get('request_id')}
+            if command == 'register_batch':
+                response['result'] = (await mediator.send_async(RegisterBatchRequest(request.get('items', []), client=client))).to_dict()
+            elif command in registrations:
+                response['result'] = (await register(request, client)).to_dict()
+            else:
+                response['error'] = f"Unknown command '{command}'"
+            await reply(client, response)
+
+async def reply(client: RemoteClient, message: Dict):
+    """Send ``message`` to ``client``, dropping it if the client's send queue stays full.
+
+    ``RemoteClient.send`` counts the drop in ``router.stats``; the handler
+    keeps serving the connection.
+    """
+    try:
+        await client.send(message)
+    except xNodeError:
+        pass
+
+async def register(item: Dict, client: RemoteClient):
+    request = registrations[item['command']](id=item['id'], name=item['name'], client=client)
+    return await mediator.send_async(request)
+
+@router.route("/metrics")
+class MetricsRoute:
+    async def process_request(self, path, headers):
+        if headers.get('Upgrade', '').lower() == 'websocket':
+            return None
+        body = json.dumps(metrics.snapshot()).encode()
+        return http.HTTPStatus.OK, [('Content-Type', 'application/json')], body
+
+    async def handle(self, ws, path):
+        codec = codec_for(ws.subprotocol)
+        try:
+            while True:
+                await ws.send(codec.encode(metrics.snapshot()))
+                await asyncio.sleep(config.get('metrics', 'interval', 1.0))
+        except websockets.ConnectionClosed:
+            pass
+
+@router.route("/connections")
+class ConnectionsRoute:
+    async def process_request(self, path, headers):
+        body = json.dumps(router.stats.to_dict()).encode()
+        return http.HTTPStatus.OK, [('Content-Type', 'application/json')], body
+
+async def main(sock: socket.socket = None):
+    options = {
+        'subprotocols': subprotocols(),
+        'ping_interval': config.get('server', 'ping_interval', 20.0),
+        'ping_timeout': config.get('server', 'ping_timeout', 20.0),
+    }
+    if sock is None:
+        server = await router.serve(config.get('server', 'host', 'localhost'), config.get('server', 'port', 8765), **options)
+    else:
+        server = await router.serve(None, None, sock=sock, **options)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+    if registry.peers is not None:
+        await registry.peers.start()
+    scheduler.start()
+    watcher = asyncio.create_task(trees.watch(config.get('trees', 'interval', 2.0)))
+    persister = asyncio.create_task(trees.persist(config.get('snapshot', 'interval', 5.0)))
+    try:
+        await server.wait_closed()
+    finally:
+        watcher.cancel()
+        persister.cancel()
+        await scheduler.stop()
+        if registry.peers is not None:
+            registry.peers.close()
+        if trees.store is not None:
+            trees.snapshot()
+            trees.store.close()
+        pools.shutdown(wait=False)
+
+def serve_worker(sock: socket.socket, index: int, peers: Dict[int, socket.socket], control: socket.socket):
+    trees.partition = (index, config.get('server', 'workers', 1))
+    trees.store = snapshot_store(index)
+    # Clients connect to whichever worker the kernel picks; invocations
+    # their worker's trees cannot serve locally go to the other workers.
+    registry.peers = Peers(peers, registry.invoke_local, control)
+    try:
+        asyncio.run(main(sock))
+    finally:
+        # Workers exit without running atexit hooks; flush what is queued.
+        log.stop()
 
 if __name__ == '__main__':
+    workers = config.get('server', 'workers', 1)
     try:
-        asyncio.run(main())
+        if workers > 1:
+            Launcher(serve_worker, workers, config.get('server', 'host', 'localhost'), config.get('server', 'port', 8765)).run()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         pass
\ No newline at end of file
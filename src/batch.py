@@ -0,0 +1,351 @@
+import asyncio
+from datetime import datetime
+from functools import partial
+from time import perf_counter, time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from common.error import xNodeError
+from common.result import xNodeResult, xNodeStatus
+from src.behavior_tree import (
+    ActionNode,
+    ConditionNode,
+    Context,
+    InvertDecorator,
+    Node,
+    ParallelNode,
+    RepeatDecorator,
+    RepeatUntilSuccessDecorator,
+    SelectorNode,
+    SequenceNode,
+    TimeoutDecorator,
+    layout,
+    subtree_slots,
+    to_result,
+    walk,
+)
+from src.entities.context import ContextEntry
+from src.entities.execution_policy import ExecutionPolicy
+from src.metrics import ProbeNode
+from src.pools import pools
+
+SUCCESS = xNodeStatus.Success
+FAILURE = xNodeStatus.Failure
+RUNNING = xNodeStatus.Running
+
+
+class Agents:
+    """The agents a vectorized action or condition is evaluated for.
+
+    ``indices`` are the agents' positions in the ``BatchTree`` and line up
+    with ``contexts``; use them to select rows of the batch ``columns``
+    (``columns['hp'][agents.indices]`` with NumPy arrays). The function
+    returns one value per agent in the same order, e.g. a boolean mask.
+    """
+
+    __slots__ = ('indices', 'contexts', 'columns')
+
+    def __init__(self, indices: List[int], contexts: List[Context], columns: Mapping[str, Any]) -> None:
+        self.indices = indices
+        self.contexts = contexts
+        self.columns = columns
+
+    def column(self, name: str) -> List[Any]:
+        """The values of column ``name`` for these agents."""
+        values = self.columns[name]
+        return [values[index] for index in self.indices]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+
+class BatchTree:
+    """Ticks one node graph for many agents at once.
+
+    Every agent has its own ``Context``, as with ``BehaviorTree.instance``,
+    but each node is visited once per tick for all agents that reach it.
+    Actions and conditions declared ``vectorized`` are called once with an
+    ``Agents`` view instead of once per agent; sequences, selectors and
+    decorators split the agents by the statuses their children report.
+    Other leaves are ticked per agent with their usual semantics, and so are
+    node types this executor does not know.
+
+    Vectorized actions cannot be ``long_running`` and must not return
+    handles; returning ``xNodeStatus.Running`` for an agent is fine.
+    """
+
+    def __init__(self, root: Node, contexts: Iterable[Context] = (), columns: Optional[Dict[str, Any]] = None) -> None:
+        for node in walk(root):
+            if isinstance(node, ActionNode) and node.child.vectorized and node.child.long_running:
+                raise xNodeError(f"Vectorized action {node.child.id} cannot be long_running.")
+        self.root = root
+        self.size = layout(root)
+        self.columns: Dict[str, Any] = columns if columns is not None else {}
+        self.contexts: List[Context] = []
+        self._ticks: Dict[type, Callable[[Any, List[int]], Any]] = {
+            ActionNode: self._action,
+            ConditionNode: self._condition,
+            SequenceNode: partial(self._sequence, stop=FAILURE),
+            SelectorNode: partial(self._sequence, stop=SUCCESS),
+            ParallelNode: self._parallel,
+            InvertDecorator: self._invert,
+            RepeatDecorator: self._repeat,
+            RepeatUntilSuccessDecorator: self._repeat,
+            TimeoutDecorator: self._timeout,
+            ProbeNode: self._probe,
+        }
+        for context in contexts:
+            self.add(context)
+
+    def add(self, context: Optional[Context] = None) -> int:
+        """Add an agent; returns its index in ``contexts`` and the batch columns."""
+        context = context if context is not None else Context()
+        if len(context.state) < self.size:
+            context.state.extend([0] * (self.size - len(context.state)))
+        self.contexts.append(context)
+        return len(self.contexts) - 1
+
+    def __len__(self) -> int:
+        return len(self.contexts)
+
+    async def run(self) -> List[xNodeStatus]:
+        """Tick every agent once; returns their statuses by index."""
+        for context in self.contexts:
+            context.ticks += 1
+        return await self.tick(self.root, list(range(len(self.contexts))))
+
+    async def tick(self, node: Node, agents: List[int]) -> List[xNodeStatus]:
+        """Tick ``node`` for ``agents``; returns their statuses in the same order."""
+        if not agents:
+            return []
+        tick = self._ticks.get(type(node))
+        if tick is None:
+            return await self.__each(node, agents)
+        return await tick(node, agents)
+
+    async def __each(self, node: Node, agents: List[int]) -> List[xNodeStatus]:
+        contexts = self.contexts
+        return [(await node.tick(contexts[agent])).status for agent in agents]
+
+    async def __call(self, func: Callable[[Agents], Any], policy: ExecutionPolicy, agents: List[int]) -> Sequence[Any]:
+        view = Agents(agents, [self.contexts[agent] for agent in agents], self.columns)
+        if policy == ExecutionPolicy.Inline:
+            values = func(view)
+            if asyncio.iscoroutine(values):
+                values = await values
+        else:
+            values = await pools.run(partial(func, view), policy)
+        if len(values) != len(agents):
+            raise xNodeError(f"Vectorized function returned {len(values)} values for {len(agents)} agents.")
+        return values
+
+    async def _condition(self, node: ConditionNode, agents: List[int]) -> List[xNodeStatus]:
+        condition = node.child
+        if not condition.vectorized:
+            return await self.__each(node, agents)
+        mask = await self.__call(condition.func, condition.policy, agents)
+        id, now, contexts = condition.id, datetime.now(), self.contexts
+        # Results are never mutated, so agents share one per outcome.
+        success, failure = xNodeResult(SUCCESS, True), xNodeResult(FAILURE, False)
+        statuses = []
+        for agent, value in zip(agents, mask):
+            if value:
+                contexts[agent].save(ContextEntry(id=id, time=now, result=success))
+                statuses.append(SUCCESS)
+            else:
+                contexts[agent].save(ContextEntry(id=id, time=now, result=failure))
+                statuses.append(FAILURE)
+        return statuses
+
+    async def _action(self, node: ActionNode, agents: List[int]) -> List[xNodeStatus]:
+        action = node.child
+        if not action.vectorized:
+            return await self.__each(node, agents)
+        contexts, slot = self.contexts, node.slot
+        count = action.repeat_count if action.repeat else 1
+        statuses: Dict[int, xNodeStatus] = {}
+        active = agents
+        if action.execute_once:
+            active = [agent for agent in agents if not contexts[agent].has_completed(action.id)]
+        while active:
+            values = await self.__call(action.func, action.policy, active)
+            id, now = action.id, datetime.now()
+            success, failure = xNodeResult(SUCCESS, True), xNodeResult(FAILURE, False)
+            again = []
+            for agent, value in zip(active, values):
+                if value is True:
+                    result = success
+                elif value is False:
+                    result = failure
+                else:
+                    result = to_result(value)
+                    if result.status == RUNNING:
+                        statuses[agent] = RUNNING
+                        continue
+                context = contexts[agent]
+                if action.execute_once:
+                    context.complete(ContextEntry(id=id, time=now, result=result))
+                else:
+                    context.save(ContextEntry(id=id, time=now, result=result))
+                state = context.state
+                if result.status == FAILURE:
+                    state[slot] = 0
+                    statuses[agent] = FAILURE
+                elif state[slot] + 1 < count:
+                    state[slot] += 1
+                    again.append(agent)
+                else:
+                    state[slot] = 0
+                    statuses[agent] = SUCCESS
+            active = again
+        return [statuses.get(agent, SUCCESS) for agent in agents]
+
+    async def _sequence(self, node: Node, agents: List[int], stop: xNodeStatus) -> List[xNodeStatus]:
+        # Sequences stop at the first Failure, selectors at the first Success;
+        # agents resume at the child they were Running in, so they are
+        # grouped by child and each child is ticked once for its group.
+        contexts, slot = self.contexts, node.slot
+        children = node.children
+        done = FAILURE if stop == SUCCESS else SUCCESS
+        groups: List[List[int]] = [[] for _ in children]
+        statuses: Dict[int, xNodeStatus] = {}
+        for agent in agents:
+            index = contexts[agent].state[slot]
+            if index < len(children):
+                groups[index].append(agent)
+            else:
+                contexts[agent].state[slot] = 0
+        for index, child in enumerate(children):
+            group = groups[index]
+            if not group:
+                continue
+            for agent, status in zip(group, await self.tick(child, group)):
+                state = contexts[agent].state
+                if status == RUNNING:
+                    state[slot] = index
+                    statuses[agent] = RUNNING
+                elif status == stop:
+                    state[slot] = 0
+                    statuses[agent] = stop
+                elif index + 1 < len(children):
+                    state[slot] = index + 1
+                    groups[index + 1].append(agent)
+                else:
+                    state[slot] = 0
+        return [statuses.get(agent, done) for agent in agents]
+
+    async def _invert(self, node: InvertDecorator, agents: List[int]) -> List[xNodeStatus]:
+        inverted = {SUCCESS: FAILURE, FAILURE: SUCCESS, RUNNING: RUNNING}
+        return [inverted[status] for status in await self.tick(node.child, agents)]
+
+    async def _repeat(self, node: Node, agents: List[int]) -> List[xNodeStatus]:
+        # RepeatDecorator repeats while its child succeeds, RepeatUntilSuccess
+        # while it fails; either gives up after ``count`` rounds.
+        contexts, slot = self.contexts, node.slot
+        if isinstance(node, RepeatDecorator):
+            count, again, exhausted = node.repeat_count, SUCCESS, SUCCESS
+        else:
+            count, again, exhausted = node.max_retries, FAILURE, FAILURE
+        statuses: Dict[int, xNodeStatus] = {}
+        active = []
+        for agent in agents:
+            if contexts[agent].state[slot] < count:
+                active.append(agent)
+            else:
+                contexts[agent].state[slot] = 0
+        while active:
+            remaining = []
+            for agent, status in zip(active, await self.tick(node.child, active)):
+                state = contexts[agent].state
+                if status == RUNNING:
+                    statuses[agent] = RUNNING
+                elif status != again:
+                    state[slot] = 0
+                    statuses[agent] = status
+                else:
+                    state[slot] += 1
+                    if state[slot] < count:
+                        remaining.append(agent)
+                    else:
+                        state[slot] = 0
+            active = remaining
+        return [statuses.get(agent, exhausted) for agent in agents]
+
+    async def _parallel(self, node: ParallelNode, agents: List[int]) -> List[xNodeStatus]:
+        # Children are ticked one after another for all undecided agents;
+        # an agent drops out as soon as its outcome is known, like
+        # ``tick_concurrently`` cancelling the children still in flight.
+        contexts, slot = self.contexts, node.slot
+        total, threshold = len(node.children), node.success_threshold
+        results = {}
+        for agent in agents:
+            results[agent] = contexts[agent].state[slot] or [None] * total
+            contexts[agent].state[slot] = results[agent]
+        statuses: Dict[int, xNodeStatus] = {}
+        undecided = list(agents)
+        for index, child in enumerate(node.children):
+            group = [agent for agent in undecided if results[agent][index] in (None, RUNNING)]
+            for agent, status in zip(group, await self.tick(child, group)):
+                results[agent][index] = status
+            remaining = []
+            for agent in undecided:
+                children = results[agent]
+                if children.count(SUCCESS) >= threshold:
+                    statuses[agent] = SUCCESS
+                elif children.count(FAILURE) > total - threshold:
+                    statuses[agent] = FAILURE
+                else:
+                    remaining.append(agent)
+                    continue
+                for other, result in enumerate(children):
+                    if result is None or result == RUNNING:
+                        contexts[agent].reset(subtree_slots(node.children[other]))
+                contexts[agent].state[slot] = 0
+            undecided = remaining
+            if not undecided:
+                break
+        return [statuses.get(agent, RUNNING) for agent in agents]
+
+    async def _timeout(self, node: TimeoutDecorator, agents: List[int]) -> List[xNodeStatus]:
+        # Every agent keeps its own deadline across ticks; the group is ticked
+        # until the latest of them, and agents past theirs by then fail.
+        contexts, slot = self.contexts, node.slot
+        now = time()
+        deadlines = {agent: contexts[agent].state[slot] or now + node.timeout for agent in agents}
+        active = [agent for agent in agents if deadlines[agent] > now]
+        statuses = dict.fromkeys(agents, FAILURE)
+        if active:
+            try:
+                results = await asyncio.wait_for(self.tick(node.child, active), timeout=max(deadlines[agent] for agent in active) - now)
+            except asyncio.TimeoutError:
+                results = [FAILURE] * len(active)
+                active = []
+            now = time()
+            for agent, status in zip(active, results):
+                if deadlines[agent] > now:
+                    statuses[agent] = status
+        slots = None
+        for agent in agents:
+            state = contexts[agent].state
+            if statuses[agent] == RUNNING:
+                state[slot] = deadlines[agent]
+                continue
+            state[slot] = 0
+            if statuses[agent] == FAILURE and deadlines[agent] <= now:
+                slots = slots or subtree_slots(node.child)
+                contexts[agent].reset(slots)
+        return [statuses[agent] for agent in agents]
+
+    async def _probe(self, node: ProbeNode, agents: List[int]) -> List[xNodeStatus]:
+        if not node.metrics.enabled:
+            return await self.tick(node.child, agents)
+        metrics = node.metrics.node(node.node_id)
+        metrics.in_flight += 1
+        started = perf_counter()
+        try:
+            statuses = await self.tick(node.child, agents)
+        finally:
+            metrics.in_flight -= 1
+        metrics.duration.observe(perf_counter() - started)
+        for status in statuses:
+            metrics.statuses[status] += 1
+        return statuses
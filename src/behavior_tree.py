@@ -1,51 +1,231 @@
 from abc import ABC, abstractmethod
 import asyncio
+from collections import OrderedDict
+import logging
+import random
 from dataclasses import asdict
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from datetime import datetime, timedelta
+from itertools import islice
+from time import monotonic, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from common.error import xNodeError
 from common.result import xNodeResult, xNodeStatus
+from src.blackboard import Blackboard
 from src.entities.action import Action
 from src.entities.condition import Condition
 from src.entities.context import ContextEntry
+from src.entities.execution_policy import ExecutionPolicy
+from src.pools import pools
+
+logger = logging.getLogger(__name__)
 
 class Context:
-    def __init__(self) -> None:
-        self._history: List[ContextEntry] = []
+    """History of node results, indexed by id and bounded by retention.
+
+    ``_history`` maps each id to its entry in recency order, so lookups are
+    O(1) and the oldest entries sit at the front, where they are evicted once
+    there are more than ``max_entries`` of them or they are older than
+    ``max_age`` seconds. Ids of ``execute_once`` actions that ran are kept
+    in ``completed``, outside the bounded history, so retention never makes
+    them run again.
+
+    ``evaluations`` memoizes the results of conditions that declare
+    ``depends_on``, keyed by condition id together with the ``blackboard``
+    versions of their dependencies at evaluation time.
+
+    ``memo`` holds the results of conditions that opt into caching with
+    ``cache_per_tick`` (reused until ``ticks`` moves on) and/or ``cache_ttl``
+    (reused for that many seconds); ``cache_hits``/``cache_misses`` count
+    lookups against it.
+
+    ``state`` and ``handles`` hold the tick progress of the tree run with
+    this context, indexed by node ``slot`` (see ``layout``): node objects
+    themselves are immutable, so one graph can be shared by many contexts.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_age: Optional[float] = None, blackboard: Optional[Blackboard] = None) -> None:
+        self._history: OrderedDict[str, ContextEntry] = OrderedDict()
+        self.completed: Set[str] = set()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.blackboard = blackboard
+        self.evaluations: Dict[str, Tuple[Tuple[int, ...], xNodeResult]] = {}
+        self.memo: Dict[str, Tuple[int, Optional[float], xNodeResult]] = {}
+        self.ticks = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.state: List[Any] = []
+        self.handles: Dict[int, asyncio.Future] = {}
 
     def save(self, entry : ContextEntry) -> None:
-        if entry.id not in self._history:
-            self._history.append(entry)
-            
-    def update(self, entry : ContextEntry) -> bool:
-        for entry in self._history:
-            if entry.id == entry.id:
-                entry.result = entry.result
-                entry.time = datetime.now()
-                return True
+        """Record ``entry`` as the latest result of its id, replacing an older one."""
+        self._history[entry.id] = entry
+        self._history.move_to_end(entry.id)
+        self.__evict()
+
+    def complete(self, entry : ContextEntry) -> None:
+        """``save`` the result of an ``execute_once`` action and remember that it ran."""
+        self.completed.add(entry.id)
         self.save(entry)
-            
+
+    def update(self, entry : ContextEntry) -> bool:
+        current = self._history.get(entry.id)
+        if current is None:
+            self.save(entry)
+            return False
+        current.result = entry.result
+        current.time = datetime.now()
+        self._history.move_to_end(entry.id)
+        self.__evict()
+        return True
+
     def remove(self, action_id: str) -> None:
-        self._history = [entry for entry in self._history if entry.id != action_id]
-          
+        self._history.pop(action_id, None)
+
     def get(self, template: Optional[Callable[[ContextEntry], bool]] = None) -> List[ContextEntry]:
+        self.__evict()
         if template is None:
-            return self._history.copy()
+            return list(self._history.values())
         else:
-            return [entry for entry in self._history if template(entry)]
-    
+            return [entry for entry in self._history.values() if template(entry)]
+
     def has_completed(self, action_id: str) -> bool:
-        return any(entry.id == action_id for entry in self._history)
-    
+        if action_id in self.completed:
+            return True
+        entry = self._history.get(action_id)
+        if entry is None:
+            return False
+        if self.max_age is not None and entry.time < datetime.now() - timedelta(seconds=self.max_age):
+            del self._history[action_id]
+            return False
+        return True
+
+    def dependency_versions(self, condition: Condition) -> Optional[Tuple[int, ...]]:
+        if not condition.depends_on or self.blackboard is None:
+            return None
+        return self.blackboard.versions(condition.depends_on)
+
+    def cached(self, condition: Condition) -> Optional[xNodeResult]:
+        entry = self.memo.get(condition.id)
+        if entry is not None:
+            tick, expires, result = entry
+            if (not condition.cache_per_tick or tick == self.ticks) and (expires is None or expires > monotonic()):
+                self.cache_hits += 1
+                return result
+            del self.memo[condition.id]
+        self.cache_misses += 1
+        return None
+
+    def memoize(self, condition: Condition, result: xNodeResult) -> None:
+        expires = monotonic() + condition.cache_ttl if condition.cache_ttl is not None else None
+        self.memo[condition.id] = (self.ticks, expires, result)
+
+    def reset(self, slots: Iterable[int]) -> None:
+        """Forget the progress kept in ``slots``, cancelling the actions running in them."""
+        state, handles = self.state, self.handles
+        for slot in slots:
+            state[slot] = 0
+            handle = handles.pop(slot, None)
+            if handle is not None:
+                handle.cancel()
+
     def clear(self) -> None:
         self._history.clear()
-        
+        self.completed.clear()
+        self.evaluations.clear()
+        self.memo.clear()
+
+    def __evict(self) -> None:
+        history = self._history
+        if self.max_entries is not None:
+            while len(history) > self.max_entries:
+                history.popitem(last=False)
+        if self.max_age is not None and history:
+            cutoff = datetime.now() - timedelta(seconds=self.max_age)
+            while history and next(iter(history.values())).time < cutoff:
+                history.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._history)
+
     def __repr__(self) -> str:
-         return '\n'.join(repr(entry) for entry in self._history)
+         return '\n'.join(repr(entry) for entry in self._history.values())
+async def tick_concurrently(
+    ticks: List[Callable[[], Awaitable[xNodeStatus]]],
+    success_threshold: int,
+    max_concurrency: Optional[int] = None,
+    total: Optional[int] = None,
+    success_count: int = 0,
+    failure_count: int = 0,
+) -> xNodeStatus:
+    """Run child ticks as concurrent tasks and stop as soon as the outcome is known.
+
+    Returns Success once ``success_threshold`` ticks succeeded, Failure once too
+    many failed for the threshold to be reachable and Running otherwise. Ticks
+    still in flight when the outcome is decided are cancelled. At most
+    ``max_concurrency`` ticks run at a time when it is set. ``total`` and the
+    counts describe the whole node when only some of its children are ticked.
+    """
+    if total is None:
+        total = len(ticks)
+    waiting = iter(ticks)
+    pending = {asyncio.ensure_future(tick()) for tick in islice(waiting, max_concurrency or len(ticks))}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                status = task.result()
+                if status == xNodeStatus.Success:
+                    success_count += 1
+                elif status == xNodeStatus.Failure:
+                    failure_count += 1
+                if success_count >= success_threshold:
+                    return xNodeStatus.Success
+                elif failure_count > total - success_threshold:
+                    return xNodeStatus.Failure
+            pending.update(asyncio.ensure_future(tick()) for tick in islice(waiting, len(done)))
+        return xNodeStatus.Running
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+def condition_result(value: Any) -> xNodeResult:
+    """Map a condition's return value to Success or Failure; a returned result keeps its error."""
+    if isinstance(value, xNodeResult):
+        return value if value.is_success() else xNodeResult(xNodeStatus.Failure, False, value.error)
+    return xNodeResult(xNodeStatus.Success, True) if value else xNodeResult(xNodeStatus.Failure, False)
+
+def to_result(value: Any) -> xNodeResult:
+    """Map an action's return value (status, result or truthy value) to a result."""
+    if isinstance(value, xNodeResult):
+        return value
+    elif isinstance(value, xNodeStatus):
+        if value == xNodeStatus.Running:
+            return xNodeResult(xNodeStatus.Running)
+        return xNodeResult(value, value == xNodeStatus.Success)
+    return xNodeResult(xNodeStatus.Success, True) if value else xNodeResult(xNodeStatus.Failure, False)
 class Node(ABC):
+    # Index of the node's progress in ``Context.state``, assigned by ``layout``.
+    slot: int = -1
+    # Set by wrappers that only observe their ``child`` (``ProbeNode``), so
+    # node identity (``node_keys``, ``unwrap``) looks through them.
+    transparent: bool = False
+
     @abstractmethod
     async def tick(self, context: Context) -> xNodeResult:
         raise NotImplementedError()
 class ActionNode(Node):
+    """Runs an action; long-running actions report Running until they finish.
+
+    An action reports Running by returning ``xNodeStatus.Running`` (it is
+    called again on the next tick), by returning an ``asyncio.Future`` handle,
+    or by being declared ``long_running`` so its coroutine is started as a
+    task. A handle is kept in ``context.handles`` and polled on later ticks
+    instead of calling the action again; the repeat iteration is kept in
+    ``context.state``.
+    """
+
     def __init__(self, action : Action) -> None:
         self.child : Action = action
 
@@ -55,23 +235,42 @@ class ActionNode(Node):
         if self.child.execute_once and context.has_completed(id):
             return xNodeResult(xNodeStatus.Success, True)
         
-        if self.child.repeat:
-            for _ in range(self.child.repeat_count):
-                result = await self.__execute_action()
-                context.save(ContextEntry(id=self.child.id, time=datetime.now(), result=result))
-                if result.is_failure():
-                    return result
-            return xNodeResult(xNodeStatus.Success, True)
-        else:
-            result = await self.__execute_action()
-            context.save(ContextEntry(id=self.child.id, time=datetime.now(), result=result))
-            return result
+        state, slot = context.state, self.slot
+        count = self.child.repeat_count if self.child.repeat else 1
+        while state[slot] < count:
+            result = await self.__execute_action(context)
+            if result.is_running():
+                return result
+            entry = ContextEntry(id=self.child.id, time=datetime.now(), result=result)
+            if self.child.execute_once:
+                context.complete(entry)
+            else:
+                context.save(entry)
+            if result.is_failure():
+                state[slot] = 0
+                return result
+            state[slot] += 1
+        state[slot] = 0
+        return xNodeResult(xNodeStatus.Success, True)
     
-    async def __execute_action(self) -> xNodeResult:
-        result = self.child.func()
-        if asyncio.iscoroutine(result):
-            result = await result
-        return xNodeResult(xNodeStatus.Success, True) if result else xNodeResult(xNodeStatus.Failure, False)
+    async def __execute_action(self, context: Context) -> xNodeResult:
+        handle = context.handles.get(self.slot)
+        if handle is None:
+            if self.child.long_running:
+                result = asyncio.ensure_future(pools.run(self.child.func, self.child.policy))
+            elif self.child.policy == ExecutionPolicy.Inline:
+                result = self.child.func()
+                if asyncio.iscoroutine(result):
+                    result = await result
+            else:
+                result = await pools.run(self.child.func, self.child.policy)
+            if not isinstance(result, asyncio.Future):
+                return to_result(result)
+            handle = context.handles[self.slot] = result
+        if not handle.done():
+            return xNodeResult(xNodeStatus.Running)
+        del context.handles[self.slot]
+        return to_result(handle.result())
     
     def __repr__(self) -> str:
         return f"{asdict(self.child)}"
@@ -80,34 +279,50 @@ class ConditionNode(Node):
         self.child = condition
 
     async def tick(self, context: Context) -> xNodeResult:
+        memoized = self.child.cache_per_tick or self.child.cache_ttl is not None
+        if memoized:
+            cached = context.cached(self.child)
+            if cached is not None:
+                return cached
+        versions = context.dependency_versions(self.child)
+        if versions is not None:
+            cached = context.evaluations.get(self.child.id)
+            if cached is not None and cached[0] == versions:
+                return cached[1]
         result = await self.__evaluate_condition()
         context.save(ContextEntry(id=self.child.id, time=datetime.now(), result=result))
-        return xNodeResult(xNodeStatus.Success, True) if result else xNodeResult(xNodeStatus.Failure, False)
+        if versions is not None:
+            context.evaluations[self.child.id] = (versions, result)
+        if memoized:
+            context.memoize(self.child, result)
+        return result
 
     async def __evaluate_condition(self) -> xNodeResult:
-        if asyncio.iscoroutinefunction(self.child.func):
-            result = await self.child.func()
-        else:
+        if self.child.policy == ExecutionPolicy.Inline:
             result = self.child.func()
-        return xNodeResult(xNodeStatus.Success, True) if result else xNodeResult(xNodeStatus.Failure, False)
+            if asyncio.iscoroutine(result):
+                result = await result
+        else:
+            result = await pools.run(self.child.func, self.child.policy)
+        return condition_result(result)
 
     def __repr__(self) -> str:
         return f"{asdict(self.child)}"
 class SequenceNode(Node):
     def __init__(self, children: List[Node]) -> None:
         self.children = children
-        self.current_index = 0
 
     async def tick(self, context: Context) -> xNodeResult:
-        while self.current_index < len(self.children):
-            result = await self.children[self.current_index].tick(context)
+        state, slot = context.state, self.slot
+        while state[slot] < len(self.children):
+            result = await self.children[state[slot]].tick(context)
             if result.is_running():
                 return xNodeResult(xNodeStatus.Running)
             elif result.is_failure():
-                self.current_index = 0
+                state[slot] = 0
                 return xNodeResult(xNodeStatus.Failure, False)
-            self.current_index += 1
-        self.current_index = 0
+            state[slot] += 1
+        state[slot] = 0
         return xNodeResult(xNodeStatus.Success, True)
 
     def __repr__(self) -> str:
@@ -115,41 +330,60 @@ class SequenceNode(Node):
 class SelectorNode(Node):
     def __init__(self, children: List[Node]) -> None:
         self.children = children
-        self.current_index = 0
 
     async def tick(self, context: Context) -> xNodeResult:
-        while self.current_index < len(self.children):
-            result = await self.children[self.current_index].tick(context)
+        state, slot = context.state, self.slot
+        while state[slot] < len(self.children):
+            result = await self.children[state[slot]].tick(context)
             if result.is_running():
                 return xNodeResult(xNodeStatus.Running)
             elif result.is_success():
-                self.current_index = 0
+                state[slot] = 0
                 return xNodeResult(xNodeStatus.Success, True)
-            self.current_index += 1
-        self.current_index = 0
+            state[slot] += 1
+        state[slot] = 0
         return xNodeResult(xNodeStatus.Failure, False)
 
     def __repr__(self) -> str:
         return f"{self.children}"
 class ParallelNode(Node):
-    def __init__(self, children: List[Node], success_threshold: int) -> None:
+    def __init__(self, children: List[Node], success_threshold: int, max_concurrency: Optional[int] = None) -> None:
         self.children = children
         self.success_threshold = success_threshold
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[List[Tuple[int, ...]]] = None
 
     async def tick(self, context: Context) -> xNodeResult:
-        success_count = 0
-        failure_count = 0
-        for child in self.children:
-            result = await child.tick(context)
-            if result.is_success():
-                success_count += 1
-            elif result.is_failure():
-                failure_count += 1
-            if success_count >= self.success_threshold:
-                return xNodeResult(xNodeStatus.Success, True)
-            elif failure_count > len(self.children) - self.success_threshold:
-                return xNodeResult(xNodeStatus.Failure, False)
-        return xNodeResult(xNodeStatus.Running)
+        # Children that finished on an earlier tick keep their status until
+        # the node completes; only unfinished or Running children are ticked.
+        results: List[Optional[xNodeStatus]] = context.state[self.slot] or [None] * len(self.children)
+        context.state[self.slot] = results
+        status = await tick_concurrently(
+            [lambda index=index: self.__tick_child(index, results, context) for index, result in enumerate(results) if result is None or result == xNodeStatus.Running],
+            self.success_threshold,
+            self.max_concurrency,
+            total=len(self.children),
+            success_count=results.count(xNodeStatus.Success),
+            failure_count=results.count(xNodeStatus.Failure),
+        )
+        if status == xNodeStatus.Running:
+            return xNodeResult(xNodeStatus.Running)
+        # Children left undecided would resume from stale progress the next
+        # time the node runs.
+        if self._slots is None:
+            self._slots = [subtree_slots(child) for child in self.children]
+        for index, result in enumerate(results):
+            if result is None or result == xNodeStatus.Running:
+                context.reset(self._slots[index])
+        context.state[self.slot] = 0
+        if status == xNodeStatus.Success:
+            return xNodeResult(xNodeStatus.Success, True)
+        return xNodeResult(xNodeStatus.Failure, False)
+
+    async def __tick_child(self, index: int, results: List[Optional[xNodeStatus]], context: Context) -> xNodeStatus:
+        status = (await self.children[index].tick(context)).status
+        results[index] = status
+        return status
 
     def __repr__(self) -> str:
         return f"{self.children}{self.success_threshold}"
@@ -173,24 +407,47 @@ class RepeatDecorator(Node):
         self.repeat_count = repeat_count
 
     async def tick(self, context: Context) -> xNodeResult:
-        for _ in range(self.repeat_count):
+        state, slot = context.state, self.slot
+        while state[slot] < self.repeat_count:
             result = await self.child.tick(context)
-            if result.is_failure():
+            if result.is_running():
+                return xNodeResult(xNodeStatus.Running)
+            elif result.is_failure():
+                state[slot] = 0
                 return result
+            state[slot] += 1
+        state[slot] = 0
         return xNodeResult(xNodeStatus.Success, True)
 
     def __repr__(self) -> str:
         return f"{self.child} (repeat {self.repeat_count} times)"
 class TimeoutDecorator(Node):
+    """Fails its child once it has taken ``timeout`` seconds, across ticks.
+
+    The deadline is set when the child starts and kept in ``context.state``
+    while the child reports Running; once it passes, the child's progress is
+    reset (cancelling its running actions) and the node fails.
+    """
+
     def __init__(self, child: Node, timeout: float) -> None:
         self.child = child
         self.timeout = timeout
+        self._slots: Optional[Tuple[int, ...]] = None
 
     async def tick(self, context: Context) -> xNodeResult:
+        state, slot = context.state, self.slot
+        deadline = state[slot] or time() + self.timeout
         try:
-            result = await asyncio.wait_for(self.child.tick(context), timeout=self.timeout)
+            result = await asyncio.wait_for(self.child.tick(context), timeout=max(0.0, deadline - time()))
         except asyncio.TimeoutError:
-            return xNodeResult(xNodeStatus.Failure, False)
+            result = None
+        if result is None or time() >= deadline and result.is_running():
+            state[slot] = 0
+            if self._slots is None:
+                self._slots = subtree_slots(self.child)
+            context.reset(self._slots)
+            return xNodeResult(xNodeStatus.Failure, False, f"Timed out after {self.timeout} seconds")
+        state[slot] = deadline if result.is_running() else 0
         return result
 
     def __repr__(self) -> str:
@@ -201,27 +458,305 @@ class RepeatUntilSuccessDecorator(Node):
         self.max_retries = max_retries
 
     async def tick(self, context: Context) -> xNodeResult:
-        attempts = 0
-        while attempts < self.max_retries:
+        state, slot = context.state, self.slot
+        while state[slot] < self.max_retries:
             result = await self.child.tick(context)
-            if result.is_success():
+            if result.is_running():
+                return xNodeResult(xNodeStatus.Running)
+            elif result.is_success():
+                state[slot] = 0
                 return xNodeResult(xNodeStatus.Success, True)
-            attempts += 1
+            state[slot] += 1
+        state[slot] = 0
         return xNodeResult(xNodeStatus.Failure, False)
     
     def __repr__(self) -> str:
         return f"{self.child} (repeat until success, max retries: {self.max_retries})"
+class RetryDecorator(Node):
+    """Retries a failing child with exponential backoff and full jitter.
+
+    After the n-th failure in a row the node reports Running and leaves its
+    child alone for a random delay of up to ``min(max_delay, base_delay *
+    2 ** (n - 1))`` seconds, so the tree keeps ticking without hammering
+    the child. It fails once the child failed ``max_retries`` more times
+    than the first. A child that raises counts as failed, its progress is
+    reset, and the last attempt fails with the exception as its error. The
+    attempt count and the wall-clock time of the next attempt are kept in
+    ``context.state``, so a snapshot restored in another process waits out
+    the same delay.
+    """
+
+    def __init__(self, child: Node, max_retries: int = 3, base_delay: float = 0.1, max_delay: float = 10.0) -> None:
+        self.child = child
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots: Optional[Tuple[int, ...]] = None
+
+    async def tick(self, context: Context) -> xNodeResult:
+        state, slot = context.state, self.slot
+        progress = state[slot]
+        if progress and time() < progress[1]:
+            return xNodeResult(xNodeStatus.Running)
+        try:
+            result = await self.child.tick(context)
+        except Exception as e:
+            if self._slots is None:
+                self._slots = subtree_slots(self.child)
+            context.reset(self._slots)
+            result = xNodeResult(xNodeStatus.Failure, False, str(e) or type(e).__name__)
+        if result.is_running():
+            return xNodeResult(xNodeStatus.Running)
+        elif result.is_success():
+            state[slot] = 0
+            return xNodeResult(xNodeStatus.Success, True)
+        attempts = progress[0] + 1 if progress else 1
+        if attempts > self.max_retries:
+            state[slot] = 0
+            return result
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+        state[slot] = (attempts, time() + delay)
+        return xNodeResult(xNodeStatus.Running)
+
+    def __repr__(self) -> str:
+        return f"{self.child} (retry {self.max_retries} times, backoff {self.base_delay}-{self.max_delay} seconds)"
+class CircuitBreaker:
+    """Consecutive failures per key, shared by the decorators guarding that key.
+
+    A key's circuit opens after ``failure_threshold`` failures in a row;
+    while it is open, ticks guarded by it fail without running their child.
+    ``reset_timeout`` seconds after opening it half-opens and lets one tick
+    through: a success closes the circuit, a failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # key -> [state, consecutive failures, time of the last state change]
+        self._circuits: Dict[str, List[Any]] = {}
+
+    def allow(self, key: str) -> bool:
+        circuit = self._circuits.get(key)
+        if circuit is None or circuit[0] == self.CLOSED:
+            return True
+        # A half-open circuit whose probe never reported back (its tree was
+        # removed, say) lets another one through after the same timeout.
+        if monotonic() - circuit[2] >= self.reset_timeout:
+            circuit[0] = self.HALF_OPEN
+            circuit[2] = monotonic()
+            return True
+        return False
+
+    def record(self, key: str, success: bool) -> None:
+        if success:
+            self._circuits.pop(key, None)
+            return
+        circuit = self._circuits.setdefault(key, [self.CLOSED, 0, 0.0])
+        circuit[1] += 1
+        if circuit[0] == self.HALF_OPEN or (circuit[0] == self.CLOSED and circuit[1] >= self.failure_threshold):
+            logger.warning("Opening circuit for %s after %d failures", key, circuit[1])
+            circuit[0] = self.OPEN
+            circuit[2] = monotonic()
+
+    def state(self, key: str) -> str:
+        circuit = self._circuits.get(key)
+        return self.CLOSED if circuit is None else circuit[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: {'state': state, 'failures': failures} for key, (state, failures, _) in self._circuits.items()}
+class CircuitBreakerDecorator(Node):
+    """Guards its child with ``breaker``'s circuit for ``key``.
+
+    ``key`` defaults to the id of the action or condition the decorator
+    wraps, so every tree running that action shares one circuit. Failures,
+    exceptions and a child running longer than ``timeout`` seconds, across
+    ticks, count against the circuit. A tick admitted while the circuit was
+    closed or half-open keeps running across ticks while its child reports
+    Running.
+    """
+
+    def __init__(self, child: Node, breaker: CircuitBreaker, key: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        if key is None:
+            leaf = unwrap(child)
+            if not isinstance(leaf, (ActionNode, ConditionNode)):
+                raise xNodeError("A circuit breaker around a composite node needs a key.")
+            key = leaf.child.id
+        self.child = child
+        self.breaker = breaker
+        self.key = key
+        self.timeout = timeout
+        self._slots: Optional[Tuple[int, ...]] = None
+
+    async def tick(self, context: Context) -> xNodeResult:
+        state, slot = context.state, self.slot
+        admitted = state[slot]
+        if not admitted and not self.breaker.allow(self.key):
+            return xNodeResult(xNodeStatus.Failure, False, f"Circuit for {self.key} is open")
+        # While the child is Running the slot holds its deadline, or 1
+        # without a timeout.
+        deadline = None if self.timeout is None else admitted or time() + self.timeout
+        try:
+            if deadline is None:
+                result = await self.child.tick(context)
+            else:
+                result = await asyncio.wait_for(self.child.tick(context), timeout=max(0.0, deadline - time()))
+                if result.is_running() and time() >= deadline:
+                    raise asyncio.TimeoutError()
+        except asyncio.TimeoutError:
+            state[slot] = 0
+            if self._slots is None:
+                self._slots = subtree_slots(self.child)
+            context.reset(self._slots)
+            self.breaker.record(self.key, False)
+            return xNodeResult(xNodeStatus.Failure, False, f"Timed out after {self.timeout} seconds")
+        except Exception:
+            state[slot] = 0
+            self.breaker.record(self.key, False)
+            raise
+        if result.is_running():
+            state[slot] = 1 if deadline is None else deadline
+            return xNodeResult(xNodeStatus.Running)
+        state[slot] = 0
+        self.breaker.record(self.key, result.is_success())
+        return result
+
+    def __repr__(self) -> str:
+        return f"{self.child} (circuit {self.key})"
 class BehaviorTree:
-    def __init__(self, root: Optional[Node] = None) -> None:
-        self.root = root
-        self.context = Context()
+    """Runs a node graph against one ``Context``.
+
+    Nodes are immutable once laid out; all per-run progress lives in the
+    context, so ``instance`` can run the same graph for many agents without
+    copying it.
+    """
+
+    def __init__(self, root: Optional[Node] = None, context: Optional[Context] = None, reactive: bool = False) -> None:
+        self.root: Optional[Node] = None
+        self.size = 0
+        self.context = context if context is not None else Context()
+        self.reactive = reactive
+        self._watched: Optional[Set[str]] = None
+        self._dirty = True
+        self._last: Optional[xNodeResult] = None
+        self._ticking = False
+        self._pending: Optional[Tuple[Node, int]] = None
+        if reactive:
+            if self.context.blackboard is None:
+                raise xNodeError("A reactive behavior tree needs a Context with a blackboard.")
+            self.context.blackboard.subscribe(self.__invalidate)
+        if root is not None:
+            self.update(root)
+
+    def close(self) -> None:
+        """Stop following the blackboard; a closed reactive tree is never idle again."""
+        if self.reactive and self.context.blackboard is not None:
+            self.context.blackboard.unsubscribe(self.__invalidate)
+            self._watched = None
+
+    def instance(self, context: Optional[Context] = None) -> 'BehaviorTree':
+        """Another run of this tree with its own ``context``; the nodes are shared, not copied."""
+        tree = type(self)(context=context, reactive=self.reactive)
+        tree._share(self)
+        return tree
+
+    def _share(self, other: 'BehaviorTree') -> None:
+        self.root = other.root
+        self.size = other.size
+        self._watched = other._watched
 
-    def update(self, root: Node) -> None:
+    def update(self, root: Node) -> bool:
+        """Swap in ``root``, carrying progress over from the current root.
+
+        Nodes are matched by ``node_keys`` (leaves by action/condition id,
+        composites by type and the keys of their children), and matched nodes
+        keep their progress, including running action handles, so a composite
+        whose children changed starts over while its running leaves carry on;
+        handles of actions that are gone are cancelled. ``Context`` history is keyed by
+        id and is kept as is. While a tick is in flight the swap is deferred
+        until it completes, so ``update`` never waits; returns whether the
+        new root was applied immediately.
+        """
+        size = layout(root)
+        if self._ticking:
+            self._pending = (root, size)
+            return False
+        self._swap(root, size)
+        return True
+
+    def _swap(self, root: Node, size: int) -> None:
+        previous = self.root
         self.root = root
+        self.size = size
+        self._dirty = True
+        self._last = None
+        if self.reactive:
+            self._watched = watched_keys(root)
+        state, handles = self.context.state, self.context.handles
+        self.context.state = [0] * size
+        self.context.handles = {}
+        if previous is not None:
+            self._migrate(previous, root, state, handles)
+
+    def _migrate(self, previous: Node, root: Node, state: List[Any], handles: Dict[int, asyncio.Future]) -> None:
+        old = list(walk(previous))
+        new = list(walk(root))
+        old_keys = node_keys(previous)
+        new_keys = node_keys(root)
+        for target, source in pair_nodes([old_keys[id(node)] for node in old], [new_keys[id(node)] for node in new]):
+            old_slot, new_slot = old[source].slot, new[target].slot
+            if old_slot < len(state):
+                self.context.state[new_slot] = state[old_slot]
+            handle = handles.pop(old_slot, None)
+            if handle is not None:
+                self.context.handles[new_slot] = handle
+        for handle in handles.values():
+            handle.cancel()
+
+    def __invalidate(self, key: str) -> None:
+        if self._watched is None or key in self._watched:
+            self._dirty = True
 
-    async def run(self) -> None:
+    @property
+    def idle(self) -> bool:
+        """True when ticking a reactive tree cannot change its result.
+
+        That is the case once every condition in the tree declares
+        ``depends_on``, none of those keys changed since the last tick and
+        that tick did not end Running.
+        """
+        return (
+            self.reactive
+            and not self._dirty
+            and self._watched is not None
+            and self._last is not None
+            and not self._last.is_running()
+        )
+
+    async def run(self) -> xNodeResult:
         if not self.root:
             raise xNodeError("Root node is not set for the behavior tree.")
+        if self.idle:
+            return self._last
+        self._dirty = False
+        context = self.context
+        context.ticks += 1
+        if len(context.state) < self.size:
+            context.state.extend([0] * (self.size - len(context.state)))
+        self._ticking = True
+        try:
+            result = self._last = await self._tick()
+        finally:
+            self._ticking = False
+            if self._pending is not None:
+                pending, self._pending = self._pending, None
+                self._swap(*pending)
+        return result
+
+    async def _tick(self) -> xNodeResult:
         result = await self.root.tick(self.context)
         if result.is_success():
             return xNodeResult(xNodeStatus.Success, True)
@@ -231,4 +766,110 @@ class BehaviorTree:
             return xNodeResult(xNodeStatus.Running)
 
     def __repr__(self) -> str:
-        return f"{self.root}{self.context})"
\ No newline at end of file
+        return f"{self.root}{self.context})"
+
+def walk(node: Node) -> Iterator[Node]:
+    """Yield ``node`` and every node below it."""
+    yield node
+    children = getattr(node, 'children', None)
+    if isinstance(children, list):
+        for child in children:
+            yield from walk(child)
+    child = getattr(node, 'child', None)
+    if isinstance(child, Node):
+        yield from walk(child)
+
+def subtree_slots(node: Node) -> Tuple[int, ...]:
+    """Slots of ``node`` and every node below it."""
+    return tuple(sorted({descendant.slot for descendant in walk(node)}))
+
+def layout(root: Node) -> int:
+    """Assign every node below ``root`` its ``slot`` in ``Context.state``; returns the slot count.
+
+    Slots follow pre-order, which is also the order ``Program`` emits
+    instructions in. A node reached twice keeps its first slot and shares its
+    progress; a node already laid out at another position of another tree is
+    rejected, as its progress would land in the wrong slot.
+    """
+    seen: Set[int] = set()
+    count = 0
+
+    def visit(node: Node) -> None:
+        nonlocal count
+        if id(node) in seen:
+            return
+        seen.add(id(node))
+        if node.slot not in (-1, count):
+            raise xNodeError(f"{type(node).__name__} is already part of another tree; build a new node for this one.")
+        node.slot = count
+        count += 1
+        children = getattr(node, 'children', None)
+        if isinstance(children, list):
+            for child in children:
+                visit(child)
+        child = getattr(node, 'child', None)
+        if isinstance(child, Node):
+            visit(child)
+
+    visit(root)
+    return count
+
+def watched_keys(root: Node) -> Optional[Set[str]]:
+    """Blackboard keys the tree's conditions depend on; None if any condition declares none."""
+    keys: Set[str] = set()
+    for node in walk(root):
+        if isinstance(node, ConditionNode):
+            if not node.child.depends_on:
+                return None
+            keys.update(node.child.depends_on)
+    return keys
+
+def unwrap(node: Node) -> Node:
+    """``node`` without the transparent wrappers around it."""
+    while node.transparent:
+        node = node.child
+    return node
+
+def node_keys(root: Node) -> Dict[int, Hashable]:
+    """Identity of every node below ``root`` that survives rebuilding the tree, by ``id(node)``.
+
+    Transparent wrappers get a key of their own, but their parents see the
+    key of the wrapped node, so instrumenting a tree or not does not change
+    the keys of its other nodes.
+    """
+    keys: Dict[int, Hashable] = {}
+
+    def visit(node: Node) -> Hashable:
+        if node.transparent:
+            key = visit(node.child)
+            keys[id(node)] = (type(node).__name__, key)
+            return key
+        if isinstance(node, (ActionNode, ConditionNode)):
+            key = (type(node).__name__, node.child.id)
+        else:
+            children = getattr(node, 'children', None)
+            child = getattr(node, 'child', None)
+            nested = list(children) if isinstance(children, list) else []
+            if isinstance(child, Node):
+                nested.append(child)
+            key = (type(node).__name__, tuple(visit(item) for item in nested))
+        keys[id(node)] = key
+        return key
+
+    visit(root)
+    return keys
+
+def pair_nodes(old: List[Hashable], new: List[Hashable]) -> List[Tuple[int, int]]:
+    """Pairs ``(new index, old index)`` of equal keys, matching repeated keys in order."""
+    positions: Dict[Hashable, List[int]] = {}
+    for index, key in enumerate(old):
+        positions.setdefault(key, []).append(index)
+    pairs = []
+    seen: Dict[Hashable, int] = {}
+    for index, key in enumerate(new):
+        occurrence = seen.get(key, 0)
+        candidates = positions.get(key)
+        if candidates is not None and occurrence < len(candidates):
+            pairs.append((index, candidates[occurrence]))
+        seen[key] = occurrence + 1
+    return pairs
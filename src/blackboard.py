@@ -0,0 +1,74 @@
+import inspect
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Blackboard:
+    """Shared facts that conditions read, with change notification.
+
+    Every key carries a version that is bumped whenever its value actually
+    changes, and subscribers are called with the key. Conditions that declare
+    ``depends_on`` are only re-evaluated when one of those versions moved.
+    Bound methods are subscribed by weak reference, so an object that
+    subscribed one (a reactive tree) can still be garbage-collected.
+    """
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None) -> None:
+        self._values: Dict[str, Any] = {}
+        self._versions: Dict[str, int] = {}
+        self._subscribers: List[Callable[[], Optional[Callable[[str], None]]]] = []
+        for key, value in (values or {}).items():
+            self.set(key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        if key in self._values and self._values[key] == value:
+            return
+        self._values[key] = value
+        self.__changed(key)
+
+    def delete(self, key: str) -> None:
+        if key in self._values:
+            del self._values[key]
+            self.__changed(key)
+
+    def __changed(self, key: str) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        collected = False
+        for reference in list(self._subscribers):
+            subscriber = reference()
+            if subscriber is None:
+                collected = True
+            else:
+                subscriber(key)
+        if collected:
+            self._subscribers = [reference for reference in self._subscribers if reference() is not None]
+
+    def versions(self, keys: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(key, 0) for key in keys)
+
+    def subscribe(self, subscriber: Callable[[str], None]) -> None:
+        if inspect.ismethod(subscriber):
+            self._subscribers.append(weakref.WeakMethod(subscriber))
+        else:
+            self._subscribers.append(lambda: subscriber)
+
+    def unsubscribe(self, subscriber: Callable[[str], None]) -> None:
+        self._subscribers = [reference for reference in self._subscribers if reference() not in (None, subscriber)]
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __repr__(self) -> str:
+        return f"Blackboard({self._values})"
@@ -70,7 +70,7 @@ import json
 import websockets
 
 async def connect_to_server():
-    uri = "ws://localhost:1337/register_action"
+    uri = "ws://localhost:8765/register_action"
     async with websockets.connect(uri) as websocket:
         action = {
             "id" : '1',
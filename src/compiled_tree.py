@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from time import perf_counter, time
+from typing import Any, List, Optional, Tuple
+
+from common.error import xNodeError
+from common.result import xNodeResult, xNodeStatus
+from src.behavior_tree import (
+    ActionNode,
+    BehaviorTree,
+    ConditionNode,
+    Context,
+    InvertDecorator,
+    Node,
+    ParallelNode,
+    RepeatDecorator,
+    RepeatUntilSuccessDecorator,
+    SelectorNode,
+    SequenceNode,
+    TimeoutDecorator,
+    condition_result,
+    layout,
+    subtree_slots,
+    tick_concurrently,
+    to_result,
+)
+from src.entities.context import ContextEntry
+from src.entities.execution_policy import ExecutionPolicy
+from src.metrics import ProbeNode
+from src.pools import pools
+
+OP_ACTION = 0
+OP_CONDITION = 1
+OP_SEQUENCE = 2
+OP_SELECTOR = 3
+OP_PARALLEL = 4
+OP_INVERT = 5
+OP_REPEAT = 6
+OP_REPEAT_UNTIL_SUCCESS = 7
+OP_TIMEOUT = 8
+OP_PROBE = 9
+OP_NODE = 10
+
+SUCCESS = xNodeStatus.Success
+FAILURE = xNodeStatus.Failure
+RUNNING = xNodeStatus.Running
+INLINE = ExecutionPolicy.Inline
+
+Instruction = Tuple[Any, ...]
+
+
+class Program:
+    """Flat instruction array produced from a node graph.
+
+    Every node becomes one instruction ``(opcode, *operands)``; composites
+    reference their children by instruction index (the jump table), so the
+    executor never has to walk the original ``Node`` objects. An
+    instruction's index is its node's ``slot``, so the compiled and the
+    recursive executor keep progress at the same place in ``Context.state``.
+    """
+
+    def __init__(self, root: Node) -> None:
+        size = layout(root)
+        self.code: List[Instruction] = [()] * size
+        self.entry = self._emit(root)
+
+    def _emit(self, node: Node) -> int:
+        pc = node.slot
+        if self.code[pc]:
+            return pc
+        if isinstance(node, ActionNode):
+            instruction = (OP_ACTION, node.child)
+        elif isinstance(node, ConditionNode):
+            instruction = (OP_CONDITION, node.child)
+        elif isinstance(node, SequenceNode):
+            instruction = (OP_SEQUENCE, tuple(self._emit(child) for child in node.children))
+        elif isinstance(node, SelectorNode):
+            instruction = (OP_SELECTOR, tuple(self._emit(child) for child in node.children))
+        elif isinstance(node, ParallelNode):
+            children = tuple(self._emit(child) for child in node.children)
+            instruction = (OP_PARALLEL, children, node.success_threshold, node.max_concurrency, tuple(subtree_slots(child) for child in node.children))
+        elif isinstance(node, InvertDecorator):
+            instruction = (OP_INVERT, self._emit(node.child))
+        elif isinstance(node, RepeatDecorator):
+            instruction = (OP_REPEAT, self._emit(node.child), node.repeat_count)
+        elif isinstance(node, RepeatUntilSuccessDecorator):
+            instruction = (OP_REPEAT_UNTIL_SUCCESS, self._emit(node.child), node.max_retries)
+        elif isinstance(node, TimeoutDecorator):
+            instruction = (OP_TIMEOUT, self._emit(node.child), node.timeout, subtree_slots(node.child))
+        elif isinstance(node, ProbeNode):
+            instruction = (OP_PROBE, self._emit(node.child), node.metrics, node.node_id)
+        elif isinstance(node, Node):
+            instruction = (OP_NODE, node)
+        else:
+            raise xNodeError(f"Cannot compile {node!r}: not a Node.")
+        self.code[pc] = instruction
+        return pc
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+
+class CompiledBehaviorTree(BehaviorTree):
+    """BehaviorTree that ticks a compiled ``Program`` in a single loop.
+
+    Semantics match the recursive ``Node.tick`` implementations, and progress
+    is kept in the same ``Context.state`` slots. The program is compiled once
+    per root and shared by every ``instance`` of the tree.
+    """
+
+    def __init__(self, root: Optional[Node] = None, context: Optional[Context] = None, reactive: bool = False) -> None:
+        self.program: Optional[Program] = None
+        super().__init__(root, context, reactive)
+
+    def _share(self, other: BehaviorTree) -> None:
+        super()._share(other)
+        self.program = other.program
+
+    def _swap(self, root: Node, size: int) -> None:
+        self.program = Program(root)
+        super()._swap(root, size)
+
+    async def _tick(self) -> xNodeResult:
+        status = await self._execute(self.program.entry, self.context)
+        if status is SUCCESS:
+            return xNodeResult(xNodeStatus.Success, True)
+        elif status is FAILURE:
+            return xNodeResult(xNodeStatus.Failure, False)
+        return xNodeResult(xNodeStatus.Running)
+
+    async def _execute(self, pc: int, context: Context) -> xNodeStatus:
+        code = self.program.code
+        state = context.state
+        stack: List[List[Any]] = []
+        try:
+            return await self.__run(pc, context, code, state, stack)
+        except BaseException:
+            for frame in stack:
+                instruction = code[frame[0]]
+                if instruction[0] is OP_PROBE:
+                    instruction[2].node(instruction[3]).in_flight -= 1
+            raise
+
+    async def __run(self, pc: int, context: Context, code: List[Instruction], state: List[Any], stack: List[List[Any]]) -> xNodeStatus:
+        handles = context.handles
+        while True:
+            instruction = code[pc]
+            op = instruction[0]
+
+            # Descend: composites and decorators push a frame and jump to a
+            # child, leaves produce a status.
+            if op is OP_SEQUENCE or op is OP_SELECTOR:
+                children = instruction[1]
+                index = state[pc]
+                if index < len(children):
+                    stack.append([pc, 0])
+                    pc = children[index]
+                    continue
+                state[pc] = 0
+                status = SUCCESS if op is OP_SEQUENCE else FAILURE
+            elif op is OP_INVERT:
+                stack.append([pc, 0])
+                pc = instruction[1]
+                continue
+            elif op is OP_PROBE:
+                if instruction[2].enabled:
+                    instruction[2].node(instruction[3]).in_flight += 1
+                    stack.append([pc, perf_counter()])
+                pc = instruction[1]
+                continue
+            elif op is OP_REPEAT or op is OP_REPEAT_UNTIL_SUCCESS:
+                if state[pc] < instruction[2]:
+                    stack.append([pc, 0])
+                    pc = instruction[1]
+                    continue
+                state[pc] = 0
+                status = SUCCESS if op is OP_REPEAT else FAILURE
+            elif op is OP_ACTION:
+                action = instruction[1]
+                if action.execute_once and context.has_completed(action.id):
+                    status = SUCCESS
+                else:
+                    count = action.repeat_count if action.repeat else 1
+                    while state[pc] < count:
+                        handle = handles.get(pc)
+                        if handle is None:
+                            if action.long_running:
+                                value = asyncio.ensure_future(pools.run(action.func, action.policy))
+                            elif action.policy is INLINE:
+                                value = action.func()
+                                if value.__class__ is not bool and asyncio.iscoroutine(value):
+                                    value = await value
+                            else:
+                                value = await pools.run(action.func, action.policy)
+                            if isinstance(value, asyncio.Future):
+                                handle = handles[pc] = value
+                        if handle is not None:
+                            if not handle.done():
+                                status = RUNNING
+                                break
+                            del handles[pc]
+                            value = handle.result()
+                        if value.__class__ is bool:
+                            result = xNodeResult(xNodeStatus.Success, True) if value else xNodeResult(xNodeStatus.Failure, False)
+                        else:
+                            result = to_result(value)
+                        status = result.status
+                        if status is RUNNING:
+                            break
+                        if action.execute_once:
+                            context.complete(ContextEntry(id=action.id, time=datetime.now(), result=result))
+                        else:
+                            context.save(ContextEntry(id=action.id, time=datetime.now(), result=result))
+                        if status is FAILURE:
+                            state[pc] = 0
+                            break
+                        state[pc] += 1
+                    else:
+                        state[pc] = 0
+                        status = SUCCESS
+            elif op is OP_CONDITION:
+                condition = instruction[1]
+                memoized = condition.cache_per_tick or condition.cache_ttl is not None
+                cached = context.cached(condition) if memoized else None
+                versions = context.dependency_versions(condition) if cached is None and condition.depends_on else None
+                if cached is None and versions is not None:
+                    cached = context.evaluations.get(condition.id)
+                    cached = cached[1] if cached is not None and cached[0] == versions else None
+                if cached is not None:
+                    status = cached.status
+                else:
+                    if condition.policy is INLINE:
+                        value = condition.func()
+                        if value.__class__ is not bool and asyncio.iscoroutine(value):
+                            value = await value
+                    else:
+                        value = await pools.run(condition.func, condition.policy)
+                    if value.__class__ is xNodeResult:
+                        result = condition_result(value)
+                    else:
+                        result = xNodeResult(xNodeStatus.Success, True) if value else xNodeResult(xNodeStatus.Failure, False)
+                    context.save(ContextEntry(id=condition.id, time=datetime.now(), result=result))
+                    if versions is not None:
+                        context.evaluations[condition.id] = (versions, result)
+                    if memoized:
+                        context.memoize(condition, result)
+                    status = result.status
+            elif op is OP_PARALLEL:
+                status = await self._parallel(pc, instruction, context)
+            elif op is OP_TIMEOUT:
+                status = await self._timeout(pc, instruction, context)
+            else:
+                status = (await instruction[1].tick(context)).status
+
+            # Ascend: hand the status to the enclosing frames until one of
+            # them jumps to another child or the stack is empty.
+            while stack:
+                frame = stack[-1]
+                parent = frame[0]
+                instruction = code[parent]
+                op = instruction[0]
+                if op is OP_SEQUENCE or op is OP_SELECTOR:
+                    if status is RUNNING:
+                        stack.pop()
+                        continue
+                    if status is (FAILURE if op is OP_SEQUENCE else SUCCESS):
+                        state[parent] = 0
+                        stack.pop()
+                        continue
+                    children = instruction[1]
+                    index = state[parent] + 1
+                    if index < len(children):
+                        state[parent] = index
+                        pc = children[index]
+                        break
+                    state[parent] = 0
+                    status = SUCCESS if op is OP_SEQUENCE else FAILURE
+                elif op is OP_INVERT:
+                    if status is SUCCESS:
+                        status = FAILURE
+                    elif status is FAILURE:
+                        status = SUCCESS
+                elif op is OP_PROBE:
+                    node = instruction[2].node(instruction[3])
+                    node.in_flight -= 1
+                    node.duration.observe(perf_counter() - frame[1])
+                    node.statuses[status] += 1
+                elif op is OP_REPEAT:
+                    if status is FAILURE:
+                        state[parent] = 0
+                    elif status is not RUNNING:
+                        state[parent] += 1
+                        if state[parent] < instruction[2]:
+                            pc = instruction[1]
+                            break
+                        state[parent] = 0
+                        status = SUCCESS
+                else:
+                    if status is SUCCESS:
+                        state[parent] = 0
+                    elif status is not RUNNING:
+                        state[parent] += 1
+                        if state[parent] < instruction[2]:
+                            pc = instruction[1]
+                            break
+                        state[parent] = 0
+                        status = FAILURE
+                stack.pop()
+            else:
+                return status
+
+    async def _parallel(self, pc: int, instruction: Instruction, context: Context) -> xNodeStatus:
+        children = instruction[1]
+        results = context.state[pc]
+        if not results:
+            results = context.state[pc] = [None] * len(children)
+
+        async def tick_child(index: int) -> xNodeStatus:
+            status = results[index] = await self._execute(children[index], context)
+            return status
+
+        status = await tick_concurrently(
+            [lambda index=index: tick_child(index) for index, result in enumerate(results) if result is None or result is RUNNING],
+            instruction[2],
+            instruction[3],
+            total=len(children),
+            success_count=results.count(SUCCESS),
+            failure_count=results.count(FAILURE),
+        )
+        if status is not RUNNING:
+            for index, result in enumerate(results):
+                if result is None or result is RUNNING:
+                    context.reset(instruction[4][index])
+            context.state[pc] = 0
+        return status
+
+    async def _timeout(self, pc: int, instruction: Instruction, context: Context) -> xNodeStatus:
+        state = context.state
+        deadline = state[pc] or time() + instruction[2]
+        try:
+            status = await asyncio.wait_for(self._execute(instruction[1], context), timeout=max(0.0, deadline - time()))
+        except asyncio.TimeoutError:
+            status = None
+        if status is None or status is RUNNING and time() >= deadline:
+            state[pc] = 0
+            context.reset(instruction[3])
+            return FAILURE
+        state[pc] = deadline if status is RUNNING else 0
+        return status
@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Awaitable, Callable, List, Dict, Optional, Union
+from src.entities.execution_policy import ExecutionPolicy
 
 @dataclass
 class Action:
@@ -8,4 +9,8 @@ class Action:
     name: str
     repeat: bool = False
     repeat_count: int = 1
-    execute_once: bool = False
\ No newline at end of file
+    execute_once: bool = False
+    func: Optional[Callable[[], Union[bool, Awaitable[bool]]]] = None
+    policy: ExecutionPolicy = ExecutionPolicy.Inline
+    long_running: bool = False
+    vectorized: bool = False
\ No newline at end of file
@@ -1,8 +1,15 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Awaitable, Callable, List, Dict, Optional, Union
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple, Union
+from src.entities.execution_policy import ExecutionPolicy
 
 @dataclass
 class Condition:
     id : str
     name : str
+    func : Optional[Callable[[], Union[bool, Awaitable[bool]]]] = None
+    policy : ExecutionPolicy = ExecutionPolicy.Inline
+    depends_on : Tuple[str, ...] = ()
+    cache_ttl : Optional[float] = None
+    cache_per_tick : bool = False
+    vectorized : bool = False
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Awaitable, Callable, List, Dict, Optional, Union
 
-@dataclass
+@dataclass(slots=True)
 class ContextEntry:
     id : str
     time : datetime = field(default_factory=datetime.now) 
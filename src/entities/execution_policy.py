@@ -0,0 +1,6 @@
+from enum import Enum
+
+class ExecutionPolicy(Enum):
+    Inline = 0
+    Thread = 1
+    Process = 2
@@ -0,0 +1,48 @@
+import logging
+from typing import Any, Dict, List
+
+from mediatr import Mediator
+from common.result import xNodeResult
+from common.status import xNodeStatus
+from src.registry import xNodeRegistry
+from src.requests.batch.register_batch import RegisterBatchRequest
+
+logger = logging.getLogger(__name__)
+
+@Mediator.handler
+class RegisterBatchCommandHandler():
+    """Registers many actions/conditions for one client in a single pass.
+
+    Items look like ``{"command": "register_action", "id": ..., "name": ...}``.
+    The result aggregates the batch: its value counts registered and already
+    registered items and lists the failed ones by index; it is a Failure if
+    any item failed.
+    """
+
+    def __init__(self, registry: xNodeRegistry) -> None:
+        self.registry = registry
+
+    def handle(self, request: RegisterBatchRequest) -> xNodeResult:
+        if request.client is None:
+            return xNodeResult(xNodeStatus.Failure, False, "Batch registration requires a client connection")
+        add = {
+            'register_action': self.registry.add_action,
+            'register_condition': self.registry.add_condition,
+        }
+        registered = duplicates = 0
+        failed: List[Dict[str, Any]] = []
+        for index, item in enumerate(request.items):
+            register = add.get(item.get('command')) if isinstance(item, dict) else None
+            name = item.get('name') if isinstance(item, dict) else None
+            if register is None or not isinstance(name, str) or not name:
+                failed.append({'index': index, 'error': "Expected a register_action/register_condition item with a name"})
+                continue
+            if register(name, request.client):
+                registered += 1
+            else:
+                duplicates += 1
+        logger.debug("Registered batch of %d items (%d duplicates, %d failed)", len(request.items), duplicates, len(failed))
+        value = {'registered': registered, 'duplicates': duplicates, 'failed': failed}
+        if failed:
+            return xNodeResult(xNodeStatus.Failure, value, f"{len(failed)} of {len(request.items)} registrations failed")
+        return xNodeResult(xNodeStatus.Success, value)
@@ -0,0 +1,26 @@
+import logging
+from typing import Any, Callable, Dict
+
+from mediatr import Mediator
+from common.result import xNodeResult
+from common.status import xNodeStatus
+from src.handlers.abstractions.command_handler import CommandHandler
+from src.registry import xNodeRegistry
+from src.requests.conditions.register_condition import RegisterConditionRequest
+
+logger = logging.getLogger(__name__)
+
+@Mediator.handler
+class RegisterConditionCommandHandler():
+    def __init__(self, registry: xNodeRegistry) -> None:
+        self.registry = registry
+
+    def handle(self, request: RegisterConditionRequest) -> xNodeResult:
+        try:
+            logger.debug("Registering condition %s (id %s)", request.name, request.id)
+            if request.client is None:
+                return xNodeResult(xNodeStatus.Failure, False, "Condition registration requires a client connection")
+            self.registry.add_condition(request.name, request.client)
+            return xNodeResult(xNodeStatus.Success, True)
+        except TypeError as e:
+            return xNodeResult(xNodeStatus.Failure, False)
\ No newline at end of file
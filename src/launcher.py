@@ -0,0 +1,150 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import signal
+import socket
+from time import monotonic, sleep
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.peers import FRAME, links
+
+logger = logging.getLogger(__name__)
+
+REUSE_PORT = hasattr(socket, 'SO_REUSEPORT')
+
+
+def bind(host: str, port: int, reuse_port: bool = False, backlog: int = 2048) -> socket.socket:
+    """Listening socket for ``host:port``; with ``reuse_port`` several may share the port."""
+    family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE)[0]
+    sock = socket.socket(family, kind, proto)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(address)
+        sock.listen(backlog)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+Target = Callable[[socket.socket, int, Dict[int, socket.socket], socket.socket], None]
+
+
+def _worker(target: Target, sock: socket.socket, index: int, peers: Dict[int, socket.socket], control: socket.socket) -> None:
+    # The launcher coordinates shutdown: Ctrl+C reaches the whole process
+    # group, but workers only stop when the launcher sends them SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    target(sock, index, peers, control)
+
+
+class Launcher:
+    """Runs ``target(sock, index, peers, control)`` in ``workers`` forked processes sharing one port.
+
+    With ``SO_REUSEPORT`` every worker gets its own listening socket on the
+    port and the kernel balances new connections across them; otherwise all
+    workers accept from a single socket bound before forking. Sockets are
+    bound in the launcher, so a port in use fails before any worker starts.
+    ``peers`` maps every other worker's index to a socket connected to it
+    (see ``src.peers``). A restarted worker gets fresh links, never the ones
+    its predecessor may have left half-read; the launcher hands their other
+    ends to the running workers over their ``control`` sockets.
+
+    A worker that exits is restarted. On SIGINT/SIGTERM the launcher sends
+    SIGTERM to every worker, waits up to ``shutdown_timeout`` seconds for
+    them to close their connections and kills the ones still running.
+    """
+
+    def __init__(self, target: Target, workers: int, host: str, port: int, reuse_port: Optional[bool] = None, shutdown_timeout: float = 10.0) -> None:
+        self.target = target
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.reuse_port = REUSE_PORT if reuse_port is None else reuse_port
+        self.shutdown_timeout = shutdown_timeout
+        self._context = multiprocessing.get_context('fork')
+        self._sockets: List[socket.socket] = []
+        self._controls: List[Optional[socket.socket]] = []
+        self._processes: List[Tuple[multiprocessing.Process, float]] = []
+        self._stopping = False
+
+    def run(self) -> None:
+        if self.reuse_port:
+            self._sockets = [bind(self.host, self.port, reuse_port=True) for _ in range(self.workers)]
+        else:
+            self._sockets = [bind(self.host, self.port)] * self.workers
+        self._controls = [None] * self.workers
+        previous = {signum: signal.signal(signum, self.__stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            self._processes = [self.__spawn(index, ends) for index, ends in enumerate(links(self.workers))]
+            logger.info("Started %d workers on %s:%d (SO_REUSEPORT=%s)", self.workers, self.host, self.port, self.reuse_port)
+            self.__supervise()
+        finally:
+            self.__shutdown()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            for sock in set(self._sockets):
+                sock.close()
+            for control in self._controls:
+                if control is not None:
+                    control.close()
+
+    def __stop(self, signum: int, frame) -> None:
+        self._stopping = True
+
+    def __spawn(self, index: int, peers: Dict[int, socket.socket]) -> Tuple[multiprocessing.Process, float]:
+        if self._controls[index] is not None:
+            self._controls[index].close()
+        control, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        control.setblocking(False)
+        self._controls[index] = control
+        process = self._context.Process(target=_worker, args=(self.target, self._sockets[index], index, peers, theirs), name=f"xnode-worker-{index}")
+        try:
+            process.start()
+        finally:
+            # The worker has its own copies now.
+            theirs.close()
+            for sock in peers.values():
+                sock.close()
+        return process, monotonic()
+
+    def __relink(self, index: int) -> Dict[int, socket.socket]:
+        """Fresh links between worker ``index`` and the others; hands their ends to the running workers."""
+        ends = {}
+        for peer, control in enumerate(self._controls):
+            if peer == index:
+                continue
+            ends[peer], theirs = socket.socketpair()
+            with theirs:
+                try:
+                    socket.send_fds(control, [FRAME.pack(index)], [theirs.fileno()])
+                except OSError as e:
+                    # A worker that is down gets fresh links when it restarts.
+                    logger.warning("Could not pass worker %d a link to worker %d: %r", peer, index, e)
+        return ends
+
+    def __supervise(self) -> None:
+        while not self._stopping:
+            multiprocessing.connection.wait([process.sentinel for process, _ in self._processes], timeout=0.5)
+            for index, (process, started) in enumerate(self._processes):
+                if self._stopping or process.is_alive():
+                    continue
+                logger.warning("Worker %d exited with code %s; restarting", index, process.exitcode)
+                # Throttle restarts of a worker that crashes on startup.
+                sleep(max(0.0, 1.0 - (monotonic() - started)))
+                self._processes[index] = self.__spawn(index, self.__relink(index))
+
+    def __shutdown(self) -> None:
+        for process, _ in self._processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = monotonic() + self.shutdown_timeout
+        for process, _ in self._processes:
+            process.join(max(0.0, deadline - monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %s did not stop in %.1fs; killing it", process.name, self.shutdown_timeout)
+                process.kill()
+                process.join()
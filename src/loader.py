@@ -0,0 +1,370 @@
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+import tomli
+
+from common.error import xNodeError
+from src.behavior_tree import (
+    ActionNode,
+    CircuitBreaker,
+    CircuitBreakerDecorator,
+    ConditionNode,
+    InvertDecorator,
+    Node,
+    ParallelNode,
+    RepeatDecorator,
+    RepeatUntilSuccessDecorator,
+    RetryDecorator,
+    SelectorNode,
+    SequenceNode,
+    TimeoutDecorator,
+)
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+from src.entities.execution_policy import ExecutionPolicy
+from src.metrics import ProbeNode, TickMetrics, instrument
+from src.registry import xNodeRegistry
+from src.scheduler import TreeScheduler
+from src.snapshot import SnapshotStore, capture, restore
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'.json': 'json', '.toml': 'toml'}
+
+POLICIES = {policy.name.lower(): policy for policy in ExecutionPolicy}
+
+# Per node type: the fields it accepts, mapped to (accepted types, required).
+SCHEMA: Dict[str, Dict[str, Tuple[Tuple[type, ...], bool]]] = {
+    'action': {
+        'id': ((str,), False),
+        'name': ((str,), True),
+        'repeat': ((bool,), False),
+        'repeat_count': ((int,), False),
+        'execute_once': ((bool,), False),
+        'policy': ((str,), False),
+        'long_running': ((bool,), False),
+        'vectorized': ((bool,), False),
+    },
+    'condition': {
+        'id': ((str,), False),
+        'name': ((str,), True),
+        'policy': ((str,), False),
+        'depends_on': ((list,), False),
+        'cache_ttl': ((int, float), False),
+        'cache_per_tick': ((bool,), False),
+        'vectorized': ((bool,), False),
+    },
+    'sequence': {'children': ((list,), True)},
+    'selector': {'children': ((list,), True)},
+    'parallel': {
+        'children': ((list,), True),
+        'success_threshold': ((int,), True),
+        'max_concurrency': ((int,), False),
+    },
+    'invert': {'child': ((dict,), True)},
+    'repeat': {'child': ((dict,), True), 'count': ((int,), True)},
+    'repeat_until_success': {'child': ((dict,), True), 'max_retries': ((int,), False)},
+    'timeout': {'child': ((dict,), True), 'timeout': ((int, float), True)},
+    'retry': {
+        'child': ((dict,), True),
+        'max_retries': ((int,), False),
+        'base_delay': ((int, float), False),
+        'max_delay': ((int, float), False),
+    },
+    'circuit_breaker': {
+        'child': ((dict,), True),
+        'key': ((str,), False),
+        'timeout': ((int, float), False),
+    },
+}
+
+# Lower bounds of numeric fields, whatever the node type: (bound, inclusive).
+BOUNDS: Dict[str, Tuple[int, bool]] = {
+    'repeat_count': (0, True),
+    'cache_ttl': (0, False),
+    'max_concurrency': (1, True),
+    'count': (0, True),
+    'max_retries': (0, True),
+    'timeout': (0, False),
+    'base_delay': (0, True),
+    'max_delay': (0, True),
+}
+
+
+@dataclass(frozen=True)
+class TreeSpec:
+    """Validated, immutable description of one node and its subtree."""
+
+    type: str
+    params: Tuple[Tuple[str, Any], ...]
+    children: Tuple['TreeSpec', ...] = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        for name, value in self.params:
+            if name == key:
+                return value
+        return default
+
+
+class TreeLoader:
+    """Parses JSON/TOML tree definitions into ``Node`` graphs.
+
+    A definition is a document with a ``root`` node; every node has a
+    ``type`` (a key of ``SCHEMA``) plus that type's fields, composites list
+    their ``children`` and decorators wrap a single ``child``; fields are
+    checked for their types and ranges, so a spec that validates builds.
+    Parsing and validation happen once per distinct content: specs are cached by the
+    SHA-256 of the raw bytes, so re-reading an unchanged file only costs the
+    hash. ``build`` then creates fresh nodes from a spec, resolving action
+    and condition names against ``functions`` first and the registry second.
+    All ``circuit_breaker`` nodes built by one loader share ``breaker``.
+    """
+
+    def __init__(self, registry: Optional[xNodeRegistry] = None, functions: Optional[Mapping[str, Callable[[], Any]]] = None, cache_size: int = 1024, breaker: Optional[CircuitBreaker] = None) -> None:
+        self.registry = registry
+        self.functions = dict(functions or {})
+        self.cache_size = cache_size
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._specs: OrderedDict[str, TreeSpec] = OrderedDict()
+
+    def parse(self, data: Union[bytes, str], format: str = 'json') -> TreeSpec:
+        if isinstance(data, str):
+            data = data.encode()
+        digest = hashlib.sha256(format.encode() + b'\0' + data).hexdigest()
+        spec = self._specs.get(digest)
+        if spec is not None:
+            self._specs.move_to_end(digest)
+            return spec
+        spec = self.validate(self.__decode(data, format))
+        self._specs[digest] = spec
+        if len(self._specs) > self.cache_size:
+            self._specs.popitem(last=False)
+        return spec
+
+    def read(self, path: Union[str, Path]) -> TreeSpec:
+        path = Path(path)
+        format = FORMATS.get(path.suffix)
+        if format is None:
+            raise xNodeError(f"Unsupported tree format '{path.suffix}' for {path}.")
+        return self.parse(path.read_bytes(), format)
+
+    def load(self, path: Union[str, Path]) -> Node:
+        return self.build(self.read(path))
+
+    @staticmethod
+    def __decode(data: bytes, format: str) -> Any:
+        try:
+            if format == 'json':
+                return json.loads(data)
+            if format == 'toml':
+                return tomli.loads(data.decode())
+        except (ValueError, UnicodeDecodeError) as e:
+            raise xNodeError(f"Error parsing {format} tree definition: {e}")
+        raise xNodeError(f"Unsupported tree format '{format}'.")
+
+    def validate(self, document: Any) -> TreeSpec:
+        if not isinstance(document, dict) or not isinstance(document.get('root'), dict):
+            raise xNodeError("A tree definition must be a table with a 'root' node.")
+        return self.__validate(document['root'], 'root')
+
+    def __validate(self, node: Any, path: str) -> TreeSpec:
+        if not isinstance(node, dict):
+            raise xNodeError(f"{path}: expected a node table, got {type(node).__name__}.")
+        node_type = node.get('type')
+        schema = SCHEMA.get(node_type)
+        if schema is None:
+            raise xNodeError(f"{path}: unknown node type {node_type!r}.")
+        unknown = set(node) - set(schema) - {'type'}
+        if unknown:
+            raise xNodeError(f"{path}: unknown field(s) {', '.join(sorted(unknown))} for {node_type}.")
+        params = []
+        for key, (types, required) in schema.items():
+            if key not in node:
+                if required:
+                    raise xNodeError(f"{path}: {node_type} requires '{key}'.")
+                continue
+            value = node[key]
+            # bool is an int subclass, but 'true' is never a valid count.
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise xNodeError(f"{path}.{key}: expected {' or '.join(t.__name__ for t in types)}, got {type(value).__name__}.")
+            if key in ('children', 'child'):
+                continue
+            bound = BOUNDS.get(key)
+            # Written so that NaN fails too.
+            if bound is not None and not (value >= bound[0] if bound[1] else value > bound[0]):
+                raise xNodeError(f"{path}.{key}: must be {'at least' if bound[1] else 'greater than'} {bound[0]}, got {value!r}.")
+            if key == 'policy' and value.lower() not in POLICIES:
+                raise xNodeError(f"{path}.policy: unknown execution policy {value!r}.")
+            if key == 'depends_on':
+                if not all(isinstance(item, str) for item in value):
+                    raise xNodeError(f"{path}.depends_on: expected a list of blackboard keys.")
+                value = tuple(value)
+            params.append((key, value))
+        if 'children' in node:
+            children = tuple(self.__validate(child, f"{path}.children[{index}]") for index, child in enumerate(node['children']))
+        elif 'child' in node:
+            children = (self.__validate(node['child'], f"{path}.child"),)
+        else:
+            children = ()
+        if node_type == 'parallel' and not 0 < node['success_threshold'] <= len(children):
+            raise xNodeError(f"{path}.success_threshold: must be between 1 and the number of children.")
+        if node_type == 'retry' and node.get('max_delay', 10.0) < node.get('base_delay', 0.1):
+            raise xNodeError(f"{path}.max_delay: must be at least base_delay.")
+        return TreeSpec(node_type, tuple(params), children)
+
+    def resolve(self, kind: str, name: str, policy: ExecutionPolicy = ExecutionPolicy.Inline) -> Callable[[], Any]:
+        func = self.functions.get(name)
+        if func is not None:
+            return func
+        if self.registry is not None:
+            if policy != ExecutionPolicy.Inline:
+                raise xNodeError(f"{kind.capitalize()} '{name}' runs on a connected client; its policy must be 'inline'.")
+            return self.registry.action(name) if kind == 'action' else self.registry.condition(name)
+        raise xNodeError(f"No function named '{name}' to run {kind} '{name}'.")
+
+    def build(self, spec: TreeSpec) -> Node:
+        node_type = spec.type
+        params = dict(spec.params)
+        if node_type == 'action':
+            policy = POLICIES[params.pop('policy', 'inline').lower()]
+            name = params['name']
+            params.setdefault('id', name)
+            return ActionNode(Action(func=self.resolve('action', name, policy), policy=policy, **params))
+        if node_type == 'condition':
+            policy = POLICIES[params.pop('policy', 'inline').lower()]
+            name = params['name']
+            params.setdefault('id', name)
+            return ConditionNode(Condition(func=self.resolve('condition', name, policy), policy=policy, **params))
+        children = [self.build(child) for child in spec.children]
+        if node_type == 'sequence':
+            return SequenceNode(children)
+        if node_type == 'selector':
+            return SelectorNode(children)
+        if node_type == 'parallel':
+            return ParallelNode(children, params['success_threshold'], params.get('max_concurrency'))
+        if node_type == 'invert':
+            return InvertDecorator(children[0])
+        if node_type == 'repeat':
+            return RepeatDecorator(children[0], params['count'])
+        if node_type == 'repeat_until_success':
+            return RepeatUntilSuccessDecorator(children[0], params.get('max_retries', 10))
+        if node_type == 'retry':
+            return RetryDecorator(children[0], params.get('max_retries', 3), params.get('base_delay', 0.1), params.get('max_delay', 10.0))
+        if node_type == 'circuit_breaker':
+            return CircuitBreakerDecorator(children[0], self.breaker, params.get('key'), params.get('timeout'))
+        return TimeoutDecorator(children[0], params['timeout'])
+
+
+class TreeDirectory:
+    """Keeps one scheduled tree per definition file in ``directory``.
+
+    ``sync`` adds trees for new files, removes those whose file is gone and
+    swaps in a new root when a file's content changed; unchanged files hit
+    the loader's cache and are left alone. ``watch`` repeats that every
+    ``interval`` seconds, so tree updates ship without a restart.
+
+    With ``partition = (index, count)`` only the files whose name hashes to
+    ``index`` are loaded, so ``count`` worker processes share the directory
+    without ticking any tree twice.
+
+    With a ``store`` the contexts of the trees are kept across restarts: a
+    tree picks up its last snapshot when it is loaded, and ``snapshot`` (or
+    ``persist``, periodically) writes the ones that changed since.
+
+    With ``metrics`` every tree reports its ticks under its file name; with
+    ``probe_nodes`` as well, each of its nodes is instrumented on its own.
+    """
+
+    def __init__(self, loader: TreeLoader, directory: Union[str, Path], scheduler: TreeScheduler, rate: Optional[float] = None, partition: Tuple[int, int] = (0, 1), store: Optional[SnapshotStore] = None, metrics: Optional[TickMetrics] = None, probe_nodes: bool = False) -> None:
+        self.loader = loader
+        self.directory = Path(directory)
+        self.scheduler = scheduler
+        self.rate = rate
+        self.partition = partition
+        self.store = store
+        self.metrics = metrics
+        self.probe_nodes = probe_nodes
+        self.trees: Dict[Path, Tuple[TreeSpec, CompiledBehaviorTree]] = {}
+        self._restored: Optional[Dict[str, Any]] = None
+
+    def sync(self) -> None:
+        index, count = self.partition
+        paths = {
+            path for path in self.directory.glob('*')
+            if path.suffix in FORMATS and zlib.crc32(path.name.encode()) % count == index
+        } if self.directory.is_dir() else set()
+        for path in set(self.trees) - paths:
+            _, tree = self.trees.pop(path)
+            self.scheduler.remove(tree)
+            tree.close()
+            if self.store is not None and not path.exists():
+                self.store.write({path.name: None})
+            logger.info("Unloaded tree %s", path)
+        for path in sorted(paths):
+            try:
+                spec = self.loader.read(path)
+                current = self.trees.get(path)
+                if current is not None and current[0] is spec:
+                    continue
+                root = self.__instrument(path, self.loader.build(spec))
+            except (OSError, xNodeError) as e:
+                logger.error("Could not load tree %s: %s", path, e)
+                continue
+            if current is None:
+                tree = CompiledBehaviorTree(root)
+                self.__restore(path, tree)
+                self.scheduler.add(tree, self.rate, path.stem)
+                logger.info("Loaded tree %s", path)
+            else:
+                tree = current[1]
+                tree.update(root)
+                logger.info("Reloaded tree %s", path)
+            self.trees[path] = (spec, tree)
+
+    async def watch(self, interval: float) -> None:
+        while True:
+            self.sync()
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> int:
+        """Write the contexts that changed since the last snapshot; returns the bytes written."""
+        if self.store is None:
+            return 0
+        return self.store.write({path.name: capture(tree) for path, (_, tree) in self.trees.items()})
+
+    async def persist(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.snapshot()
+            except (OSError, xNodeError) as e:
+                logger.error("Could not write snapshot to %s: %s", self.store.path, e)
+
+    def __instrument(self, path: Path, root: Node) -> Node:
+        if self.metrics is None:
+            return root
+        if self.probe_nodes:
+            root = instrument(root, self.metrics, path.stem)
+        return ProbeNode(root, path.stem, self.metrics)
+
+    def __restore(self, path: Path, tree: CompiledBehaviorTree) -> None:
+        if self.store is None:
+            return
+        if self._restored is None:
+            try:
+                self._restored = self.store.load()
+            except (OSError, xNodeError) as e:
+                logger.error("Could not read snapshot %s: %s", self.store.path, e)
+                self._restored = {}
+            logger.info("Read %d tree snapshots from %s", len(self._restored), self.store.path)
+        data = self._restored.pop(path.name, None)
+        if data is not None and restore(tree, data):
+            logger.info("Restored tree %s", path)
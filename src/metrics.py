@@ -0,0 +1,134 @@
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Dict, List
+
+from common.result import xNodeResult, xNodeStatus
+from src.behavior_tree import ActionNode, ConditionNode, Context, Node
+
+# Upper bounds in seconds: 1 µs doubling up to ~16.8 s, then an overflow bucket.
+BUCKETS: List[float] = [1e-6 * 2 ** i for i in range(25)]
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class NodeMetrics:
+    __slots__ = ('duration', 'statuses', 'in_flight')
+
+    def __init__(self) -> None:
+        self.duration = Histogram()
+        self.statuses = {status: 0 for status in xNodeStatus}
+        self.in_flight = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'duration': self.duration.to_dict(),
+            'statuses': {status.name: count for status, count in self.statuses.items()},
+            'in_flight': self.in_flight,
+        }
+
+
+class TickMetrics:
+    """Per-node tick durations, status counts and in-flight ticks.
+
+    Only trees instrumented with ``instrument`` report here; setting
+    ``enabled`` to False makes their probes pass straight through.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.nodes: Dict[str, NodeMetrics] = {}
+
+    def node(self, node_id: str) -> NodeMetrics:
+        metrics = self.nodes.get(node_id)
+        if metrics is None:
+            metrics = self.nodes[node_id] = NodeMetrics()
+        return metrics
+
+    def reset(self) -> None:
+        self.nodes.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {node_id: metrics.to_dict() for node_id, metrics in self.nodes.items()}
+
+
+class ProbeNode(Node):
+    """Transparent wrapper that reports its child's ticks to a ``TickMetrics``."""
+
+    transparent = True
+
+    def __init__(self, child: Node, node_id: str, metrics: TickMetrics) -> None:
+        self.child = child
+        self.node_id = node_id
+        self.metrics = metrics
+
+    async def tick(self, context: Context) -> xNodeResult:
+        if not self.metrics.enabled:
+            return await self.child.tick(context)
+        node = self.metrics.node(self.node_id)
+        node.in_flight += 1
+        started = perf_counter()
+        try:
+            result = await self.child.tick(context)
+        finally:
+            node.in_flight -= 1
+        node.duration.observe(perf_counter() - started)
+        node.statuses[result.status] += 1
+        return result
+
+    def __repr__(self) -> str:
+        return f"{self.child}"
+
+
+def node_id(node: Node, path: str) -> str:
+    """Leaves are identified by their action/condition id, other nodes by type and position."""
+    if isinstance(node, (ActionNode, ConditionNode)):
+        return node.child.id
+    return f"{type(node).__name__}@{path}"
+
+
+def instrument(root: Node, metrics: TickMetrics, path: str = "0") -> Node:
+    """Wrap ``root`` and every node below it in a ``ProbeNode``; idempotent."""
+    if isinstance(root, ProbeNode):
+        return root
+    children = getattr(root, 'children', None)
+    if isinstance(children, list):
+        for index, child in enumerate(children):
+            children[index] = instrument(child, metrics, f"{path}.{index}")
+    child = getattr(root, 'child', None)
+    if isinstance(child, Node):
+        root.child = instrument(child, metrics, f"{path}.0")
+    return ProbeNode(root, node_id(root, path), metrics)
@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import logging
+import marshal
+import socket
+import struct
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from common.error import xNodeError
+
+logger = logging.getLogger(__name__)
+
+# Frame header: length of the marshalled message that follows.
+FRAME = struct.Struct('<I')
+# Longer frames can only come from a corrupt stream.
+MAX_FRAME = 64 * 1024 * 1024
+
+
+def links(workers: int) -> List[Dict[int, socket.socket]]:
+    """One connected socket per pair of workers; item ``i`` maps every other worker to ``i``'s end."""
+    ends: List[Dict[int, socket.socket]] = [{} for _ in range(workers)]
+    for first in range(workers):
+        for second in range(first + 1, workers):
+            ends[first][second], ends[second][first] = socket.socketpair()
+    return ends
+
+
+class Peers:
+    """Links to the other worker processes, for invoking what their clients expose.
+
+    With several workers the kernel picks the worker a client connects to,
+    while each tree is ticked by exactly one of them. Every worker announces
+    the actions and conditions its clients expose to the others, and
+    ``xNodeRegistry`` forwards an invocation no local client can serve to a
+    worker that announced the name; ``invoke`` is how a worker serves the
+    invocations forwarded to it.
+
+    A worker says hello when it starts, so a restarted worker drops what the
+    others knew about its predecessor and learns what they expose anew. A
+    restarted worker gets fresh links, whose other ends the launcher passes
+    to the running workers over ``control``; a link that carries a message
+    this worker cannot decode is dropped like a closed one.
+    """
+
+    def __init__(self, sockets: Dict[int, socket.socket], invoke: Callable[[str, str], Awaitable[Any]], control: Optional[socket.socket] = None) -> None:
+        self.sockets = sockets
+        self.invoke_local = invoke
+        self.control = control
+        # Workers exposing every (kind, name), and what this one exposes.
+        self.exposed: Dict[Tuple[str, str], Set[int]] = {}
+        self._announced: Set[Tuple[str, str]] = set()
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._readers: Dict[int, asyncio.Task] = {}
+        self._pending: Dict[int, Tuple[int, asyncio.Future]] = {}
+        self._request_ids = itertools.count(1)
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        for peer, sock in self.sockets.items():
+            await self.__connect(peer, sock)
+        if self.control is not None:
+            self.control.setblocking(False)
+            asyncio.get_running_loop().add_reader(self.control.fileno(), self.__relink)
+
+    def close(self) -> None:
+        if self.control is not None:
+            asyncio.get_running_loop().remove_reader(self.control.fileno())
+        for task in list(self._tasks):
+            task.cancel()
+        for peer, writer in self._writers.items():
+            self.__forget(peer)
+            writer.close()
+        self._writers.clear()
+        self._readers.clear()
+
+    def announce(self, kind: str, name: str, exposed: bool) -> None:
+        """Tell the other workers whether this one's clients expose ``name``."""
+        if exposed:
+            self._announced.add((kind, name))
+        else:
+            self._announced.discard((kind, name))
+        for peer in self._writers:
+            self.__send(peer, ('announce', kind, name, exposed))
+
+    def exposes(self, kind: str, name: str) -> bool:
+        return bool(self.exposed.get((kind, name)))
+
+    async def invoke(self, kind: str, name: str, timeout: Optional[float] = None) -> Any:
+        """Run ``name`` on another worker's client, round-robin across the workers exposing it."""
+        owners = self.exposed.get((kind, name))
+        if not owners:
+            raise xNodeError(f"No connected client exposes {kind} '{name}'.")
+        cursor = self._cursors.get((kind, name), 0)
+        self._cursors[(kind, name)] = cursor + 1
+        peer = sorted(owners)[cursor % len(owners)]
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (peer, future)
+        try:
+            self.__send(peer, ('invoke', request_id, kind, name))
+            value, error = await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if error is not None:
+            raise xNodeError(error)
+        return value
+
+    async def __connect(self, peer: int, sock: socket.socket) -> None:
+        reader, writer = await asyncio.open_connection(sock=sock)
+        self._writers[peer] = writer
+        self.__send(peer, ('hello',))
+        for kind, name in self._announced:
+            self.__send(peer, ('announce', kind, name, True))
+        self._readers[peer] = self.__spawn(self.__read(peer, reader, writer))
+
+    def __relink(self) -> None:
+        try:
+            data, fds, _, _ = socket.recv_fds(self.control, FRAME.size, 1)
+        except (BlockingIOError, InterruptedError):
+            return
+        if not fds:
+            return
+        sock = socket.socket(fileno=fds[0])
+        peer, = FRAME.unpack(data)
+        self.__spawn(self.__replace(peer, sock))
+
+    async def __replace(self, peer: int, sock: socket.socket) -> None:
+        # The peer restarted: whatever is left on the old link is stale.
+        reader = self._readers.pop(peer, None)
+        if reader is not None:
+            reader.cancel()
+        writer = self._writers.pop(peer, None)
+        if writer is not None:
+            writer.close()
+        self.__forget(peer)
+        await self.__connect(peer, sock)
+
+    async def __read(self, peer: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                length, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                if length > MAX_FRAME:
+                    raise ValueError(f"frame of {length} bytes")
+                self.__receive(peer, marshal.loads(await reader.readexactly(length)))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.warning("Lost the link to worker %d: %r", peer, e)
+        except (ValueError, EOFError, TypeError, IndexError) as e:
+            logger.warning("Dropping the link to worker %d after a malformed message: %r", peer, e)
+        # A replaced link has already been forgotten.
+        if self._writers.get(peer) is writer:
+            self.__forget(peer)
+            del self._writers[peer]
+            del self._readers[peer]
+            writer.close()
+
+    def __receive(self, peer: int, message: Tuple) -> None:
+        op = message[0]
+        if op == 'result':
+            _, request_id, value, error = message
+            pending = self._pending.get(request_id)
+            if pending is not None and not pending[1].done():
+                pending[1].set_result((value, error))
+        elif op == 'invoke':
+            self.__spawn(self.__serve(peer, *message[1:]))
+        elif op == 'announce':
+            _, kind, name, exposed = message
+            if exposed:
+                self.exposed.setdefault((kind, name), set()).add(peer)
+            else:
+                self.__drop(peer, (kind, name))
+        elif op == 'hello':
+            self.__forget(peer)
+            for kind, name in self._announced:
+                self.__send(peer, ('announce', kind, name, True))
+
+    async def __serve(self, peer: int, request_id: int, kind: str, name: str) -> None:
+        try:
+            value, error = await self.invoke_local(kind, name), None
+        except Exception as e:
+            value, error = None, str(e) or type(e).__name__
+        if peer not in self._writers:
+            return
+        try:
+            self.__send(peer, ('result', request_id, value, error))
+        except ValueError:
+            self.__send(peer, ('result', request_id, None, f"Result of {kind} '{name}' cannot be passed between workers."))
+
+    def __drop(self, peer: int, key: Tuple[str, str]) -> None:
+        owners = self.exposed.get(key)
+        if owners is not None:
+            owners.discard(peer)
+            if not owners:
+                del self.exposed[key]
+                self._cursors.pop(key, None)
+
+    def __forget(self, peer: int) -> None:
+        # Whatever the peer announced or was asked is void once it restarts.
+        for key in [key for key, owners in self.exposed.items() if peer in owners]:
+            self.__drop(peer, key)
+        for owner, future in self._pending.values():
+            if owner == peer and not future.done():
+                future.set_exception(xNodeError(f"Worker {peer} restarted before answering."))
+
+    def __send(self, peer: int, message: Tuple) -> None:
+        payload = marshal.dumps(message)
+        self._writers[peer].write(FRAME.pack(len(payload)) + payload)
+
+    def __spawn(self, coroutine: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
@@ -0,0 +1,63 @@
+import asyncio
+import inspect
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from common.config import Config
+from common.error import xNodeError
+from src.entities.execution_policy import ExecutionPolicy
+
+
+class WorkerPools:
+    """Lazily created executors that synchronous actions and conditions are offloaded to.
+
+    Functions run with ``ExecutionPolicy.Process`` must be picklable, i.e.
+    defined at module level.
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None) -> None:
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def configure(self, config: Config) -> None:
+        """Apply pool sizes from the ``[pools]`` section; running pools are recreated."""
+        self.shutdown(wait=False)
+        self.thread_workers = config.get('pools', 'thread_workers', self.thread_workers)
+        self.process_workers = config.get('pools', 'process_workers', self.process_workers)
+
+    def executor(self, policy: ExecutionPolicy) -> Executor:
+        if policy == ExecutionPolicy.Thread:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="xnode")
+            return self._thread_pool
+        elif policy == ExecutionPolicy.Process:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+        raise xNodeError(f"Execution policy {policy} does not use a pool.")
+
+    async def run(self, func: Callable[[], Any], policy: ExecutionPolicy) -> Any:
+        """Run ``func`` according to ``policy``; coroutine functions never leave the loop.
+
+        An awaitable returned by a function run in a pool is awaited on the loop.
+        """
+        if policy == ExecutionPolicy.Inline or asyncio.iscoroutinefunction(func):
+            result = func()
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor(policy), func)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
+
+
+pools = WorkerPools()
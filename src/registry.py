@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import websockets
+
+from common.codec import Codec, codec_for
+from common.error import xNodeError
+from common.result import xNodeResult, xNodeStatus
+from src.peers import Peers
+from src.router import ConnectionStats
+
+
+class RemoteClient:
+    """Server side of one dispatcher connection.
+
+    Sends ``invoke_func`` requests and matches the client's replies to them by
+    ``request_id``; the endpoint reading the socket hands every incoming
+    message to ``resolve`` first.
+
+    All messages to the client go through ``send``. With ``max_pending_sends``
+    at most that many are written at once; the others wait up to
+    ``send_timeout`` seconds for a slot, so a slow client pushes back on the
+    trees invoking it instead of growing the socket buffer without bound.
+    """
+
+    def __init__(self, ws: websockets.WebSocketServerProtocol, codec: Optional[Codec] = None, max_pending_sends: Optional[int] = None, send_timeout: Optional[float] = None, stats: Optional[ConnectionStats] = None) -> None:
+        self.ws = ws
+        self.codec = codec if codec is not None else codec_for(ws.subprotocol)
+        self.send_timeout = send_timeout
+        self.stats = stats if stats is not None else ConnectionStats()
+        self._slots = asyncio.Semaphore(max_pending_sends) if max_pending_sends else None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+
+    async def send(self, message: Any) -> None:
+        data = self.codec.encode(message)
+        stats, slots = self.stats, self._slots
+        if slots is not None:
+            if slots.locked():
+                stats.send_blocked += 1
+                try:
+                    await asyncio.wait_for(slots.acquire(), timeout=self.send_timeout)
+                except asyncio.TimeoutError:
+                    stats.send_dropped += 1
+                    raise xNodeError(f"Send queue to {self!r} is full.") from None
+            else:
+                await slots.acquire()
+        stats.sending += 1
+        stats.peak_sending = max(stats.peak_sending, stats.sending)
+        try:
+            await self.ws.send(data)
+            stats.sent += 1
+        finally:
+            stats.sending -= 1
+            if slots is not None:
+                slots.release()
+
+    async def invoke(self, name: str, timeout: Optional[float] = None) -> Any:
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.send({'request_id': request_id, 'command': "invoke_func", 'name': name})
+            response = await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if 'error' in response:
+            raise xNodeError(response['error'])
+        return response.get('result')
+
+    def resolve(self, message: Any) -> bool:
+        """Complete the invocation ``message`` replies to; False if it is not a reply."""
+        if not isinstance(message, dict) or 'command' in message:
+            return False
+        future = self._pending.get(message.get('request_id'))
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(message)
+        return True
+
+    def close(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(xNodeError("Connection to the xNode client was closed."))
+
+    def __repr__(self) -> str:
+        return f"RemoteClient({self.ws.remote_address})"
+
+
+class xNodeRegistry:
+    """Which connected clients expose which actions and conditions.
+
+    Indexed by name (for routing invocations, round-robin across every client
+    exposing the same name) and by client (for purging a connection).
+    ``max_pending_sends``, ``send_timeout`` and ``stats`` are passed on to
+    every ``RemoteClient``. With ``peers`` set, names exposed here are
+    announced to the other workers and invocations no local client can serve
+    are forwarded to them.
+    """
+
+    def __init__(self, invoke_timeout: Optional[float] = None, max_pending_sends: Optional[int] = None, send_timeout: Optional[float] = None, stats: Optional[ConnectionStats] = None) -> None:
+        self.invoke_timeout = invoke_timeout
+        self.max_pending_sends = max_pending_sends
+        self.send_timeout = send_timeout
+        self.stats = stats if stats is not None else ConnectionStats()
+        self.actions: Dict[str, List[RemoteClient]] = {}
+        self.conditions: Dict[str, List[RemoteClient]] = {}
+        self._clients: Dict[RemoteClient, Set[Tuple[str, str]]] = {}
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self.peers: Optional[Peers] = None
+
+    def add_action(self, name: str, client: RemoteClient) -> bool:
+        return self.__add(self.actions, 'action', name, client)
+
+    def add_condition(self, name: str, client: RemoteClient) -> bool:
+        return self.__add(self.conditions, 'condition', name, client)
+
+    def __add(self, index: Dict[str, List[RemoteClient]], kind: str, name: str, client: RemoteClient) -> bool:
+        owners = index.setdefault(name, [])
+        if client in owners:
+            return False
+        owners.append(client)
+        self._clients.setdefault(client, set()).add((kind, name))
+        if len(owners) == 1 and self.peers is not None:
+            self.peers.announce(kind, name, True)
+        return True
+
+    def remove_client(self, client: RemoteClient) -> None:
+        for kind, name in self._clients.pop(client, ()):
+            index = self.actions if kind == 'action' else self.conditions
+            owners = index.get(name, [])
+            if client in owners:
+                owners.remove(client)
+            if not owners:
+                index.pop(name, None)
+                self._cursors.pop((kind, name), None)
+                if self.peers is not None:
+                    self.peers.announce(kind, name, False)
+
+    @asynccontextmanager
+    async def connection(self, ws: websockets.WebSocketServerProtocol) -> AsyncIterator[RemoteClient]:
+        """Track ``ws`` as a client for the duration of the block, purging it afterwards."""
+        client = RemoteClient(ws, max_pending_sends=self.max_pending_sends, send_timeout=self.send_timeout, stats=self.stats)
+        try:
+            yield client
+        finally:
+            self.remove_client(client)
+            client.close()
+
+    def registered(self, client: RemoteClient) -> Set[Tuple[str, str]]:
+        return set(self._clients.get(client, ()))
+
+    async def invoke_action(self, name: str) -> Any:
+        return await self.__invoke(self.actions, 'action', name)
+
+    async def invoke_condition(self, name: str) -> Any:
+        return await self.__invoke(self.conditions, 'condition', name)
+
+    async def invoke_local(self, kind: str, name: str) -> Any:
+        """Invoke ``name`` on a client of this worker only; what ``Peers`` serves forwarded invocations with."""
+        return await self.__invoke(self.actions if kind == 'action' else self.conditions, kind, name, forward=False)
+
+    async def __invoke(self, index: Dict[str, List[RemoteClient]], kind: str, name: str, forward: bool = True) -> Any:
+        owners = index.get(name)
+        if not owners:
+            if forward and self.peers is not None and self.peers.exposes(kind, name):
+                return await self.peers.invoke(kind, name, timeout=self.invoke_timeout)
+            raise xNodeError(f"No connected client exposes {kind} '{name}'.")
+        cursor = self._cursors.get((kind, name), 0)
+        self._cursors[(kind, name)] = cursor + 1
+        return await owners[cursor % len(owners)].invoke(name, timeout=self.invoke_timeout)
+
+    async def __attempt(self, kind: str, name: str) -> Any:
+        try:
+            return await self.__invoke(self.actions if kind == 'action' else self.conditions, kind, name)
+        except asyncio.TimeoutError:
+            error = f"{kind.capitalize()} '{name}' timed out after {self.invoke_timeout} seconds."
+        except (xNodeError, websockets.ConnectionClosed) as e:
+            error = str(e)
+        return xNodeResult(xNodeStatus.Failure, False, error)
+
+    def action(self, name: str) -> Callable[[], Awaitable[Any]]:
+        """Function for ``Action.func`` that runs ``name`` on a connected client.
+
+        A missing client, an error reply or a timeout comes back as a Failure
+        result rather than an exception, so the tree can fall back.
+        """
+        return lambda: self.__attempt('action', name)
+
+    def condition(self, name: str) -> Callable[[], Awaitable[Any]]:
+        """Function for ``Condition.func`` that evaluates ``name`` on a connected client, failing like ``action``."""
+        return lambda: self.__attempt('condition', name)
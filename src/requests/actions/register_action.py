@@ -1,7 +1,9 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any
 
 @dataclass
 class RegisterActionRequest():
     id: str
-    name: str
\ No newline at end of file
+    name: str
+    client: Any = field(default=None, repr=False, compare=False)
\ No newline at end of file
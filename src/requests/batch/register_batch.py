@@ -0,0 +1,8 @@
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+@dataclass
+class RegisterBatchRequest():
+    items: List[Dict[str, Any]]
+    client: Any = field(default=None, repr=False, compare=False)
\ No newline at end of file
@@ -0,0 +1,9 @@
+
+from dataclasses import dataclass, field
+from typing import Any
+
+@dataclass
+class RegisterConditionRequest():
+    id: str
+    name: str
+    client: Any = field(default=None, repr=False, compare=False)
\ No newline at end of file
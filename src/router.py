@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import http
 import logging
+import re
+import types
 import typing
+import urllib.parse
 
-import routes
 import websockets
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_PARAMETER = re.compile(r"\{(\w+)(?::([^}]+))?\}")
+_NO_PARAMS: typing.Mapping[str, str] = types.MappingProxyType({})
+
 class RoutedPath(str):
     """Represents a path matched to a route with parameters and context."""
     route: typing.Any
@@ -24,12 +29,35 @@ class RoutedPath(str):
         path.route = route
         path.params = params
         path.context = {}
-        logger.debug(f"Created RoutedPath: path={path}, route={route}, params={params}")
+        logger.debug("Created RoutedPath: path=%s, route=%s, params=%s", path, route, params)
         return path
 
 
+class ConnectionStats:
+    """Connection and send-queue counters of a ``Router``.
+
+    ``evicted`` counts connections closed because they stopped answering
+    keepalive pings; ``send_blocked`` counts sends that had to wait for a
+    free slot in a full send queue and ``send_dropped`` those that gave up.
+    """
+
+    __slots__ = ('open', 'peak_open', 'accepted', 'rejected', 'evicted', 'sending', 'peak_sending', 'sent', 'send_blocked', 'send_dropped')
+
+    def __init__(self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def to_dict(self) -> typing.Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class Protocol(websockets.WebSocketServerProtocol):
-    """Server protocol with routing support."""
+    """Server protocol with routing support.
+
+    Connections are counted from the moment the TCP connection is made, so
+    once the router's ``max_connections`` is reached new ones are refused
+    with 503 before their route is looked at.
+    """
     
     def __init__(self, router: Router, *args, **kwargs):
         if not isinstance(router, Router):
@@ -37,7 +65,32 @@ class Protocol(websockets.WebSocketServerProtocol):
         
         self._router = router
         super().__init__(*args, **kwargs)
-        logger.info(f"Protocol initialized with router: {router}")
+        logger.debug("Protocol initialized with router: %s", router)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        connections, stats = self._router.connections, self._router.stats
+        connections.add(self)
+        stats.accepted += 1
+        stats.open = len(connections)
+        stats.peak_open = max(stats.peak_open, stats.open)
+        super().connection_made(transport)
+
+    def connection_lost(self, exc: typing.Optional[Exception]) -> None:
+        self._router.connections.discard(self)
+        self._router.stats.open = len(self._router.connections)
+        super().connection_lost(exc)
+
+    def fail_connection(self, code: int = 1006, reason: str = "") -> None:
+        stale = code == 1011 and reason == "keepalive ping timeout" and not self.closed
+        super().fail_connection(code, reason)
+        if stale:
+            # A peer that stopped answering will not read the close frame
+            # either; drop the socket now instead of after ``close_timeout``,
+            # so the handler sees the connection closed and cleans up after
+            # it (``xNodeRegistry.connection`` purges the client).
+            self._router.stats.evicted += 1
+            logger.info("Evicting %s: no keepalive pong within %ss", self.remote_address, self.ping_timeout)
+            self.transport.abort()
 
 
     async def read_http_request(self) -> typing.Tuple[RoutedPath, websockets.http.Headers]:
@@ -49,27 +102,47 @@ class Protocol(websockets.WebSocketServerProtocol):
 
     async def process_request(self, path: RoutedPath, headers: websockets.http.Headers) -> typing.Optional[typing.Tuple[http.HTTPStatus, list, bytes]]:
         """Process the request if the route defines a process_request method."""
+        limit = self._router.max_connections
+        if limit is not None and len(self._router.connections) > limit:
+            self._router.stats.rejected += 1
+            logger.warning("Refusing %s: %d connections open", self.remote_address, len(self._router.connections) - 1)
+            return http.HTTPStatus.SERVICE_UNAVAILABLE, [('Retry-After', '1')], b"too many connections\n"
+
         if path.params is None:
-            logger.warning(f"Request path not found: {path}")
+            logger.warning("Request path not found: %s", path)
             return http.HTTPStatus.NOT_FOUND, [], b"not found\n"
         
         process_request = getattr(path.route, "process_request", None)
         if process_request is None:
-            logger.info(f"No process_request method found for route: {path.route}")
+            logger.debug("No process_request method found for route: %s", path.route)
             return None
-        logger.info(f"Processing request for path: {path}")
+        logger.debug("Processing request for path: %s", path)
         response = await process_request(path, headers)
         if response and not isinstance(response[0], http.HTTPStatus):
             response = (http.HTTPStatus(response[0]), *response[1:])
-        logger.debug(f"Processed response: {response}")
+        logger.debug("Processed response: %s", response)
         return response
 
 
 class Router:
-    """Router class to manage route matching and handling."""
+    """Router class to manage route matching and handling.
+
+    Routes are compiled when they are registered: static paths go into a dict,
+    parameterized paths (``/agents/{id}`` or ``/agents/{id:\\d+}``) into an
+    ordered regex table, and each route class is instantiated once. Recent
+    match results are kept in an LRU cache of ``cache_size`` paths.
 
-    def __init__(self):
-        self._mapper = routes.Mapper()
+    At most ``max_connections`` connections are served at a time; ``stats``
+    counts connections and, for clients that report to it, their sends.
+    """
+
+    def __init__(self, cache_size: int = 1024, max_connections: typing.Optional[int] = None):
+        self.max_connections = max_connections
+        self.connections: typing.Set[Protocol] = set()
+        self.stats = ConnectionStats()
+        self._static: typing.Dict[str, typing.Any] = {}
+        self._dynamic: typing.List[typing.Tuple[typing.Pattern[str], typing.Any]] = []
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._resolve)
 
     async def __call__(self, ws: websockets.WebSocketCommonProtocol, path: RoutedPath):
         """Handle incoming WebSocket requests."""
@@ -77,15 +150,15 @@ class Router:
             path = self.match(path)
 
         if path.params is None:
-            logger.warning(f"Closing WebSocket for unmatched path: {path}")
+            logger.warning("Closing WebSocket for unmatched path: %s", path)
             await ws.close(1000)
             return
 
         handle = getattr(path.route, "handle", None)
         if handle is None:
-            logger.info(f"No handle method found for route: {path.route}")
+            logger.debug("No handle method found for route: %s", path.route)
             return
-        logger.info(f"Handling WebSocket request for path: {path}")
+        logger.debug("Handling WebSocket request for path: %s", path)
         await handle(ws, path)
 
     def route(self, path: str, *, name: typing.Optional[str] = None):
@@ -95,24 +168,47 @@ class Router:
                 route_cls = endpoint
             else:
                 route_cls = type(endpoint.__name__, (), {"handle": staticmethod(endpoint)})
-            
-            self._mapper.connect(name, path, __route_cls=route_cls)
+
+            self._connect(path, route_cls())
             return endpoint
         return decorator
-    
-    def _match_route_cls(self, params: typing.Optional[typing.Mapping[str, typing.Any]]) -> typing.Optional[typing.Any]:
-        if params is None:
-            return None
-        return params.pop("__route_cls", None)()
+
+    def _connect(self, path: str, route: typing.Any) -> None:
+        if _PARAMETER.search(path) is None:
+            self._static.setdefault(path, route)
+        else:
+            self._dynamic.append((self._compile(path), route))
+        self._lookup.cache_clear()
+
+    @staticmethod
+    def _compile(path: str) -> typing.Pattern[str]:
+        pattern, position = [], 0
+        for parameter in _PARAMETER.finditer(path):
+            pattern.append(re.escape(path[position:parameter.start()]))
+            pattern.append(f"(?P<{parameter.group(1)}>{parameter.group(2) or '[^/]+'})")
+            position = parameter.end()
+        pattern.append(re.escape(path[position:]))
+        return re.compile("".join(pattern))
+
+    def _resolve(self, path: str) -> typing.Tuple[typing.Any, typing.Optional[typing.Mapping[str, str]]]:
+        route = self._static.get(path)
+        if route is not None:
+            return route, _NO_PARAMS
+        for pattern, route in self._dynamic:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                params = {key: urllib.parse.unquote(value) for key, value in match.groupdict().items()}
+                return route, types.MappingProxyType(params)
+        return None, None
 
     def match(self, path: str) -> RoutedPath:
         """Match a path to a route and return a RoutedPath object."""
-        params = self._mapper.match(path)
-        route = self._match_route_cls(params)
+        route, params = self._lookup(path.partition("?")[0])
         return RoutedPath.create(path, route, params)
 
     async def serve(self, host: str, port: int, *args, **kwargs) -> websockets.server.Serve:
-        logger.info(f"Starting WebSocket server on {host}:{port}")
+        sock = kwargs.get('sock')
+        logger.info("Starting WebSocket server on %s", sock.getsockname() if sock is not None else f"{host}:{port}")
         return await websockets.serve(
             ws_handler=self,
             host=host,
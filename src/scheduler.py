@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.behavior_tree import BehaviorTree
+from src.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTree:
+    """A tree registered with a ``TreeScheduler`` and its tick statistics."""
+
+    __slots__ = ('tree', 'name', 'period', 'due', 'task', 'removed', 'ticks', 'idle', 'skipped', 'overruns', 'errors', 'failing', 'duration')
+
+    def __init__(self, tree: BehaviorTree, period: float, due: float, name: Optional[str] = None) -> None:
+        self.tree = tree
+        self.name = name if name is not None else type(tree.root).__name__
+        self.period = period
+        self.due = due
+        self.task: Optional[asyncio.Task] = None
+        self.removed = False
+        self.ticks = 0
+        self.idle = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.errors = 0
+        # Ticks failed in a row; only the first of a streak is logged.
+        self.failing = 0
+        self.duration = Histogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rate': 1 / self.period,
+            'ticks': self.ticks,
+            'idle': self.idle,
+            'skipped': self.skipped,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'duration': self.duration.to_dict(),
+        }
+
+
+class TreeScheduler:
+    """Ticks many ``BehaviorTree`` instances at fixed rates on one event loop.
+
+    Every tree gets a random phase within its period so trees added together
+    do not all fire on the same loop iteration. A tree whose previous tick is
+    still in flight when it comes due is skipped for that slot, and an idle
+    reactive tree is not ticked at all; a tick that
+    takes longer than the tree's period counts as an overrun and is reported
+    to ``on_overrun``. ``lag`` records how late ticks start relative to their
+    slot, which is the number to watch when sizing trees per process.
+
+    A tick that raises counts in ``errors``; the first failure of a streak is
+    logged with the tree's name and traceback and the recovery once it ends.
+    """
+
+    def __init__(self, rate: float = 10.0, on_overrun: Optional[Callable[[ScheduledTree, float], None]] = None) -> None:
+        self.rate = rate
+        self.on_overrun = on_overrun
+        self.lag = Histogram()
+        self._trees: Dict[BehaviorTree, ScheduledTree] = {}
+        self._queue: List[Tuple[float, int, ScheduledTree]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    def add(self, tree: BehaviorTree, rate: Optional[float] = None, name: Optional[str] = None) -> ScheduledTree:
+        if tree in self._trees:
+            return self._trees[tree]
+        period = 1 / (rate or self.rate)
+        due = monotonic() + random.random() * period
+        scheduled = self._trees[tree] = ScheduledTree(tree, period, due, name)
+        heapq.heappush(self._queue, (due, next(self._sequence), scheduled))
+        self._wakeup.set()
+        return scheduled
+
+    def remove(self, tree: BehaviorTree) -> None:
+        scheduled = self._trees.pop(tree, None)
+        if scheduled is not None:
+            scheduled.removed = True
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def start(self) -> asyncio.Task:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self.run())
+        return self._runner
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        tasks = [scheduled.task for scheduled in self._trees.values() if scheduled.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self) -> None:
+        queue = self._queue
+        while True:
+            if not queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due, _, scheduled = queue[0]
+            now = monotonic()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(queue)
+            if scheduled.removed:
+                continue
+            self.lag.observe(now - due)
+            if scheduled.task is not None and not scheduled.task.done():
+                scheduled.skipped += 1
+            elif scheduled.tree.idle:
+                scheduled.idle += 1
+            else:
+                scheduled.task = asyncio.create_task(self.__tick(scheduled))
+            # Slots missed while the loop was busy are dropped rather than burst.
+            scheduled.due = max(due + scheduled.period, now)
+            heapq.heappush(queue, (scheduled.due, next(self._sequence), scheduled))
+
+    async def __tick(self, scheduled: ScheduledTree) -> None:
+        started = monotonic()
+        try:
+            await scheduled.tree.run()
+        except Exception:
+            scheduled.errors += 1
+            scheduled.failing += 1
+            if scheduled.failing == 1:
+                logger.exception("Ticks of tree %s are failing", scheduled.name)
+        else:
+            if scheduled.failing:
+                logger.info("Tree %s recovered after %d failed ticks", scheduled.name, scheduled.failing)
+                scheduled.failing = 0
+        duration = monotonic() - started
+        scheduled.ticks += 1
+        scheduled.duration.observe(duration)
+        if duration > scheduled.period:
+            scheduled.overruns += 1
+            if self.on_overrun is not None:
+                self.on_overrun(scheduled, duration)
+            else:
+                logger.warning("Tick overran its %.3fs period by %.3fs", scheduled.period, duration - scheduled.period)
+
+    def stats(self) -> Dict[str, Any]:
+        trees = self._trees.values()
+        return {
+            'trees': len(self._trees),
+            'ticks': sum(scheduled.ticks for scheduled in trees),
+            'idle': sum(scheduled.idle for scheduled in trees),
+            'skipped': sum(scheduled.skipped for scheduled in trees),
+            'overruns': sum(scheduled.overruns for scheduled in trees),
+            'errors': sum(scheduled.errors for scheduled in trees),
+            'lag': self.lag.to_dict(),
+        }
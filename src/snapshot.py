@@ -0,0 +1,245 @@
+import logging
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+from time import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from common.error import xNodeError
+from common.result import xNodeResult, xNodeStatus
+from src.behavior_tree import BehaviorTree, node_keys, pair_nodes, walk
+from src.entities.context import ContextEntry
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'xNS1'
+
+# Record header: payload length, crc32 of key and payload, wall-clock time
+# of the snapshot, key length. The key and the marshalled payload follow;
+# an empty payload is a tombstone.
+RECORD = struct.Struct('<IIdH')
+
+# Values of results kept in snapshots; anything else is restored as None.
+PLAIN = (bool, int, float, str, type(None))
+
+# Layout version of captured contexts, the first item of every payload.
+VERSION = 3
+
+
+class SnapshotStore:
+    """Append-only file of named snapshots; the latest record per name wins.
+
+    ``write`` appends only the snapshots that changed since they were last
+    written, so a periodic snapshot of many mostly idle trees costs little
+    I/O. Once the file is ``compact_ratio`` times larger than its live
+    records it is rewritten with just those. ``load`` memory-maps the file
+    and scans the record headers once; a record torn by a crash mid-write
+    fails its checksum and is truncated away with everything after it.
+
+    Several stores can share a key space (one per worker process): ``load``
+    also reads the ``shared`` files, and for every key the snapshot with the
+    latest time wins, so trees that move between workers keep their state.
+    """
+
+    def __init__(self, path: Union[str, Path], shared: Iterable[Union[str, Path]] = (), fsync: bool = True, compact_ratio: float = 4.0, compact_min: int = 1 << 20) -> None:
+        self.path = Path(path)
+        self.shared = [Path(other) for other in shared]
+        self.fsync = fsync
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self._file = None
+        self._size = 0
+        # Latest record per key as written to the file, for change detection
+        # and compaction.
+        self._records: Dict[str, bytes] = {}
+
+    def load(self) -> Dict[str, Any]:
+        """Latest snapshot per key from this file and the shared ones; opens the file for writing."""
+        latest: Dict[str, Tuple[float, Optional[bytes]]] = {}
+        for other in self.shared:
+            for key, (stamp, payload, _) in read(other)[0].items():
+                if key not in latest or stamp > latest[key][0]:
+                    latest[key] = (stamp, payload)
+        self.close()
+        self._records.clear()
+        records, valid = read(self.path)
+        for key, (stamp, payload, record) in records.items():
+            if payload is not None:
+                self._records[key] = record
+            if key not in latest or stamp >= latest[key][0]:
+                latest[key] = (stamp, payload)
+        self.__open(valid)
+        return {key: marshal.loads(payload) for key, (_, payload) in latest.items() if payload is not None}
+
+    def write(self, snapshots: Dict[str, Any]) -> int:
+        """Append the snapshots that changed; None removes a key. Returns the bytes written."""
+        if self._file is None:
+            self.load()
+        stamp = time()
+        chunks = []
+        for key, data in snapshots.items():
+            payload = marshal.dumps(data) if data is not None else b''
+            current = self._records.get(key)
+            if current is not None and current[RECORD.size:] == key.encode() + payload:
+                continue
+            if data is None and current is None:
+                continue
+            record = pack(key, payload, stamp)
+            chunks.append(record)
+            if data is None:
+                del self._records[key]
+            else:
+                self._records[key] = record
+        if not chunks:
+            return 0
+        written = self.__append(b''.join(chunks))
+        live = sum(len(record) for record in self._records.values())
+        if self._size > self.compact_min and self._size > self.compact_ratio * live:
+            self.compact()
+        return written
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest record per key."""
+        temporary = self.path.with_name(self.path.name + '.tmp')
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            for record in self._records.values():
+                f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(temporary, self.path)
+        self.__open(None)
+        logger.info("Compacted %s to %d bytes", self.path, self._size)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __open(self, valid: Optional[int]) -> None:
+        # ``valid`` is the length of the intact prefix of the file; anything
+        # after it is a torn write and is cut off before appending.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a+b')
+        size = self._file.seek(0, os.SEEK_END)
+        if valid is not None and valid < size:
+            logger.warning("Truncating %d bytes of incomplete snapshot records from %s", size - valid, self.path)
+            self._file.truncate(valid)
+            size = valid
+        if size < len(MAGIC):
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+            size = len(MAGIC)
+        self._size = size
+
+    def __append(self, data: bytes) -> int:
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._size += len(data)
+        return len(data)
+
+
+def pack(key: str, payload: bytes, stamp: float) -> bytes:
+    body = key.encode() + payload
+    return RECORD.pack(len(payload), zlib.crc32(body), stamp, len(body) - len(payload)) + body
+
+
+def read(path: Union[str, Path]) -> Tuple[Dict[str, Tuple[float, Optional[bytes], bytes]], int]:
+    """Latest ``(time, payload, record)`` per key in ``path`` and the length of its intact prefix.
+
+    The payload is None for a removed key. A missing file reads as empty.
+    """
+    records: Dict[str, Tuple[float, Optional[bytes], bytes]] = {}
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return records, 0
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            return records, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(MAGIC)] != MAGIC:
+                raise xNodeError(f"{path} is not a snapshot file.")
+            offset = len(MAGIC)
+            while offset + RECORD.size <= size:
+                length, checksum, stamp, key_length = RECORD.unpack_from(view, offset)
+                end = offset + RECORD.size + key_length + length
+                if end > size:
+                    break
+                body = view[offset + RECORD.size:end]
+                if zlib.crc32(body) != checksum:
+                    break
+                key = body[:key_length].decode()
+                payload = body[key_length:]
+                records[key] = (stamp, payload or None, view[offset:end])
+                offset = end
+    return records, offset
+
+
+def capture(tree: BehaviorTree) -> Tuple:
+    """Plain-data copy of ``tree``'s context: history, ``execute_once`` completions and node progress.
+
+    Running action handles cannot be persisted; their slots keep the repeat
+    iteration, so a restored action is invoked again on its next tick.
+    Condition caches are not kept either; they refill on the first tick.
+    The tick count is left out: it changes on every tick and would make an
+    idle tree look changed to ``SnapshotStore.write``.
+    """
+    context = tree.context
+    history = []
+    for entry in context.get():
+        result = entry.result
+        if isinstance(result, xNodeResult):
+            value = result.value if isinstance(result.value, PLAIN) else None
+            error = None if result.error is None else str(result.error)
+            history.append((entry.id, entry.time.timestamp(), result.status.value, value, error))
+        else:
+            history.append((entry.id, entry.time.timestamp(), None, bool(result), None))
+    state = [
+        [None if status is None else status.value for status in value] if isinstance(value, list) else value
+        for value in context.state[:tree.size]
+    ]
+    return (VERSION, history, sorted(context.completed), slot_keys(tree), state)
+
+
+def restore(tree: BehaviorTree, data: Tuple) -> bool:
+    """Load a ``capture`` into ``tree``'s context; returns False if ``data`` has another layout.
+
+    Progress is matched to the current root by node keys, as in
+    ``BehaviorTree.update``, so a tree whose definition changed while the
+    server was down keeps the progress of the nodes it still has.
+    """
+    if not data or data[0] != VERSION:
+        return False
+    _, history, completed, keys, state = data
+    context = tree.context
+    context.completed.update(completed)
+    for id, stamp, status, value, error in history:
+        result = value if status is None else xNodeResult(xNodeStatus(status), value, error)
+        context.remove(id)
+        context.save(ContextEntry(id=id, time=datetime.fromtimestamp(stamp), result=result))
+    if tree.root is not None:
+        if len(context.state) < tree.size:
+            context.state.extend([0] * (tree.size - len(context.state)))
+        for new, old in pair_nodes(keys, slot_keys(tree)):
+            value = state[old]
+            context.state[new] = [None if status is None else xNodeStatus(status) for status in value] if isinstance(value, list) else value
+    return True
+
+
+def slot_keys(tree: BehaviorTree) -> List[Any]:
+    """``node_keys`` of ``tree``'s nodes by slot."""
+    keys: List[Any] = [None] * tree.size
+    if tree.root is not None:
+        by_node = node_keys(tree.root)
+        for node in walk(tree.root):
+            keys[node.slot] = by_node[id(node)]
+    return keys
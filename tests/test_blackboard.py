@@ -0,0 +1,101 @@
+import asyncio
+import gc
+
+import pytest
+
+from common.error import xNodeError
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, BehaviorTree, ConditionNode, Context, SequenceNode
+from src.blackboard import Blackboard
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+def test_versions_move_on_changes_only():
+    blackboard = Blackboard({'hp': 10})
+    changed = []
+    blackboard.subscribe(changed.append)
+    blackboard.set('hp', 10)
+    assert blackboard.versions(['hp', 'enemy']) == (1, 0)
+    blackboard['hp'] = 5
+    blackboard.delete('hp')
+    blackboard.delete('hp')
+    assert blackboard.versions(['hp']) == (3,)
+    assert changed == ['hp', 'hp']
+    assert 'hp' not in blackboard
+
+
+def test_unsubscribe():
+    blackboard, changed = Blackboard(), []
+    blackboard.subscribe(changed.append)
+    blackboard.unsubscribe(changed.append)
+    blackboard.set('hp', 1)
+    assert changed == []
+
+
+def guard(blackboard: Blackboard, calls: list, depends_on=('enemy',)):
+    return SequenceNode([
+        ConditionNode(Condition(id='enemy', name='enemy', func=lambda: blackboard.get('enemy', False), depends_on=list(depends_on))),
+        ActionNode(Action(id='attack', name='attack', func=lambda: calls.append('attack') or True)),
+    ])
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_reactive_tree_ticks_only_after_watched_changes(executor):
+    async def run():
+        blackboard, calls = Blackboard({'enemy': True}), []
+        tree = executor(guard(blackboard, calls), Context(blackboard=blackboard), reactive=True)
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert tree.idle
+        await tree.run()
+        assert calls == ['attack']
+        blackboard.set('weather', 'rain')
+        assert tree.idle
+        blackboard.set('enemy', False)
+        assert not tree.idle
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert calls == ['attack']
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_tree_with_undeclared_dependencies_is_never_idle(executor):
+    async def run():
+        blackboard, calls = Blackboard({'enemy': True}), []
+        tree = executor(guard(blackboard, calls, depends_on=()), Context(blackboard=blackboard), reactive=True)
+        await tree.run()
+        await tree.run()
+        assert not tree.idle
+        assert calls == ['attack', 'attack']
+
+    asyncio.run(run())
+
+
+def test_running_tree_is_not_idle():
+    async def run():
+        blackboard = Blackboard()
+        tree = BehaviorTree(ActionNode(Action(id='walk', name='walk', func=lambda: xNodeStatus.Running)), Context(blackboard=blackboard), reactive=True)
+        assert (await tree.run()).status == xNodeStatus.Running
+        assert not tree.idle
+
+    asyncio.run(run())
+
+
+def test_reactive_tree_needs_a_blackboard():
+    with pytest.raises(xNodeError):
+        BehaviorTree(reactive=True)
+
+
+def test_closed_and_collected_trees_leave_no_subscribers():
+    blackboard = Blackboard()
+    trees = [BehaviorTree(guard(blackboard, []), Context(blackboard=blackboard), reactive=True) for _ in range(3)]
+    trees[0].close()
+    assert len(blackboard._subscribers) == 2
+    del trees
+    gc.collect()
+    blackboard.set('enemy', True)
+    assert blackboard._subscribers == []
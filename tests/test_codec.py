@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+import websockets
+
+import main
+from common.codec import JsonCodec, MsgpackCodec, codec_for, msgpack, subprotocols
+from common.error import xNodeError
+from tests.support import free_port
+
+MESSAGE = {'request_id': 7, 'command': 'invoke_func', 'name': 'wave', 'items': [1, 2.5, None, True]}
+
+
+@pytest.mark.parametrize('subprotocol', subprotocols())
+def test_round_trip(subprotocol):
+    codec = codec_for(subprotocol)
+    assert codec.subprotocol == subprotocol
+    assert codec.decode(codec.encode(MESSAGE)) == MESSAGE
+
+
+def test_binary_codec_is_preferred():
+    if msgpack is None:
+        pytest.skip("msgpack is not installed")
+    assert subprotocols() == [MsgpackCodec.subprotocol, JsonCodec.subprotocol]
+    assert isinstance(codec_for(MsgpackCodec.subprotocol).encode(MESSAGE), bytes)
+
+
+def test_no_subprotocol_means_json():
+    assert isinstance(codec_for(None), JsonCodec)
+    assert codec_for(None) is codec_for(None)
+
+
+def test_unknown_subprotocol_is_rejected():
+    with pytest.raises(xNodeError):
+        codec_for('xnode.xml')
+
+
+@pytest.mark.parametrize('subprotocol', subprotocols())
+def test_server_answers_in_negotiated_encoding(subprotocol):
+    async def run():
+        port = free_port()
+        server = await main.router.serve('localhost', port, subprotocols=subprotocols())
+        codec = codec_for(subprotocol)
+        async with websockets.connect(f'ws://localhost:{port}/dispatcher', subprotocols=[subprotocol]) as ws:
+            assert ws.subprotocol == subprotocol
+            await ws.send(codec.encode({'request_id': 1, 'command': 'unknown'}))
+            reply = await ws.recv()
+            assert isinstance(reply, bytes) == (subprotocol == MsgpackCodec.subprotocol)
+            assert codec.decode(reply) == {'request_id': 1, 'error': "Unknown command 'unknown'"}
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
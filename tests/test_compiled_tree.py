@@ -0,0 +1,91 @@
+import asyncio
+import random
+from typing import Callable, List, Tuple
+
+import pytest
+
+from src.behavior_tree import (
+    ActionNode,
+    BehaviorTree,
+    ConditionNode,
+    InvertDecorator,
+    Node,
+    ParallelNode,
+    RepeatDecorator,
+    RepeatUntilSuccessDecorator,
+    SelectorNode,
+    SequenceNode,
+    TimeoutDecorator,
+)
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+
+
+def random_tree(seed: int, trace: List[Tuple[int, bool]]) -> Node:
+    """A random tree whose leaves follow a fixed pattern and log their calls to ``trace``."""
+    rng = random.Random(seed)
+    count = 0
+
+    def leaf() -> Node:
+        nonlocal count
+        count += 1
+        index = count
+        pattern = [rng.random() < 0.6 for _ in range(7)]
+        calls = 0
+
+        def func() -> bool:
+            nonlocal calls
+            value = pattern[calls % len(pattern)]
+            calls += 1
+            trace.append((index, value))
+            return value
+
+        async def async_func() -> bool:
+            return func()
+
+        func_ = async_func if rng.random() < 0.3 else func
+        if rng.random() < 0.5:
+            return ActionNode(Action(id=str(index), name='a', func=func_, repeat=rng.random() < 0.3, repeat_count=rng.randint(0, 3), execute_once=rng.random() < 0.2))
+        return ConditionNode(Condition(id=str(index), name='c', func=func_))
+
+    def build(depth: int) -> Node:
+        if depth == 0 or rng.random() < 0.25:
+            return leaf()
+        kind = rng.randint(0, 6)
+        children: Callable[[], List[Node]] = lambda: [build(depth - 1) for _ in range(rng.randint(0, 4))]
+        if kind == 0:
+            return SequenceNode(children())
+        if kind == 1:
+            return SelectorNode(children())
+        if kind == 2:
+            nodes = children()
+            return ParallelNode(nodes, rng.randint(0, len(nodes) + 1))
+        if kind == 3:
+            return InvertDecorator(build(depth - 1))
+        if kind == 4:
+            return RepeatDecorator(build(depth - 1), rng.randint(0, 3))
+        if kind == 5:
+            return RepeatUntilSuccessDecorator(build(depth - 1), rng.randint(0, 3))
+        return TimeoutDecorator(build(depth - 1), 5)
+
+    return build(5)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_compiled_matches_recursive(seed):
+    async def run():
+        recursive_trace, compiled_trace = [], []
+        recursive = BehaviorTree(random_tree(seed, recursive_trace))
+        compiled = CompiledBehaviorTree(random_tree(seed, compiled_trace))
+        # Timeouts keep their deadlines in the state; each executor sets its own.
+        state = lambda tree: ['deadline' if isinstance(value, float) else value for value in tree.context.state]
+        for _ in range(6):
+            expected, actual = await recursive.run(), await compiled.run()
+            assert (actual.status, actual.value) == (expected.status, expected.value)
+            assert state(compiled) == state(recursive)
+        assert compiled_trace == recursive_trace
+        history = lambda tree: [(entry.id, entry.result.status) for entry in tree.context.get()]
+        assert history(compiled) == history(recursive)
+
+    asyncio.run(run())
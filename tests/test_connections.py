@@ -0,0 +1,126 @@
+import asyncio
+import http
+import json
+import urllib.request
+
+import pytest
+import websockets
+
+import main
+from common.error import xNodeError
+from src.registry import RemoteClient
+from src.router import ConnectionStats, Router
+from tests.support import free_port, wait_for
+
+
+def echo_router(max_connections=None) -> Router:
+    router = Router(max_connections=max_connections)
+
+    @router.route("/echo")
+    async def echo(ws, path):
+        async for message in ws:
+            await ws.send(message)
+
+    return router
+
+
+def test_connections_past_the_limit_are_refused():
+    async def run():
+        router = echo_router(max_connections=2)
+        port = free_port()
+        server = await router.serve('localhost', port)
+        url = f'ws://localhost:{port}/echo'
+        first, second = await websockets.connect(url), await websockets.connect(url)
+        with pytest.raises(websockets.InvalidStatusCode) as error:
+            await websockets.connect(url)
+        assert error.value.status_code == http.HTTPStatus.SERVICE_UNAVAILABLE
+        await first.close()
+        await wait_for(lambda: router.stats.open == 1)
+        async with websockets.connect(url) as third:
+            await third.send('ping')
+            assert await third.recv() == 'ping'
+        await second.close()
+        await wait_for(lambda: router.stats.open == 0)
+        assert router.stats.to_dict()['accepted'] == 4
+        assert (router.stats.rejected, router.stats.peak_open) == (1, 3)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_unresponsive_connections_are_evicted():
+    async def run():
+        router = echo_router()
+        port = free_port()
+        server = await router.serve('localhost', port, ping_interval=0.05, ping_timeout=0.05)
+        client = await websockets.connect(f'ws://localhost:{port}/echo', ping_interval=None)
+        # Stop reading, so pings go unanswered.
+        client.transport.pause_reading()
+        await wait_for(lambda: router.stats.evicted == 1)
+        await wait_for(lambda: router.stats.open == 0)
+        client.transport.abort()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_connections_route_reports_the_stats():
+    async def run():
+        port = free_port()
+        server = await main.router.serve('localhost', port)
+        response = await asyncio.to_thread(urllib.request.urlopen, f'http://localhost:{port}/connections')
+        stats = json.loads(response.read())
+        assert set(stats) == set(ConnectionStats.__slots__)
+        assert stats['open'] >= 1
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+class Socket:
+    """Stands in for a server connection whose client reads nothing."""
+
+    subprotocol = None
+    remote_address = ('127.0.0.1', 0)
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.release = asyncio.Event()
+
+    async def send(self, data) -> None:
+        await self.release.wait()
+        self.sent.append(data)
+
+
+def test_full_send_queue_blocks_then_drops():
+    async def run():
+        ws, stats = Socket(), ConnectionStats()
+        client = RemoteClient(ws, max_pending_sends=1, send_timeout=0.05, stats=stats)
+        first = asyncio.create_task(client.send({'n': 1}))
+        await asyncio.sleep(0)
+        with pytest.raises(xNodeError, match='full'):
+            await client.send({'n': 2})
+        assert (stats.sending, stats.peak_sending, stats.send_blocked, stats.send_dropped) == (1, 1, 1, 1)
+        third = asyncio.create_task(client.send({'n': 3}))
+        await asyncio.sleep(0)
+        ws.release.set()
+        await first
+        await third
+        assert [json.loads(data) for data in ws.sent] == [{'n': 1}, {'n': 3}]
+        assert (stats.sent, stats.sending, stats.send_blocked) == (2, 0, 2)
+
+    asyncio.run(run())
+
+
+def test_dropped_reply_keeps_the_connection_served():
+    async def run():
+        class Full:
+            async def send(self, message):
+                raise xNodeError("Send queue is full.")
+
+        await main.reply(Full(), {'request_id': 1})
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, BehaviorTree, Context, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.context import ContextEntry
+
+
+def ids(context: Context):
+    return [entry.id for entry in context.get()]
+
+
+def test_save_replaces_and_moves_to_end():
+    context = Context()
+    for id in 'abc':
+        context.save(ContextEntry(id=id, result=False))
+    context.save(ContextEntry(id='a', result=True))
+    assert ids(context) == ['b', 'c', 'a']
+    assert len(context) == 3
+    assert context.get(lambda entry: entry.id == 'a')[0].result is True
+
+
+def test_max_entries_evicts_oldest():
+    context = Context(max_entries=2)
+    for id in 'abc':
+        context.save(ContextEntry(id=id))
+    assert ids(context) == ['b', 'c']
+    context.save(ContextEntry(id='b'))
+    context.save(ContextEntry(id='d'))
+    assert ids(context) == ['b', 'd']
+
+
+def test_max_age_evicts_expired():
+    context = Context(max_age=60)
+    context.save(ContextEntry(id='a'))
+    context.save(ContextEntry(id='b'))
+    context.get()[0].time = datetime.now() - timedelta(seconds=120)
+    assert not context.has_completed('a')
+    assert ids(context) == ['b']
+    context.get()[0].time = datetime.now() - timedelta(seconds=120)
+    assert ids(context) == []
+
+
+def test_update_keeps_entry_and_refreshes_time():
+    context = Context()
+    assert not context.update(ContextEntry(id='a', result=False))
+    entry = context.get()[0]
+    entry.time = datetime.now() - timedelta(seconds=10)
+    context.save(ContextEntry(id='b'))
+    assert context.update(ContextEntry(id='a', result=True))
+    assert ids(context) == ['b', 'a']
+    assert entry.result is True and entry.time > datetime.now() - timedelta(seconds=1)
+
+
+@pytest.mark.parametrize('executor', [BehaviorTree, CompiledBehaviorTree])
+def test_execute_once_outlives_retention(executor):
+    async def run():
+        calls = []
+        context = Context(max_entries=1)
+        tree = executor(SequenceNode([
+            ActionNode(Action(id='init', name='init', func=lambda: calls.append('init') or True, execute_once=True)),
+            ActionNode(Action(id='step', name='step', func=lambda: True)),
+        ]), context)
+        for _ in range(3):
+            assert (await tree.run()).status == xNodeStatus.Success
+        assert ids(context) == ['step']
+        assert calls == ['init']
+
+    asyncio.run(run())
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+from api.dispatcher import xNodeDispatcher
+from common.error import xNodeError
+from tests.support import free_port, wait_for
+
+
+@pytest.fixture
+def port():
+    return free_port()
+
+
+def test_registers_and_serves_invocations(port):
+    async def run():
+        server = await main.router.serve('localhost', port)
+        dispatcher = xNodeDispatcher(f'ws://localhost:{port}/dispatcher')
+
+        @dispatcher.action()
+        def wave():
+            return 'hello'
+
+        @dispatcher.condition()
+        async def ready():
+            return True
+
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'wave' in main.registry.actions and 'ready' in main.registry.conditions)
+        assert await main.registry.invoke_action('wave') == 'hello'
+        assert await main.registry.invoke_condition('ready') is True
+        await dispatcher.close()
+        await serving
+        await wait_for(lambda: 'wave' not in main.registry.actions)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_reconnects_and_registers_again(port):
+    async def run():
+        server = await main.router.serve('localhost', port)
+        dispatcher = xNodeDispatcher(f'ws://localhost:{port}/dispatcher')
+
+        @dispatcher.action()
+        def patrol():
+            return True
+
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'patrol' in main.registry.actions)
+        server.close()
+        await server.wait_closed()
+        await serving
+        assert 'patrol' not in main.registry.actions
+
+        server = await main.router.serve('localhost', port)
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'patrol' in main.registry.actions)
+        assert await main.registry.invoke_action('patrol') is True
+        await dispatcher.close()
+        await serving
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_keeps_functions_queued(port):
+    async def run():
+        dispatcher = xNodeDispatcher(f'ws://localhost:{port}/dispatcher')
+
+        @dispatcher.action()
+        def alarm():
+            return True
+
+        with pytest.raises(OSError):
+            await dispatcher.flush()
+        server = await main.router.serve('localhost', port)
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'alarm' in main.registry.actions)
+        await dispatcher.close()
+        await serving
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_blocking_function_runs_in_a_thread(port):
+    async def run():
+        server = await main.router.serve('localhost', port)
+        dispatcher = xNodeDispatcher(f'ws://localhost:{port}/dispatcher', invoke_timeout=0.2)
+
+        @dispatcher.action()
+        def block():
+            time.sleep(0.5)
+            return True
+
+        @dispatcher.action()
+        def quick():
+            return True
+
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'block' in main.registry.actions and 'quick' in main.registry.actions)
+        blocked = asyncio.create_task(main.registry.invoke_action('block'))
+        await asyncio.sleep(0.05)
+        assert await asyncio.wait_for(main.registry.invoke_action('quick'), timeout=0.2) is True
+        with pytest.raises(xNodeError, match='timed out'):
+            await blocked
+        await dispatcher.close()
+        await serving
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_register_inside_invocation_at_limit(port):
+    async def run():
+        server = await main.router.serve('localhost', port)
+        dispatcher = xNodeDispatcher(f'ws://localhost:{port}/dispatcher', max_in_flight=1)
+
+        @dispatcher.action()
+        async def spawn():
+            await asyncio.sleep(0.05)
+            await dispatcher.register_action('spawned', lambda: True)
+            return True
+
+        @dispatcher.action()
+        def other():
+            return True
+
+        serving = asyncio.create_task(dispatcher.start())
+        await wait_for(lambda: 'spawn' in main.registry.actions and 'other' in main.registry.actions)
+        results = await asyncio.wait_for(asyncio.gather(main.registry.invoke_action('spawn'), main.registry.invoke_action('other')), timeout=2)
+        assert results == [True, True]
+        assert 'spawned' in main.registry.actions
+        await dispatcher.close()
+        await serving
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, BehaviorTree, Node, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+def build(gate: dict, calls: list, *extra: str) -> Node:
+    def slow():
+        calls.append('slow')
+        return gate['future']
+
+    children = [
+        ActionNode(Action(id='first', name='first', func=lambda: calls.append('first') or True)),
+        ActionNode(Action(id='slow', name='slow', func=slow)),
+    ]
+    children += [ActionNode(Action(id=id, name=id, func=lambda id=id: calls.append(id) or True)) for id in extra]
+    return SequenceNode(children)
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_running_action_survives_swap(executor):
+    async def run():
+        gate, calls = {'future': asyncio.get_running_loop().create_future()}, []
+        tree = executor(build(gate, calls))
+        assert (await tree.run()).status == xNodeStatus.Running
+        assert tree.update(build(gate, calls, 'added'))
+        gate['future'].set_result(True)
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert calls.count('slow') == 1
+        assert calls[-1] == 'added'
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_removed_running_action_is_cancelled(executor):
+    async def run():
+        gate, calls = {'future': asyncio.get_running_loop().create_future()}, []
+        tree = executor(build(gate, calls))
+        await tree.run()
+        tree.update(SequenceNode([ActionNode(Action(id='first', name='first', func=lambda: True))]))
+        assert gate['future'].cancelled()
+        assert tree.context.handles == {}
+        assert (await tree.run()).status == xNodeStatus.Success
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_swap_during_tick_is_deferred(executor):
+    async def run():
+        gate, calls = {'future': asyncio.get_running_loop().create_future()}, []
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+            return True
+
+        tree = executor(SequenceNode([ActionNode(Action(id='wait', name='wait', func=wait))]))
+        tick = asyncio.create_task(tree.run())
+        await asyncio.sleep(0)
+        assert not tree.update(build(gate, calls))
+        release.set()
+        assert (await tick).status == xNodeStatus.Success
+        assert len(tree.root.children) == 2
+
+    asyncio.run(run())
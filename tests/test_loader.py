@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from common.error import xNodeError
+from src.behavior_tree import ActionNode, ParallelNode, RetryDecorator, SequenceNode, TimeoutDecorator
+from src.loader import TreeLoader
+
+
+def document(root: dict) -> str:
+    return json.dumps({'root': root})
+
+
+def action(name: str = 'work', **fields) -> dict:
+    return {'type': 'action', 'name': name, **fields}
+
+
+def test_parse_caches_specs_by_content():
+    loader = TreeLoader(functions={'work': lambda: True})
+    spec = loader.parse(document(action()))
+    assert loader.parse(document(action()).encode()) is spec
+    assert loader.parse('root = { type = "action", name = "work" }', 'toml') == spec
+    assert loader.parse(document(action(repeat=True))) is not spec
+
+
+def test_cache_size_bounds_the_specs_kept():
+    loader = TreeLoader(cache_size=2)
+    first = loader.parse(document(action('a')))
+    loader.parse(document(action('b')))
+    loader.parse(document(action('c')))
+    assert loader.parse(document(action('a'))) is not first
+
+
+def test_build_creates_fresh_nodes():
+    loader = TreeLoader(functions={'work': lambda: True})
+    spec = loader.parse(document({
+        'type': 'sequence',
+        'children': [
+            {'type': 'timeout', 'timeout': 1.5, 'child': action()},
+            {'type': 'parallel', 'success_threshold': 1, 'max_concurrency': 2, 'children': [action(id='other')]},
+            {'type': 'retry', 'child': action(), 'max_retries': 0},
+        ],
+    }))
+    root = loader.build(spec)
+    assert isinstance(root, SequenceNode)
+    timeout, parallel, retry = root.children
+    assert isinstance(timeout, TimeoutDecorator) and timeout.timeout == 1.5
+    assert isinstance(timeout.child, ActionNode) and timeout.child.child.id == 'work'
+    assert isinstance(parallel, ParallelNode) and parallel.max_concurrency == 2
+    assert parallel.children[0].child.id == 'other'
+    assert isinstance(retry, RetryDecorator) and retry.max_retries == 0
+    assert loader.build(spec) is not root
+
+
+@pytest.mark.parametrize('root, message', [
+    ({'type': 'loop'}, "unknown node type 'loop'"),
+    (action(speed=2), 'unknown field'),
+    ({'type': 'action'}, "requires 'name'"),
+    (action(repeat_count='3'), 'repeat_count: expected int'),
+    (action(repeat=1), 'repeat: expected bool'),
+    ({'type': 'repeat', 'count': True, 'child': action()}, 'count: expected int'),
+    (action(policy='gpu'), 'unknown execution policy'),
+    ({'type': 'condition', 'name': 'c', 'depends_on': [1]}, 'list of blackboard keys'),
+    ({'type': 'sequence', 'children': [42]}, r'root\.children\[0\]: expected a node table'),
+    ({'type': 'parallel', 'success_threshold': 2, 'children': [action()]}, 'success_threshold'),
+])
+def test_invalid_definitions(root, message):
+    with pytest.raises(xNodeError, match=message):
+        TreeLoader().parse(document(root))
+
+
+@pytest.mark.parametrize('root, field', [
+    ({'type': 'parallel', 'success_threshold': 1, 'max_concurrency': 0, 'children': [action()]}, 'max_concurrency'),
+    ({'type': 'repeat', 'count': -1, 'child': action()}, 'count'),
+    ({'type': 'repeat_until_success', 'max_retries': -1, 'child': action()}, 'max_retries'),
+    ({'type': 'timeout', 'timeout': 0, 'child': action()}, 'timeout'),
+    ({'type': 'timeout', 'timeout': -0.5, 'child': action()}, 'timeout'),
+    ({'type': 'circuit_breaker', 'timeout': 0, 'child': action()}, 'timeout'),
+    ({'type': 'retry', 'base_delay': -1, 'child': action()}, 'base_delay'),
+    ({'type': 'retry', 'max_delay': 0.01, 'base_delay': 1, 'child': action()}, 'max_delay'),
+    ({'type': 'condition', 'name': 'c', 'cache_ttl': 0}, 'cache_ttl'),
+    (action(repeat_count=-2), 'repeat_count'),
+])
+def test_out_of_range_values_are_rejected(root, field):
+    with pytest.raises(xNodeError, match=f'root\\.{field}: must be'):
+        TreeLoader().parse(document(root))
+
+
+def test_nan_is_out_of_range():
+    with pytest.raises(xNodeError, match='root.timeout: must be'):
+        TreeLoader().parse('{"root": {"type": "timeout", "timeout": NaN, "child": {"type": "action", "name": "work"}}}')
+
+
+def test_bounds_are_inclusive_where_zero_makes_sense():
+    TreeLoader().parse(document({'type': 'repeat', 'count': 0, 'child': action(repeat_count=0)}))
+    TreeLoader().parse(document({'type': 'retry', 'max_retries': 0, 'base_delay': 0, 'max_delay': 0, 'child': action()}))
+
+
+def test_unresolved_names_fail_to_build():
+    loader = TreeLoader()
+    with pytest.raises(xNodeError, match="No function named 'work'"):
+        loader.build(loader.parse(document(action())))
+
+
+@pytest.mark.parametrize('data, format', [(b'{', 'json'), (b'root = ', 'toml'), (b'\xff', 'toml'), (b'{}', 'yaml')])
+def test_undecodable_documents(data, format):
+    with pytest.raises(xNodeError):
+        TreeLoader().parse(data, format)
@@ -0,0 +1,82 @@
+import logging
+import queue
+
+from common.log import LazyQueueHandler, Sampler
+from common.result import xNodeStatus
+
+
+def record(msg, *args, level=logging.INFO, exc_info=None, name='test'):
+    return logging.LogRecord(name, level, __file__, 1, msg, args or None, exc_info)
+
+
+def enqueue(record: logging.LogRecord) -> logging.LogRecord:
+    handler = LazyQueueHandler(queue.SimpleQueue())
+    handler.handle(record)
+    return handler.queue.get_nowait()
+
+
+def test_immutable_arguments_are_formatted_by_the_listener():
+    original = record("Tree %s took %.3fs (%s)", 'patrol', 0.5, (xNodeStatus.Success, 1))
+    queued = enqueue(original)
+    assert queued is original
+    assert queued.args == ('patrol', 0.5, (xNodeStatus.Success, 1))
+    assert queued.getMessage() == "Tree patrol took 0.500s ((<xNodeStatus.Success: 0>, 1))"
+
+
+def test_mutable_arguments_are_formatted_eagerly():
+    tree = ['patrol']
+    queued = enqueue(record("Ticking %r", tree))
+    tree.append('alarm')
+    assert queued.args is None
+    assert queued.getMessage() == "Ticking ['patrol']"
+
+
+def test_mapping_arguments():
+    state = {'hp': 10}
+    queued = enqueue(logging.LogRecord('test', logging.INFO, __file__, 1, "%(hp)s left", ({'hp': 10},), None))
+    assert queued.getMessage() == "10 left"
+    queued = enqueue(logging.LogRecord('test', logging.INFO, __file__, 1, "%(hp)s left", ({'hp': state},), None))
+    state['hp'] = 0
+    assert queued.getMessage() == "{'hp': 10} left"
+
+
+def test_exceptions_are_formatted_eagerly():
+    try:
+        raise ValueError('boom')
+    except ValueError as e:
+        queued = enqueue(record("Tick failed", exc_info=(type(e), e, e.__traceback__)))
+    assert queued.exc_info is None
+    assert 'ValueError: boom' in queued.getMessage()
+
+
+def test_sampler_lets_every_nth_record_through():
+    sampler = Sampler(3)
+    passed = [record for record in (record("Tick of %s", index) for index in range(7)) if sampler.filter(record)]
+    assert [record.args for record in passed] == [(0,), (3,), (6,)]
+    assert passed[0].msg == "Tick of %s"
+    assert passed[1].msg == "Tick of %s [2 similar suppressed]"
+
+
+def test_sampler_counts_per_template_and_logger():
+    sampler = Sampler(2)
+    assert sampler.filter(record("a"))
+    assert sampler.filter(record("b"))
+    assert sampler.filter(record("a", name='other'))
+    assert not sampler.filter(record("a"))
+
+
+def test_sampler_passes_records_above_max_level():
+    sampler = Sampler(10)
+    assert all(sampler.filter(record("Overran", level=logging.WARNING)) for _ in range(3))
+    assert sampler.filter(record("Debug", level=logging.DEBUG))
+    assert not sampler.filter(record("Debug", level=logging.DEBUG))
+    assert all(Sampler(1).filter(record("x")) for _ in range(3))
+
+
+def test_sampler_forgets_templates_past_its_bound():
+    sampler = Sampler(2)
+    for index in range(4096):
+        sampler.filter(record(f"Tick {index}"))
+    assert sampler.filter(record("Tick 0")) is False
+    sampler.filter(record("fresh"))
+    assert sampler.filter(record("Tick 0")) is True
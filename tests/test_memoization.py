@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from common.result import xNodeStatus
+from src.behavior_tree import BehaviorTree, ConditionNode, Context, SequenceNode
+from src.blackboard import Blackboard
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.condition import Condition
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+def counting(calls: list, value=True):
+    def func():
+        calls.append(value)
+        return value
+    return func
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_cache_per_tick_evaluates_once_per_tick(executor):
+    async def run():
+        calls = []
+        condition = Condition(id='seen', name='seen', func=counting(calls), cache_per_tick=True)
+        context = Context()
+        tree = executor(SequenceNode([ConditionNode(condition), ConditionNode(condition), ConditionNode(condition)]), context)
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert len(calls) == 1
+        assert (context.cache_hits, context.cache_misses) == (2, 1)
+        await tree.run()
+        assert len(calls) == 2
+        assert (context.cache_hits, context.cache_misses) == (4, 2)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_cache_ttl_spans_ticks_until_it_expires(executor):
+    async def run():
+        calls = []
+        context = Context()
+        tree = executor(ConditionNode(Condition(id='seen', name='seen', func=counting(calls, False), cache_ttl=0.1)), context)
+        for _ in range(3):
+            assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 1
+        time.sleep(0.15)
+        await tree.run()
+        assert len(calls) == 2
+        assert (context.cache_hits, context.cache_misses) == (2, 2)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_cache_per_tick_and_ttl_both_apply(executor):
+    async def run():
+        calls = []
+        tree = executor(ConditionNode(Condition(id='seen', name='seen', func=counting(calls), cache_per_tick=True, cache_ttl=60)))
+        await tree.run()
+        await tree.run()
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_depends_on_reevaluates_after_changes_only(executor):
+    async def run():
+        calls = []
+        blackboard = Blackboard({'enemy': None})
+        condition = Condition(id='enemy', name='enemy', func=lambda: calls.append(1) or blackboard.get('enemy') is not None, depends_on=('enemy',))
+        tree = executor(ConditionNode(condition), Context(blackboard=blackboard))
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 1
+        blackboard['enemy'] = 'orc'
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_clear_forgets_memoized_results():
+    context = Context()
+    condition = Condition(id='seen', name='seen', cache_ttl=60)
+    context.memoize(condition, object())
+    context.clear()
+    assert context.cached(condition) is None
+    assert context.cache_misses == 1
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from common.result import xNodeStatus
+from src.batch import BatchTree
+from src.behavior_tree import ActionNode, BehaviorTree, Context, ParallelNode, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_decision_cancels_children_in_flight(executor):
+    async def run():
+        started = asyncio.Event()
+        cancelled = []
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def fast():
+            await started.wait()
+            return False
+
+        tree = executor(ParallelNode([
+            ActionNode(Action(id='slow', name='slow', func=slow)),
+            ActionNode(Action(id='fast', name='fast', func=fast)),
+        ], 2))
+        result = await asyncio.wait_for(tree.run(), timeout=1)
+        assert result.status == xNodeStatus.Failure
+        assert cancelled == [True]
+        assert tree.context.state == [0, 0, 0]
+
+    asyncio.run(run())
+
+
+def test_max_concurrency_limits_children_in_flight():
+    async def run():
+        running = peak = 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return True
+
+        children = [ActionNode(Action(id=str(index), name='w', func=work)) for index in range(6)]
+        assert (await BehaviorTree(ParallelNode(children, 6, max_concurrency=2)).run()).status == xNodeStatus.Success
+        assert peak == 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS + [BatchTree])
+def test_decision_resets_undecided_children(executor):
+    async def run():
+        calls = []
+        release = asyncio.get_running_loop().create_future()
+
+        def long():
+            calls.append('long')
+            return release
+
+        root = ParallelNode([
+            ActionNode(Action(id='fast', name='fast', func=lambda: True)),
+            SequenceNode([
+                ActionNode(Action(id='first', name='first', func=lambda: True)),
+                ActionNode(Action(id='long', name='long', func=long)),
+            ]),
+        ], 1)
+        context = Context()
+        tree = BatchTree(root, [context]) if executor is BatchTree else executor(root, context)
+        await tree.run()
+        assert context.handles == {}
+        assert context.state == [0] * len(context.state)
+        if executor is not BatchTree:
+            assert release.cancelled()
+
+    asyncio.run(run())
@@ -0,0 +1,103 @@
+import asyncio
+import socket
+
+import pytest
+
+from common.error import xNodeError
+from src.peers import FRAME, Peers, links
+from tests.support import wait_for
+
+
+def serving(tag: str):
+    async def invoke(kind: str, name: str):
+        if name == 'bad':
+            raise RuntimeError('boom')
+        return f'{tag}:{kind}:{name}'
+    return invoke
+
+
+async def pair():
+    ends = links(2)
+    first, second = Peers(ends[0], serving('w0')), Peers(ends[1], serving('w1'))
+    await first.start()
+    await second.start()
+    return first, second
+
+
+def test_invoke_round_trip():
+    async def run():
+        first, second = await pair()
+        second.announce('action', 'patrol', True)
+        await wait_for(lambda: first.exposes('action', 'patrol'))
+        assert await first.invoke('action', 'patrol', timeout=1) == 'w1:action:patrol'
+        second.announce('action', 'bad', True)
+        await wait_for(lambda: first.exposes('action', 'bad'))
+        with pytest.raises(xNodeError, match='boom'):
+            await first.invoke('action', 'bad', timeout=1)
+        second.announce('action', 'patrol', False)
+        await wait_for(lambda: not first.exposes('action', 'patrol'))
+        with pytest.raises(xNodeError, match='No connected client'):
+            await first.invoke('action', 'patrol')
+        first.close()
+        second.close()
+
+    asyncio.run(run())
+
+
+def test_malformed_message_drops_the_link():
+    async def run():
+        mine, theirs = socket.socketpair()
+        peers = Peers({1: mine}, serving('w0'))
+        await peers.start()
+        reader, writer = await asyncio.open_connection(sock=theirs)
+        payload = b'\x00garbage'
+        writer.write(FRAME.pack(len(payload)) + payload)
+        await wait_for(lambda: 1 not in peers._writers)
+        # The dropped link is closed, so the other end reads to EOF.
+        await asyncio.wait_for(reader.read(), timeout=1)
+        writer.close()
+        peers.close()
+
+    asyncio.run(run())
+
+
+def test_oversized_frame_drops_the_link():
+    async def run():
+        mine, theirs = socket.socketpair()
+        peers = Peers({1: mine}, serving('w0'))
+        await peers.start()
+        theirs.sendall(FRAME.pack(2 ** 31))
+        await wait_for(lambda: 1 not in peers._writers)
+        theirs.close()
+        peers.close()
+
+    asyncio.run(run())
+
+
+def test_control_socket_replaces_the_link_of_a_restarted_worker():
+    async def run():
+        ends = links(2)
+        control, launcher = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        first = Peers(ends[0], serving('w0'), control)
+        second = Peers(ends[1], serving('w1'))
+        await first.start()
+        await second.start()
+        second.announce('action', 'patrol', True)
+        await wait_for(lambda: first.exposes('action', 'patrol'))
+        # Worker 1 dies mid-frame; its successor gets a fresh link.
+        ends[1][0].send(FRAME.pack(100) + b'half')
+        second.close()
+        fresh, handed = socket.socketpair()
+        with handed:
+            socket.send_fds(launcher, [FRAME.pack(1)], [handed.fileno()])
+        await wait_for(lambda: not first.exposes('action', 'patrol'))
+        restarted = Peers({0: fresh}, serving('w1b'))
+        restarted.announce('action', 'patrol', True)
+        await restarted.start()
+        await wait_for(lambda: first.exposes('action', 'patrol'))
+        assert await first.invoke('action', 'patrol', timeout=1) == 'w1b:action:patrol'
+        first.close()
+        restarted.close()
+        launcher.close()
+
+    asyncio.run(run())
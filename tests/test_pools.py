@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from common.error import xNodeError
+from src.entities.execution_policy import ExecutionPolicy
+from src.loader import TreeLoader
+from src.pools import WorkerPools
+from src.registry import xNodeRegistry
+
+
+def square(value: int = 7) -> int:
+    return value * value
+
+
+@pytest.fixture
+def pools():
+    pools = WorkerPools(thread_workers=2, process_workers=1)
+    yield pools
+    pools.shutdown()
+
+
+@pytest.mark.parametrize('policy', [ExecutionPolicy.Inline, ExecutionPolicy.Thread, ExecutionPolicy.Process])
+def test_run_returns_result(pools, policy):
+    assert asyncio.run(pools.run(square, policy)) == 49
+
+
+def test_thread_result_awaitable_is_awaited(pools):
+    async def remote():
+        return 'done'
+
+    assert asyncio.run(pools.run(lambda: remote(), ExecutionPolicy.Thread)) == 'done'
+
+
+def test_coroutine_function_stays_on_loop(pools):
+    async def where():
+        return asyncio.get_running_loop()
+
+    async def run():
+        assert await pools.run(where, ExecutionPolicy.Thread) is asyncio.get_running_loop()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('policy', ['thread', 'process'])
+def test_loader_rejects_pools_for_remote_functions(policy):
+    loader = TreeLoader(xNodeRegistry())
+    spec = loader.parse(f'{{"root": {{"type": "action", "name": "remote", "policy": "{policy}"}}}}')
+    with pytest.raises(xNodeError, match="policy must be 'inline'"):
+        loader.build(spec)
+    loader.build(loader.parse('{"root": {"type": "action", "name": "remote"}}'))
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+import main
+from common.result import xNodeStatus
+from src.handlers.batch.register_batch import RegisterBatchCommandHandler
+from src.registry import xNodeRegistry
+from src.requests.batch.register_batch import RegisterBatchRequest
+from tests.support import free_port, wait_for
+
+
+def test_handler_aggregates_the_batch():
+    registry, client = xNodeRegistry(), object()
+    result = RegisterBatchCommandHandler(registry).handle(RegisterBatchRequest([
+        {'command': 'register_action', 'id': 'move', 'name': 'move'},
+        {'command': 'register_condition', 'id': 'clear', 'name': 'clear'},
+        {'command': 'register_action', 'id': 'move', 'name': 'move'},
+        {'command': 'register_event', 'name': 'x'},
+        {'command': 'register_action'},
+        'move',
+    ], client=client))
+    assert result.status == xNodeStatus.Failure
+    assert result.value['registered'] == 2 and result.value['duplicates'] == 1
+    assert [failed['index'] for failed in result.value['failed']] == [3, 4, 5]
+    assert result.error == "3 of 6 registrations failed"
+    assert registry.registered(client) == {('action', 'move'), ('condition', 'clear')}
+
+
+def test_handler_needs_a_client():
+    result = RegisterBatchCommandHandler(xNodeRegistry()).handle(RegisterBatchRequest([]))
+    assert result.status == xNodeStatus.Failure
+
+
+async def exchange(ws, message):
+    await ws.send(json.dumps(message))
+    return json.loads(await ws.recv())
+
+
+@pytest.mark.parametrize('route, kind', [('register_action', 'actions'), ('register_condition', 'conditions')])
+def test_endpoints_take_arrays_and_single_registrations(route, kind):
+    async def run():
+        port = free_port()
+        server = await main.router.serve('localhost', port)
+        async with websockets.connect(f'ws://localhost:{port}/{route}') as ws:
+            reply = await exchange(ws, [{'id': 'a', 'name': 'a'}, {'id': 'b', 'name': 'b'}])
+            assert reply['status'] == xNodeStatus.Success.value
+            assert reply['value'] == {'registered': 2, 'duplicates': 0, 'failed': []}
+            reply = await exchange(ws, {'id': 'c', 'name': 'c'})
+            assert reply['status'] == xNodeStatus.Success.value
+            assert {'a', 'b', 'c'} <= set(getattr(main.registry, kind))
+        await wait_for(lambda: not {'a', 'b', 'c'} & set(getattr(main.registry, kind)))
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_register_batch_takes_mixed_commands():
+    async def run():
+        port = free_port()
+        server = await main.router.serve('localhost', port)
+        async with websockets.connect(f'ws://localhost:{port}/register_batch') as ws:
+            reply = await exchange(ws, {'items': [
+                {'command': 'register_action', 'id': 'fire', 'name': 'fire'},
+                {'command': 'register_condition', 'id': 'armed', 'name': 'armed'},
+            ]})
+            assert reply['value']['registered'] == 2
+            reply = await exchange(ws, [
+                {'command': 'register_action', 'id': 'fire', 'name': 'fire'},
+                {'command': 'unregister', 'name': 'armed'},
+            ])
+            assert reply['status'] == xNodeStatus.Failure.value
+            assert reply['value'] == {'registered': 0, 'duplicates': 1, 'failed': [{'index': 1, 'error': "Expected a register_action/register_condition item with a name"}]}
+            assert 'fire' in main.registry.actions and 'armed' in main.registry.conditions
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_dispatcher_register_batch_command():
+    async def run():
+        port = free_port()
+        server = await main.router.serve('localhost', port)
+        async with websockets.connect(f'ws://localhost:{port}/dispatcher') as ws:
+            reply = await exchange(ws, {'request_id': 7, 'command': 'register_batch', 'items': [
+                {'command': 'register_action', 'id': 'scan', 'name': 'scan'},
+            ]})
+            assert reply['request_id'] == 7
+            assert reply['result']['value']['registered'] == 1
+            assert 'scan' in main.registry.actions
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from common.error import xNodeError
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, BehaviorTree, ConditionNode, SelectorNode, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+from src.registry import xNodeRegistry
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+class Client:
+    """Stands in for a ``RemoteClient``: answers invocations from ``replies``."""
+
+    def __init__(self, **replies) -> None:
+        self.replies = replies
+        self.calls = []
+
+    async def invoke(self, name, timeout=None):
+        self.calls.append(name)
+        reply = self.replies[name]
+        if reply == 'hang':
+            return await asyncio.wait_for(asyncio.sleep(10), timeout)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def patrol(registry: xNodeRegistry, alarms: list):
+    return SelectorNode([
+        SequenceNode([
+            ConditionNode(Condition(id='area_clear', name='area_clear', func=registry.condition('area_clear'))),
+            ActionNode(Action(id='move', name='move', func=registry.action('move'))),
+        ]),
+        ActionNode(Action(id='alarm', name='alarm', func=lambda: alarms.append(True) or True)),
+    ])
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_selector_falls_back_without_a_client(executor):
+    async def run():
+        alarms = []
+        tree = executor(patrol(xNodeRegistry(), alarms))
+        result = await tree.run()
+        assert result.status == xNodeStatus.Success
+        assert alarms == [True]
+        failed = tree.context.get(lambda entry: entry.id == 'area_clear')[0].result
+        assert failed.status == xNodeStatus.Failure
+        assert "No connected client exposes condition 'area_clear'" in failed.error
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+@pytest.mark.parametrize('reply, error', [
+    (xNodeError("Function 'move' failed"), "Function 'move' failed"),
+    ('hang', "Action 'move' timed out after 0.05 seconds."),
+])
+def test_remote_failures_fail_the_action(executor, reply, error):
+    async def run():
+        registry, alarms = xNodeRegistry(invoke_timeout=0.05), []
+        client = Client(area_clear=True, move=reply)
+        registry.add_condition('area_clear', client)
+        registry.add_action('move', client)
+        tree = executor(patrol(registry, alarms))
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert alarms == [True]
+        assert tree.context.get(lambda entry: entry.id == 'move')[0].result.error == error
+
+    asyncio.run(run())
+
+
+def test_invocations_round_robin_and_purge():
+    async def run():
+        registry = xNodeRegistry()
+        first, second = Client(move='first'), Client(move='second')
+        assert registry.add_action('move', first)
+        assert not registry.add_action('move', first)
+        registry.add_action('move', second)
+        assert [await registry.invoke_action('move') for _ in range(3)] == ['first', 'second', 'first']
+        registry.remove_client(first)
+        assert registry.registered(first) == set()
+        assert await registry.invoke_action('move') == 'second'
+        registry.remove_client(second)
+        assert 'move' not in registry.actions
+        with pytest.raises(xNodeError):
+            await registry.invoke_action('move')
+
+    asyncio.run(run())
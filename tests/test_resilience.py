@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, BehaviorTree, CircuitBreaker, CircuitBreakerDecorator, Context, RetryDecorator, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+
+# The compiled executor runs both decorators through its OP_NODE fallback.
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+@pytest.fixture(autouse=True)
+def longest_backoff(monkeypatch):
+    monkeypatch.setattr(random, 'uniform', lambda low, high: high)
+
+
+def scripted(*outcomes):
+    """An action that goes through ``outcomes`` (repeating the last), counting its calls."""
+    calls = []
+
+    def func():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return ActionNode(Action(id='flaky', name='flaky', func=func)), calls
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_retry_backs_off_exponentially(executor):
+    async def run():
+        action, calls = scripted(False)
+        context = Context()
+        tree = executor(RetryDecorator(action, max_retries=3, base_delay=0.04, max_delay=0.06), context)
+        delays = []
+        for attempt in range(3):
+            assert (await tree.run()).status == xNodeStatus.Running
+            assert len(calls) == attempt + 1
+            delays.append(context.state[tree.root.slot][1] - time.time())
+            assert (await tree.run()).status == xNodeStatus.Running
+            assert len(calls) == attempt + 1
+            await asyncio.sleep(delays[-1] + 0.01)
+        assert [round(delay, 2) for delay in delays] == [0.04, 0.06, 0.06]
+        result = await tree.run()
+        assert result.status == xNodeStatus.Failure
+        assert len(calls) == 4
+        assert context.state[tree.root.slot] == 0
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_retry_succeeds_within_the_limit(executor):
+    async def run():
+        action, calls = scripted(False, True)
+        context = Context()
+        tree = executor(RetryDecorator(action, max_retries=1, base_delay=0), context)
+        assert (await tree.run()).status == xNodeStatus.Running
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert calls == [False, True]
+        assert context.state[tree.root.slot] == 0
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_retry_counts_exceptions_as_failed_attempts(executor):
+    async def run():
+        action, calls = scripted(RuntimeError('boom'))
+        tree = executor(RetryDecorator(SequenceNode([action]), max_retries=2, base_delay=0))
+        assert (await tree.run()).status == xNodeStatus.Running
+        assert (await tree.run()).status == xNodeStatus.Running
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 3
+        assert tree.context.state == [0] * len(tree.context.state)
+
+    asyncio.run(run())
+
+
+def test_errors_of_the_decorators():
+    async def run():
+        action, _ = scripted(RuntimeError('boom'))
+        retry = RetryDecorator(action, max_retries=0)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        circuit = CircuitBreakerDecorator(ActionNode(Action(id='flaky', name='flaky', func=lambda: False)), breaker)
+        context = BehaviorTree(SequenceNode([retry, circuit])).context
+        context.state.extend([0] * 4)
+        assert (await retry.tick(context)).error == 'boom'
+        await circuit.tick(context)
+        assert (await circuit.tick(context)).error == "Circuit for flaky is open"
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_circuit_opens_half_opens_and_closes(executor):
+    async def run():
+        action, calls = scripted(False, False, False, True)
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        tree = executor(CircuitBreakerDecorator(action, breaker))
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert breaker.state('flaky') == CircuitBreaker.CLOSED
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert breaker.state('flaky') == CircuitBreaker.OPEN
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 2
+        # The probe let through once the circuit half-opens fails: open again.
+        await asyncio.sleep(0.06)
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert (len(calls), breaker.state('flaky')) == (3, CircuitBreaker.OPEN)
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 3
+        await asyncio.sleep(0.06)
+        assert (await tree.run()).status == xNodeStatus.Success
+        assert (len(calls), breaker.state('flaky')) == (4, CircuitBreaker.CLOSED)
+        assert breaker.to_dict() == {}
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_circuit_counts_exceptions_and_reraises(executor):
+    async def run():
+        action, calls = scripted(RuntimeError('boom'))
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        tree = executor(CircuitBreakerDecorator(action, breaker))
+        with pytest.raises(RuntimeError):
+            await tree.run()
+        assert breaker.state('flaky') == CircuitBreaker.OPEN
+        assert (await tree.run()).status == xNodeStatus.Failure
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_half_open_circuit_admits_one_probe(executor):
+    async def run():
+        release = asyncio.get_running_loop().create_future()
+        probes = []
+
+        def probe():
+            probes.append(True)
+            return release
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record('probe', False)
+        action = ActionNode(Action(id='probe', name='probe', func=probe))
+        first, second = executor(CircuitBreakerDecorator(action, breaker)), executor(CircuitBreakerDecorator(action, breaker))
+        await asyncio.sleep(0.06)
+        assert (await first.run()).status == xNodeStatus.Running
+        assert breaker.state('probe') == CircuitBreaker.HALF_OPEN
+        assert (await second.run()).status == xNodeStatus.Failure
+        release.set_result(True)
+        assert (await first.run()).status == xNodeStatus.Success
+        assert breaker.state('probe') == CircuitBreaker.CLOSED
+        assert len(probes) == 1
+
+    asyncio.run(run())
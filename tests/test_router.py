@@ -0,0 +1,79 @@
+import asyncio
+import http
+
+import pytest
+import websockets
+
+from src.router import Router
+from tests.support import free_port
+
+
+@pytest.fixture
+def router():
+    router = Router()
+
+    @router.route("/dispatcher")
+    async def dispatcher(ws, path):
+        await ws.send(f"dispatcher {dict(path.params)}")
+
+    @router.route("/agents/{id:\\d+}")
+    async def agent(ws, path):
+        await ws.send(f"agent {path.params['id']}")
+
+    @router.route("/trees/{name}/nodes/{node}")
+    async def node(ws, path):
+        await ws.send(f"node {path.params['name']} {path.params['node']}")
+
+    return router
+
+
+def test_static_route(router):
+    path = router.match("/dispatcher?token=1")
+    assert path == "/dispatcher?token=1"
+    assert type(path.route).__name__ == 'dispatcher'
+    assert dict(path.params) == {}
+
+
+def test_parameters_are_decoded(router):
+    assert dict(router.match("/trees/patrol%20a/nodes/7").params) == {'name': 'patrol a', 'node': '7'}
+
+
+def test_parameter_pattern_is_enforced(router):
+    assert dict(router.match("/agents/42").params) == {'id': '42'}
+    assert router.match("/agents/x").params is None
+
+
+def test_unknown_path(router):
+    path = router.match("/nowhere")
+    assert path.route is None and path.params is None
+
+
+def test_first_static_route_wins_and_cache_is_cleared(router):
+    first = router.match("/late").route
+    assert first is None
+
+    @router.route("/late")
+    async def late(ws, path):
+        pass
+
+    @router.route("/late")
+    async def later(ws, path):
+        pass
+
+    assert type(router.match("/late").route).__name__ == 'late'
+
+
+def test_routes_are_served(router):
+    async def run():
+        port = free_port()
+        server = await router.serve('localhost', port)
+        async with websockets.connect(f'ws://localhost:{port}/agents/5') as ws:
+            assert await ws.recv() == "agent 5"
+        with pytest.raises(websockets.InvalidStatusCode) as error:
+            async with websockets.connect(f'ws://localhost:{port}/agents/five'):
+                pass
+        assert error.value.status_code == http.HTTPStatus.NOT_FOUND
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
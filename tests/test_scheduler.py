@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+import pytest
+
+from src.behavior_tree import ActionNode, BehaviorTree
+from src.entities.action import Action
+from src.scheduler import TreeScheduler
+
+
+def tree(func) -> BehaviorTree:
+    return BehaviorTree(ActionNode(Action(id='a', name='a', func=func)))
+
+
+def test_ticks_at_rate():
+    async def run():
+        scheduler = TreeScheduler(rate=100)
+        scheduled = scheduler.add(tree(lambda: True))
+        assert scheduler.add(scheduled.tree) is scheduled
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert 10 <= scheduled.ticks <= 21
+        assert scheduler.stats()['ticks'] == scheduled.ticks
+
+    asyncio.run(run())
+
+
+def test_tick_in_flight_is_skipped():
+    async def run():
+        async def slow():
+            await asyncio.sleep(0.05)
+            return True
+
+        scheduler = TreeScheduler(rate=100, on_overrun=lambda scheduled, duration: None)
+        scheduled = scheduler.add(tree(slow))
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert scheduled.skipped > scheduled.ticks > 0
+        assert scheduled.overruns == scheduled.ticks
+
+    asyncio.run(run())
+
+
+def test_removed_tree_stops_ticking():
+    async def run():
+        scheduler = TreeScheduler(rate=100)
+        scheduled = scheduler.add(tree(lambda: True))
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        scheduler.remove(scheduled.tree)
+        ticks = scheduled.ticks
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        assert scheduled.ticks <= ticks + 1
+        assert len(scheduler) == 0
+
+    asyncio.run(run())
+
+
+def test_failures_are_logged_once_per_streak(caplog, monkeypatch):
+    # The server samples this logger; count every record here.
+    monkeypatch.setattr(logging.getLogger('src.scheduler'), 'filters', [])
+    outcomes = iter([False] * 5 + [True] * 3 + [False] * 2)
+
+    def flaky():
+        if not next(outcomes, True):
+            raise RuntimeError("remote down")
+        return True
+
+    async def run():
+        scheduler = TreeScheduler(rate=200)
+        scheduled = scheduler.add(tree(flaky), name='patrol')
+        scheduler.start()
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+        return scheduled
+
+    with caplog.at_level(logging.INFO, logger='src.scheduler'):
+        scheduled = asyncio.run(run())
+    assert scheduled.errors == 7
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages.count("Ticks of tree patrol are failing") == 2
+    assert messages.count("Tree patrol recovered after 5 failed ticks") == 1
+    assert messages.count("Tree patrol recovered after 2 failed ticks") == 1
+    assert all('ActionNode' not in message for message in messages)
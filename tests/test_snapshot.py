@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+from common.result import xNodeStatus
+from src.behavior_tree import ActionNode, ConditionNode, Node, ParallelNode, RepeatDecorator, SequenceNode
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+from src.entities.condition import Condition
+from src.snapshot import SnapshotStore, capture, restore
+
+
+def build(calls: list) -> Node:
+    def slow():
+        calls.append('slow')
+        return xNodeStatus.Running if calls.count('slow') % 3 else True
+
+    return SequenceNode([
+        ActionNode(Action(id='init', name='init', func=lambda: calls.append('init') or True, execute_once=True)),
+        ParallelNode([
+            ActionNode(Action(id='slow', name='slow', func=slow)),
+            ConditionNode(Condition(id='ready', name='ready', func=lambda: True)),
+        ], 2),
+        RepeatDecorator(ActionNode(Action(id='step', name='step', func=lambda: True)), 2),
+    ])
+
+
+def test_round_trip(tmp_path):
+    async def run():
+        calls = []
+        tree = CompiledBehaviorTree(build(calls))
+        await tree.run()
+        await tree.run()
+        store = SnapshotStore(tmp_path / 'trees.snap', fsync=False)
+        assert store.load() == {}
+        assert store.write({'patrol': capture(tree)}) > 0
+        assert store.write({'patrol': capture(tree)}) == 0
+        store.close()
+
+        restored = CompiledBehaviorTree(build(calls))
+        assert restore(restored, SnapshotStore(tmp_path / 'trees.snap').load()['patrol'])
+        assert restored.context.state == tree.context.state
+        assert restored.context.has_completed('init')
+        assert restored.context.completed == {'init'}
+        assert (await restored.run()).status == xNodeStatus.Success
+        assert calls.count('init') == 1
+
+    asyncio.run(run())
+
+
+def test_torn_record_is_truncated(tmp_path):
+    async def run():
+        path = tmp_path / 'trees.snap'
+        tree = CompiledBehaviorTree(build([]))
+        await tree.run()
+        store = SnapshotStore(path, fsync=False)
+        store.load()
+        store.write({'patrol': capture(tree)})
+        store.close()
+        size = os.path.getsize(path)
+        with open(path, 'ab') as f:
+            f.write(b'\x40\x00\x00\x00partial record')
+
+        store = SnapshotStore(path, fsync=False)
+        assert list(store.load()) == ['patrol']
+        assert os.path.getsize(path) == size
+        store.write({'other': capture(tree)})
+        store.close()
+        assert sorted(SnapshotStore(path).load()) == ['other', 'patrol']
+
+    asyncio.run(run())
+
+
+def test_removed_key_stays_removed(tmp_path):
+    async def run():
+        tree = CompiledBehaviorTree(build([]))
+        await tree.run()
+        store = SnapshotStore(tmp_path / 'trees.snap', fsync=False)
+        store.write({'a': capture(tree), 'b': capture(tree)})
+        store.write({'a': None})
+        store.compact()
+        store.close()
+        assert list(SnapshotStore(tmp_path / 'trees.snap').load()) == ['b']
+
+    asyncio.run(run())
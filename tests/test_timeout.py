@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from common.result import xNodeStatus
+from src.batch import BatchTree
+from src.behavior_tree import (
+    ActionNode,
+    BehaviorTree,
+    CircuitBreaker,
+    CircuitBreakerDecorator,
+    Context,
+    SequenceNode,
+    TimeoutDecorator,
+)
+from src.compiled_tree import CompiledBehaviorTree
+from src.entities.action import Action
+
+EXECUTORS = [BehaviorTree, CompiledBehaviorTree]
+
+
+def hanging(handles):
+    def func():
+        handle = asyncio.get_running_loop().create_future()
+        handles.append(handle)
+        return handle
+    return func
+
+
+def build(executor, root, context):
+    return BatchTree(root, [context]) if executor is BatchTree else executor(root, context)
+
+
+async def tick(tree):
+    result = await tree.run()
+    return result[0] if isinstance(result, list) else result.status
+
+
+@pytest.mark.parametrize('executor', EXECUTORS + [BatchTree])
+def test_timeout_spans_ticks(executor):
+    async def run():
+        handles = []
+        root = TimeoutDecorator(SequenceNode([
+            ActionNode(Action(id='first', name='first', func=lambda: True)),
+            ActionNode(Action(id='hang', name='hang', func=hanging(handles))),
+        ]), 0.1)
+        context = Context()
+        tree = build(executor, root, context)
+        assert await tick(tree) == xNodeStatus.Running
+        assert await tick(tree) == xNodeStatus.Running
+        await asyncio.sleep(0.15)
+        assert await tick(tree) == xNodeStatus.Failure
+        assert len(handles) == 1 and handles[0].cancelled()
+        assert context.handles == {}
+        assert context.state == [0] * len(context.state)
+        # The next run starts over with a fresh deadline.
+        assert await tick(tree) == xNodeStatus.Running
+        assert len(handles) == 2
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS + [BatchTree])
+def test_timeout_passes_results_before_the_deadline(executor):
+    async def run():
+        handles = []
+        context = Context()
+        tree = build(executor, TimeoutDecorator(ActionNode(Action(id='hang', name='hang', func=hanging(handles))), 1), context)
+        assert await tick(tree) == xNodeStatus.Running
+        handles[0].set_result(True)
+        assert await tick(tree) == xNodeStatus.Success
+        assert context.state == [0] * len(context.state)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('executor', EXECUTORS)
+def test_circuit_breaker_timeout_spans_ticks(executor):
+    async def run():
+        handles = []
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        context = Context()
+        tree = executor(CircuitBreakerDecorator(ActionNode(Action(id='hang', name='hang', func=hanging(handles))), breaker, timeout=0.1), context)
+        assert (await tree.run()).status == xNodeStatus.Running
+        await asyncio.sleep(0.15)
+        result = await tree.run()
+        assert result.status == xNodeStatus.Failure
+        assert handles[0].cancelled()
+        assert context.handles == {}
+        assert breaker.state('hang') == CircuitBreaker.OPEN
+
+    asyncio.run(run())